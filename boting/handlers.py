@@ -12,6 +12,9 @@ import state
 from boting.keyboard import get_main_keyboard
 from boting.reporter import send_daily_report
 from trading.orders import current_balance, check_balance, place_market_sell_order
+from trading.strategy import condition_report, get_prescreen, signal_ranking
+from trading.timing import timers
+from trading.tracing import trace_stats
 
 from telebot.types import (
     ReplyKeyboardMarkup,
@@ -130,9 +133,18 @@ def trade_status_handler(message):
     if not is_authorized(message):
         return
     config.bot.send_message(message.chat.id, f" Trading is {'Active ✅' if state.is_trading_active else 'Stopped ⛔️'}")
-    config.bot.send_message(message.chat.id, f" In Position  {'YES ✅' if state.in_position else 'NO ⛔️'}")
-    symbol = state.current_symbol if state.current_symbol else "NO ⛔️"
-    config.bot.send_message(message.chat.id, f"Symbol: {symbol} {'✅' if state.current_symbol else ''}")
+    config.bot.send_message(message.chat.id, f" In Position  {'YES ✅' if state.positions else 'NO ⛔️'}")
+    market = state.market.snapshot()
+    prices = {s: market[s][1] for s in state.positions if s in market}
+    config.bot.send_message(message.chat.id, state.positions.report(prices))
+    config.bot.send_message(message.chat.id, signal_ranking.report())
+    config.bot.send_message(message.chat.id, state.candle_events.report())
+    if state.ingest_queue is not None:
+        config.bot.send_message(message.chat.id, state.ingest_queue.report())
+    config.bot.send_message(message.chat.id, condition_report())
+    config.bot.send_message(message.chat.id, get_prescreen().stats.report())
+    config.bot.send_message(message.chat.id, timers.report())
+    config.bot.send_message(message.chat.id, trace_stats.report())
 
 # -----------------------------------
 @config.bot.message_handler(func=lambda message: message.text == "🛑 Stop Trading")
@@ -147,9 +159,10 @@ def confirm_stop(message):
 def confirmed_stop(message):
     if not is_authorized(message):
         return
-    if state.in_position and state.current_symbol:
+    if state.positions:
         state.is_trading_active = False
-        place_market_sell_order(state.current_symbol)
+        for symbol in state.positions:
+            place_market_sell_order(symbol)
     else:
         config.bot.send_message(config.CHAT_ID, "🚫 No open trades currently.", reply_markup=get_main_keyboard())
 
@@ -12,14 +12,35 @@ from decimal import Decimal
 import config
 import state
 from boting.keyboard import get_main_keyboard
+from trading.timing import timed
 
-def send_trade_report(symbol, amount, entry_price, exit_price, usdt_after, trade_status):
+@timed("telegram.send")
+def send_message(*args, **kwargs):
+    """config.bot.send_message, recorded in the telegram.send stage timing."""
+    return config.bot.send_message(*args, **kwargs)
+
+def record_trade(data, now, won, loss_pct=0):
+    """Stats change for one closed trade; returns the loss % summed over the past hour."""
+    data["total_trades_today"] += 1
+    if won:
+        data["successful_trades"] += 1
+    else:
+        data["failed_trades"] += 1
+        one_hour_ago = now - 3600
+        data["recent_losses"] = tuple(
+            (t, loss) for t, loss in data["recent_losses"] if t >= one_hour_ago
+        ) + ((now, loss_pct),)
+    return sum(loss for _, loss in data["recent_losses"])
+
+def send_trade_report(symbol, amount, entry_price, exit_price, usdt_after, trade_status, cost_usdt=None):
     """
     Sends a detailed trade report message via Telegram bot.
     """
     now = time.time()
     profit_or_loss = ((exit_price - entry_price) / entry_price) * 100
-    usd_profit_loss = usdt_after - state.usdt_before
+    # per position, since other positions may be open
+    cost_usdt = cost_usdt if cost_usdt is not None else amount * entry_price
+    usd_profit_loss = amount * exit_price - cost_usdt
     
     report = (
         f"⚡️ New Sell Trade\n"
@@ -28,7 +49,7 @@ def send_trade_report(symbol, amount, entry_price, exit_price, usdt_after, trade
         f"💰 Exit Price: {exit_price}\n"
         f"📈 Change: {profit_or_loss:.2f}%\n"
         f"💵 Profit / Loss: {usd_profit_loss:.2f} USDT\n"
-        f"💼 Balance Before Trade: {state.usdt_before:.2f} USDT\n"
+        f"💼 Position Size: {cost_usdt:.2f} USDT\n"
         f"💼 Balance After Trade: {usdt_after:.2f} USDT\n"
         f"🕒 Exit Time: {time.strftime('%Y-%m-%d %H:%M:%S')}\n"
     )
@@ -45,26 +66,20 @@ def send_trade_report(symbol, amount, entry_price, exit_price, usdt_after, trade
 
     report += f"🔖 Exit Reason: {reason}\n"
 
-    if trade_status == "success":
-        state.successful_trades += 1
-        state.total_trades_today += 1
+    won = trade_status == "success"
+    # Track recent losses to stop trading if limit exceeded
+    loss_sum = state.stats.update(lambda data: record_trade(data, now, won, abs(profit_or_loss)))
+    if won:
         report += "✅ Winning Trade\n"
     else:
-        state.failed_trades += 1
-        state.total_trades_today += 1
         report += "❌ Losing Trade\n"
 
-        # Track recent losses to stop trading if limit exceeded
-        state.recent_losses.append((now, abs(profit_or_loss)))
-        one_hour_ago = now - 3600
-
-        loss_sum = sum(loss for _, loss in state.recent_losses)
         if loss_sum >= config.MAX_LOSS_HOUR:
             state.is_trading_active = False
             report += f"⚠️ Trading stopped automatically due to losses exceeding {config.MAX_LOSS_HOUR}% in the past hour.\n"
 
     try:
-        config.bot.send_message(config.CHAT_ID, report, reply_markup=get_main_keyboard())
+        send_message(config.CHAT_ID, report, reply_markup=get_main_keyboard())
     except Exception as e:
         print(f"[Telegram Error] Failed to send trade report: {e}")
 
@@ -72,16 +87,17 @@ def send_daily_report():
     """
     Sends a daily summary report via Telegram bot.
     """
+    stats = state.stats.snapshot()  # one consistent version of all counters
     report = (
         f"📊 Daily Report:\n"
-        f"✅ Total Trades: {state.total_trades_today}\n"
-        f"✔️ Winning Trades: {state.successful_trades}\n"
-        f"❌ Losing Trades: {state.failed_trades}\n"
-        f"💰 Total Profit / Loss: {state.total_profit_loss:.2f} USDT\n"
+        f"✅ Total Trades: {stats['total_trades_today']}\n"
+        f"✔️ Winning Trades: {stats['successful_trades']}\n"
+        f"❌ Losing Trades: {stats['failed_trades']}\n"
+        f"💰 Total Profit / Loss: {stats['total_profit_loss']:.2f} USDT\n"
         f"📅 Report Date: {time.strftime('%Y-%m-%d %H:%M:%S')}"
     )
     try:
-        config.bot.send_message(config.CHAT_ID, report, reply_markup=get_main_keyboard())
+        send_message(config.CHAT_ID, report, reply_markup=get_main_keyboard())
     except Exception as e:
         print(f"[Telegram Error] Failed to send daily report: {e}")
 
@@ -1,11 +1,13 @@
 import config
+import state
 from state import *
 from boting.keyboard import get_main_keyboard
+from boting.reporter import send_message
 
 def send_update_message(message):
     """Helper function to send a message with the main keyboard."""
     try:
-        config.bot.send_message(config.CHAT_ID, message, reply_markup=get_main_keyboard())
+        send_message(config.CHAT_ID, message, reply_markup=get_main_keyboard())
     except Exception as e:
         print(f"[Telegram Error] Failed to send message: {e}")
 
@@ -23,6 +25,7 @@ def update_min_usdt(new_min_usdt):
 
 def update_max_usdt(new_max_usdt):
     config.MAX_USDT = new_max_usdt
+    config.MAX_TRADE_USDT = new_max_usdt  # budget the capital allocator splits across positions
     send_update_message(f"💰 Maximum trade amount updated to: {config.MAX_USDT} USDT.")
 
 def update_price_increase_min(new_price_increase_min):
@@ -34,6 +37,8 @@ def update_price_increase_max(new_price_increase_max):
     send_update_message(f"✅ MAX_INCREASE {config.MAX_INCREASE}%")
 
 def update_monitoring_minutes(new_minutes):
+    # rejects a horizon longer than the price history kept, before anything changes
+    state.price_history.set_horizon(new_minutes)  # every symbol's window follows on its next lookup
     config.MONITOR_MINUTES = new_minutes
     send_update_message(f"✅ MONITOR_MINUTES {config.MONITOR_MINUTES} minutes")
 
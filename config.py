@@ -29,6 +29,11 @@ MACD_LONG = 26
 EMA_SHORT = 8
 EMA_LONG = 30  # Changed to int for consistency
 BREAKOUT_PERIOD = 20
+INDICATOR_BACKEND = "decimal"  # "decimal" (exact) or "numpy" (vectorized float64 signals)
+BATCH_INDICATORS = False  # compute each scan's indicators as one symbols x bars matrix (reseeded from the stored candles)
+STRATEGY_WORKERS = 0  # processes sharing the entry scan (0 = in-process); candles are shared through the mapped cache
+SIGNAL_SCORE = "composite"  # rank a scan's buy signals by rsi_distance, breakout, zlsma_gap, volume or composite
+SIGNAL_TOP_K = 5  # ranked candidates kept per scan (at least MAX_POSITIONS)
 LSTM_MODEL = True
 CNN_MODEL = True
 XGBOOST_MODEL = True
@@ -47,10 +52,23 @@ SL_PCT = Decimal(str(STOP_LOSS_PCT))
 
 MONITOR_MINUTES = 1440
 TRADE_INTERVAL = 6  # seconds between each check
+STRATEGY_MODE = "events"  # "events" (evaluate symbols on candle close) or "poll" (rescan all every TRADE_INTERVAL)
 STEP_SEC = 900      # duration of each candle in seconds (15 minutes)
 
 SYMBOLS_PER_SOCKET = 40
 KLINE_INTERVAL = '15m'
+STREAM_MODE = "threads"  # "threads" (one socket thread per group) or "async" (all groups on one asyncio loop)
+STREAM_URL = "wss://stream.binance.com:9443/stream?streams="
+USE_INGEST_QUEUE = True  # single writer thread applies closed klines from a bounded per-symbol queue
+INGEST_QUEUE_SIZE = 2048  # closed klines waiting (all symbols) before the queue starts shedding load
+USE_EXIT_MONITOR = True  # evaluate exits on every bookTicker tick of the held symbol
+EXIT_STREAM = "bookTicker"  # "bookTicker" (best bid) or "trade"
+EXIT_STREAM_URL = "wss://stream.binance.com:9443/ws/"
+RECORD_STREAM_PATH = None  # e.g. "cache/stream.klog" to log every raw frame in async mode for later replay
+REQUEST_WEIGHT_PER_MINUTE = 6000  # exchange REST weight limit shared by the bootstrap workers
+BOOTSTRAP_WORKERS = 16
+BOOTSTRAP_RETRIES = 3
+CANDLE_CACHE_DIR = "cache"  # memory-mapped candle cache per KLINE_INTERVAL for warm restarts (None to disable)
 
 # ======= Account settings =======
 MIN_USDT = 10
@@ -66,6 +84,11 @@ USE_BULLISH_CROSS = True
 USE_MACD_BULLISH = True
 USE_PRICE_ABOVE_ZLSMA = True
 USE_BREAKOUT_CROSS = True
+REQUIRE_ALL_CONDITIONS = False  # buy on any enabled condition (False) or only when all hold (True)
+USE_PRESCREEN = False  # vectorized filters for the required buy conditions before the full checks (needs REQUIRE_ALL_CONDITIONS)
+PRESCREEN_RESISTANCE_PCT = 2.0  # last close at most this % below the BREAKOUT_PERIOD resistance, if the breakout is required (None = off)
+PRESCREEN_MIN_QUOTE_VOLUME = None  # mean USDT volume per bar over PRESCREEN_VOLUME_BARS; a trading rule of its own (None = off)
+PRESCREEN_VOLUME_BARS = 4
 
 # Disabled buy conditions
 USE_RSI_BULLISH_DIVERGENCE = False
@@ -84,5 +107,7 @@ USE_RSI_BEARISH_DIVERGENCE = False
 USE_MACD_BEARISH_DIVERGENCE = False
 USE_BREAKOUT_FAILED = False
 
-MAX_TRADE_USDT = 5000
+MAX_TRADE_USDT = 5000  # shared by all open positions
+MAX_POSITIONS = 3  # concurrent positions; each new one gets the uncommitted budget / free slots
 MIN_TRADE_USDT = 11
+PLACE_ORDERS = False  # buy signals place market orders through the exchange client (False = demo positions only)
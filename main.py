@@ -1,12 +1,17 @@
+import os
 import time
 import threading
 
 import config
+import state
 from state import *
 
 # Trading functions
 from trading.strategy import strategy_loop
-from trading.streaming import bootstrap_history, start_socket_for_group, chunk_list
+from trading.streaming import bootstrap_history, start_socket_for_group, chunk_list, ingest_kline, set_kline_sink
+from trading.ingest import IngestQueue
+from trading.price_window import PriceWindows
+from trading.candles import MappedCandleStore
 from boting.reporter import daily_report_scheduler
 import boting.handlers  # import handlers to register commands/events
 from utils.symbols import get_symbols
@@ -20,10 +25,72 @@ if __name__ == '__main__':
     symbols_info = get_symbols()
     all_symbols = [s['symbol'] for s in symbols_info]
 
+    # Map the previous session's candles so bootstrap only backfills the gap
+    if config.CANDLE_CACHE_DIR:
+        state.candles = MappedCandleStore(
+            os.path.join(config.CANDLE_CACHE_DIR, f"candles_{config.KLINE_INTERVAL}.bin"),
+            capacity=config.MAX_CANDLE_STORE,
+            interval=config.KLINE_INTERVAL,
+        )
+        if state.candles.repaired:
+            print(f"⚠️ Candle cache repaired: {state.candles.repaired}")
+    elif config.STRATEGY_WORKERS:
+        # scan workers map the candles from shared memory instead of the cache file
+        state.candles = MappedCandleStore(
+            f"/dev/shm/candles_{config.KLINE_INTERVAL}_{os.getpid()}.bin",
+            capacity=config.MAX_CANDLE_STORE,
+            interval=config.KLINE_INTERVAL,
+        )
+
+    # Rolling price windows bucketed by candle, over the MONITOR_MINUTES horizon
+    state.price_history = PriceWindows(bucket_sec=config.STEP_SEC, horizon_minutes=config.MONITOR_MINUTES)
+
+    # Socket readers hand closed klines to one writer thread through a bounded
+    # queue; its consumer is started once the history bootstrap is done
+    if config.USE_INGEST_QUEUE:
+        state.ingest_queue = IngestQueue(maxsize=config.INGEST_QUEUE_SIZE)
+        set_kline_sink(state.ingest_queue.put)
+
+    # Exits for the open position are evaluated on every tick of its own stream
+    if config.USE_EXIT_MONITOR:
+        from trading.exit_monitor import ExitMonitor
+        state.exit_monitor = ExitMonitor()
+
     # Split symbols into groups to open separate websocket connections
     symbol_groups = list(chunk_list(all_symbols, config.SYMBOLS_PER_SOCKET))
-    for group in symbol_groups:
-        start_socket_for_group(group)
+
+    def start_streams():
+        if config.STREAM_MODE == "async":
+            # One event loop multiplexes every group's combined-stream connection
+            from trading.async_streaming import start_async_streaming
+            stream_kwargs = {}
+            if config.RECORD_STREAM_PATH:
+                # record raw frames for offline replay (python -m trading.recorder replay <path>)
+                from trading.recorder import FrameRecorder
+                stream_kwargs["ingest"] = FrameRecorder(config.RECORD_STREAM_PATH).tap()
+            start_async_streaming(symbol_groups, **stream_kwargs)
+        else:
+            for group in symbol_groups:
+                start_socket_for_group(group)
+
+    def load_history():
+        # The bootstrap is the only writer of the candles, indicators and price
+        # windows until it returns; only then does the live writer start: the
+        # queue consumer (which applies the klines queued meanwhile) or, without
+        # a queue, the socket readers themselves
+        bootstrap_history(all_symbols)
+        if state.ingest_queue is not None:
+            state.ingest_queue.start(ingest_kline)
+        else:
+            start_streams()
+
+    # With a queue, stream from the start so no candle closing during the
+    # bootstrap is missed
+    if state.ingest_queue is not None:
+        start_streams()
+
+    # Fetch history for all symbols in the background
+    threading.Thread(target=load_history, daemon=True, name="bootstrap").start()
 
     # Start the main trading strategy loop in a background thread
     threading.Thread(target=strategy_loop, daemon=True).start()
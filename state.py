@@ -1,32 +1,41 @@
 from collections import defaultdict, deque
 from decimal import Decimal
 
+from trading.candles import CandleStore
+from trading.price_window import PriceWindows
+from trading.events import CandleCloseEvents
+from trading.positions import PositionBook
+from trading.snapshots import StateDomain
+
 # ========== Trading states ==========
 is_trading_active = False  # Flag to indicate if trading is currently active
-in_position = False        # Flag to indicate if currently holding a trade position
-current_symbol = None      # Symbol currently being traded
+
+# ========== Shared state domains ==========
+# Each has one writer thread; readers get immutable versioned snapshots without locking
+market = StateDomain("market")  # symbol -> (close time, close) of its last closed candle
+positions = PositionBook()  # Open positions by symbol (entry price, amount, committed USDT)
+stats = StateDomain("stats", {
+    "total_profit_loss": Decimal("0"),  # Total P/L across trades
+    "successful_trades": 0,             # Count of successful trades
+    "failed_trades": 0,                 # Count of failed trades
+    "total_trades_today": 0,            # Total trades done today
+    "recent_losses": (),                # (time, loss %) of the losses in the past hour
+})
 
 # ========== Entry and exit data ==========
-last_entry_price = Decimal("0.00")   # Last trade entry price
 last_exit_price = Decimal("0.00")    # Last trade exit price
-last_entry_amount = Decimal("0.00")  # Last trade entry quantity
 last_usdt_amount = Decimal("0.00")   # USDT amount related to last trade
 
-# ========== Profit and loss tracking ==========
-total_profit_loss = Decimal('0')     # Total P/L across trades
-usdt_before = 0.0                    # USDT balance before trade
+# ========== Balance ==========
 balance = 0.0                       # Current account balance (USDT)
-successful_trades = 0               # Count of successful trades
-failed_trades = 0                   # Count of failed trades
-total_trades_today = 0              # Total trades done today
-recent_losses = deque()             # Recent loss amounts for tracking
-
-# ========== Price data ==========
-oldest_price = None                 # Oldest price in tracked history
-newest_price = None                 # Most recent price in tracked history
-price_change = None                # Calculated price change percentage
 
 # ========== Market data storage ==========
 symbols_info_dict = {}              # Dictionary storing info about trading symbols
-candles = defaultdict(lambda: deque(maxlen=120))  # Candle close prices per symbol, maxlen adjustable
-price_history = {}                 # Price history tuples (timestamp, price) per symbol
+candles = CandleStore(capacity=120)  # OHLCV ring buffer per symbol, capacity adjustable
+price_history = PriceWindows(bucket_sec=900, horizon_minutes=1440)  # time-bucketed rolling prices per symbol
+indicators = {}                    # Incremental IndicatorState per symbol, updated on each closed candle
+stale_indicators = set()           # symbols whose IndicatorState has outdated periods; the ingest writer reseeds them
+candle_events = CandleCloseEvents(maxsize=2048)  # symbols with a fresh closed candle, consumed by the strategy
+traces = {}                        # symbol -> latency Trace of its last closed candle, until a buy decision takes it
+ingest_queue = None                 # IngestQueue between socket readers and the candle store, when enabled
+exit_monitor = None                 # ExitMonitor evaluating exits on every tick of the held symbols, when enabled
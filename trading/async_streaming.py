@@ -0,0 +1,211 @@
+# trading/async_streaming.py
+"""
+Asyncio streaming mode: every symbol group gets one combined-stream WebSocket
+connection, and all connections share a single event loop on one thread
+instead of one OS thread per group. Every frame goes through
+trading.streaming.ingest_frame, the same ingestion path the other modes use.
+"""
+import asyncio
+import contextlib
+import io
+import json
+import random
+import threading
+import time
+from collections import deque
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+from trading.streaming import ingest_frame, chunk_list, demo_get_config, state
+
+KLINE_INTERVAL = demo_get_config("KLINE_INTERVAL", "15m")
+SYMBOLS_PER_SOCKET = demo_get_config("SYMBOLS_PER_SOCKET", 40)
+STREAM_URL = demo_get_config("STREAM_URL", "wss://stream.binance.com:9443/stream?streams=")
+
+
+def combined_stream_url(symbols, interval=KLINE_INTERVAL, base_url=STREAM_URL):
+    return base_url + "/".join(f"{s.lower()}@kline_{interval}" for s in symbols)
+
+# -------------------------
+# Throughput / latency accounting
+# -------------------------
+class StreamStats:
+    """
+    Message throughput and per-message ingest latency across all connections.
+    Only touched from the event loop thread, so no locking is needed.
+    """
+
+    def __init__(self, sample_size=10000):
+        self.messages = 0
+        self.errors = 0
+        self.reconnects = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.started = time.perf_counter()
+        self._samples = deque(maxlen=sample_size)
+
+    def record(self, latency):
+        self.messages += 1
+        self.total_latency += latency
+        if latency > self.max_latency:
+            self.max_latency = latency
+        self._samples.append(latency)
+
+    def snapshot(self):
+        elapsed = time.perf_counter() - self.started
+        samples = sorted(self._samples)
+
+        def pct(q):
+            return samples[min(len(samples) - 1, int(q * len(samples)))] * 1e6 if samples else 0.0
+
+        return {
+            "messages": self.messages,
+            "errors": self.errors,
+            "reconnects": self.reconnects,
+            "elapsed_sec": elapsed,
+            "msgs_per_sec": self.messages / elapsed if elapsed > 0 else 0.0,
+            "avg_latency_us": self.total_latency / self.messages * 1e6 if self.messages else 0.0,
+            "p50_latency_us": pct(0.50),
+            "p99_latency_us": pct(0.99),
+            "max_latency_us": self.max_latency * 1e6,
+        }
+
+    def report(self):
+        s = self.snapshot()
+        return (
+            f"📡 Stream stats: {s['messages']} msgs in {s['elapsed_sec']:.2f}s "
+            f"({s['msgs_per_sec']:.0f} msg/s) | ingest latency avg {s['avg_latency_us']:.1f}µs "
+            f"p50 {s['p50_latency_us']:.1f}µs p99 {s['p99_latency_us']:.1f}µs max {s['max_latency_us']:.1f}µs "
+            f"| errors {s['errors']} reconnects {s['reconnects']}"
+        )
+
+# -------------------------
+# Connections
+# -------------------------
+async def run_group(url, stats, ingest=ingest_frame, reconnect=True, reconnect_delay=5):
+    """Read one combined-stream connection, reconnecting on failure unless reconnect=False."""
+    while True:
+        try:
+            async with websockets.connect(url, max_size=None, ping_interval=20) as ws:
+                async for raw in ws:
+                    started = time.perf_counter()
+                    try:
+                        ingest(raw)
+                    except Exception as e:
+                        stats.errors += 1
+                        print(f"[Async Stream] Ingest error: {e}")
+                    stats.record(time.perf_counter() - started)
+        except (OSError, websockets.exceptions.WebSocketException) as e:
+            stats.errors += 1
+            print(f"[Async Stream] Connection error: {e}")
+        if not reconnect:
+            return
+        stats.reconnects += 1
+        await asyncio.sleep(reconnect_delay)
+
+async def stream_groups(symbol_groups, stats=None, base_url=STREAM_URL, interval=KLINE_INTERVAL,
+                        ingest=ingest_frame, reconnect=True):
+    if websockets is None:
+        raise RuntimeError("The 'websockets' package is required for the async streaming mode")
+    stats = stats or StreamStats()
+    await asyncio.gather(*(
+        run_group(combined_stream_url(group, interval, base_url), stats, ingest, reconnect)
+        for group in symbol_groups
+    ))
+    return stats
+
+def start_async_streaming(symbol_groups, **kwargs):
+    """
+    Run every group's connection on one asyncio loop in a single daemon thread.
+    Returns (thread, stats); stats.report() gives the current throughput.
+    """
+    stats = StreamStats()
+
+    def run():
+        try:
+            asyncio.run(stream_groups(symbol_groups, stats=stats, **kwargs))
+        except Exception as e:
+            print(f"❌ Async streaming stopped: {e}")
+
+    t = threading.Thread(target=run, daemon=True, name="kline-streams")
+    t.start()
+    return t, stats
+
+# -------------------------
+# Local stand-in for the exchange stream endpoint
+# -------------------------
+def kline_frame(symbol, open_time_ms, close, interval=KLINE_INTERVAL, closed=True, step_ms=900_000):
+    """Build a combined-stream kline frame in the exchange's wire format."""
+    high = close * (1 + random.uniform(0, 0.005))
+    low = close * (1 - random.uniform(0, 0.005))
+    return json.dumps({
+        "stream": f"{symbol.lower()}@kline_{interval}",
+        "data": {
+            "e": "kline",
+            "E": open_time_ms + step_ms,
+            "s": symbol,
+            "k": {
+                "t": open_time_ms, "T": open_time_ms + step_ms - 1, "s": symbol, "i": interval,
+                "o": f"{close:.8f}", "h": f"{high:.8f}", "l": f"{low:.8f}", "c": f"{close:.8f}",
+                "v": f"{random.uniform(1000, 5000):.2f}", "x": closed,
+            },
+        },
+    }, separators=(",", ":"))
+
+async def serve_replay(frames_by_symbol, host="127.0.0.1", port=0):
+    """
+    Start a local WebSocket server that mimics the combined-stream endpoint.
+    Each connection is sent the frames of the symbols named in its ?streams=
+    query, bar by bar across symbols, and then closed. Returns the server; the
+    bound port is server.sockets[0].getsockname()[1].
+    """
+    by_stream = {s.lower(): frames for s, frames in frames_by_symbol.items()}
+
+    async def handler(ws):
+        request = getattr(ws, "request", None)
+        path = request.path if request is not None else ws.path
+        query = path.split("streams=", 1)[-1]
+        symbols = [name.split("@", 1)[0] for name in query.split("/") if name]
+        rows = [by_stream.get(s, []) for s in symbols]
+        for bar in range(max((len(r) for r in rows), default=0)):
+            for frames in rows:
+                if bar < len(frames):
+                    await ws.send(frames[bar])
+
+    return await websockets.serve(handler, host, port, max_size=None)
+
+def replay_benchmark(n_symbols=400, bars=50, group_size=SYMBOLS_PER_SOCKET, ingest=ingest_frame):
+    """
+    Replay synthetic closed klines for n_symbols through a local stand-in server
+    on one event loop and return the StreamStats.
+    """
+    start_ms = 1_700_000_000_000
+    symbols = [f"SYM{i}USDT" for i in range(n_symbols)]
+    frames = {
+        s: [kline_frame(s, start_ms + b * 900_000, 100.0 + random.uniform(-1, 1)) for b in range(bars)]
+        for s in symbols
+    }
+
+    async def run():
+        server = await serve_replay(frames)
+        port = server.sockets[0].getsockname()[1]
+        stats = StreamStats()
+        await stream_groups(list(chunk_list(symbols, group_size)), stats=stats,
+                            base_url=f"ws://127.0.0.1:{port}/stream?streams=", ingest=ingest, reconnect=False)
+        server.close()
+        await server.wait_closed()
+        return stats
+
+    # handle_kline_message logs every closed kline; keep the benchmark output readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        stats = asyncio.run(run())
+    stored = sum(state.candles.count(s) for s in symbols)
+    print(f"[Replay] {n_symbols} symbols x {bars} bars, {stored} candles stored")
+    return stats
+
+# Run the local replay benchmark when executed directly
+if __name__ == "__main__":
+    print(replay_benchmark().report())
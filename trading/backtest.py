@@ -0,0 +1,369 @@
+# trading/backtest.py
+"""
+Vectorized backtester for the live buy/sell condition set.
+
+Indicators are computed once per symbol as whole float64 arrays with the NumPy
+backend, every entry/exit condition of the strategy becomes a boolean array
+over all bars, and only the trade walk (entry -> first exit) is sequential,
+jumping straight from one entry signal to the next. Entries fill at the
+signal bar's close; TP/SL fill at their level (or the open, if the bar gapped
+through it), other exits at the close. Fees and slippage apply per side.
+
+The per-trade statistics cover every simulated trade. Total return and
+drawdown come from a portfolio run like the live CapitalAllocator: at most
+MAX_POSITIONS trades open at once (later entries are skipped while the book
+is full), each sized at the uncommitted equity / free slots, compounded.
+
+History is a dict {symbol: (6, bars) array} in the candle store's field order
+(open_time, open, high, low, close, volume).
+"""
+import heapq
+import time
+
+import numpy as np
+
+from trading import indicators_np as ind
+from trading.candles import OPEN_TIME, OPEN, HIGH, LOW, CLOSE
+
+ENTRY_FLAGS = ("USE_BULLISH_CROSS", "USE_BELOW_BEFORE", "USE_RSI_CRITICAL", "USE_PRICE_INCREASES_RECENTLY",
+               "USE_EMA_SLOPE", "USE_PRICE_ABOVE_ZLSMA", "USE_MACD_BULLISH", "USE_BREAKOUT_CROSS")
+EXIT_FLAGS = ("USE_TPORSL_CROSS", "USE_CHANDELIER_CROSS", "USE_MACD_BEARISH", "USE_PRICE_BELOW_ZLSMA")
+PERIODS = ("EMA_SHORT", "EMA_LONG", "RSI_PERIOD", "ZLSAMA_PERIOD", "LOOK_BACK", "BREAKOUT_PERIOD",
+           "CHANDELIER_PERIOD", "RSI_OVERSELL", "RSI_OVERBOUGHT")
+MACD_PERIODS = ("MACD_SHORT", "MACD_LONG", "MACD_SIGNAL")
+
+
+def live_params():
+    """The live strategy's condition flags, periods and TP/SL/price-increase settings."""
+    from trading import strategy
+    from trading import indicators
+
+    params = {name: getattr(strategy, name) for name in ENTRY_FLAGS + EXIT_FLAGS + PERIODS}
+    # IndicatorState uses the module MACD periods
+    params.update({name: getattr(indicators, name) for name in MACD_PERIODS})
+    params.update(
+        TP_PCT=float(indicators.TP_PCT),
+        SL_PCT=float(indicators.SL_PCT),
+        MIN_INCREASE=float(strategy.demo_get_config("MIN_INCREASE", 0.5)),
+        MAX_INCREASE=float(strategy.demo_get_config("MAX_INCREASE", 5.0)),
+        MONITOR_BARS=int(strategy.demo_get_config("MONITOR_MINUTES", 1440) * 60
+                         // strategy.demo_get_config("STEP_SEC", 900)),
+        ATR_MULTIPLIER=3,
+        BREAKOUT_THRESHOLD=0.5,
+        MAX_POSITIONS=int(strategy.demo_get_config("MAX_POSITIONS", 3)),
+    )
+    return params
+
+# -------------------------
+# Condition arrays
+# -------------------------
+def _rolling_max(x, window):
+    """out[t] = max(x[t - window + 1 .. t]); NaN until a full window exists."""
+    n = len(x)
+    out = np.full_like(x, np.nan)
+    if n < window:
+        return out
+    # block prefix/suffix maxima (van Herk / Gil-Werman): O(n) for any window
+    blocks = -(-n // window)
+    padded = np.full(blocks * window, -np.inf)
+    padded[:n] = x
+    padded = padded.reshape(blocks, window)
+    prefix = np.maximum.accumulate(padded, axis=1).ravel()
+    suffix = np.maximum.accumulate(padded[:, ::-1], axis=1)[:, ::-1].ravel()
+    out[window - 1:] = np.maximum(suffix[:n - window + 1], prefix[window - 1:n])
+    return out
+
+def _shift(x, k):
+    """x delayed by k bars (NaN / False padded)."""
+    out = np.empty_like(x)
+    fill = False if x.dtype == bool else np.nan
+    out[:k] = fill
+    out[k:] = x[:len(x) - k]
+    return out
+
+def _indicators(ohlcv, p):
+    """Lazily computed indicator arrays for one symbol, shared by the conditions that need them."""
+    c, h, l = ohlcv[CLOSE], ohlcv[HIGH], ohlcv[LOW]
+    n = len(c)
+    cp = p["CHANDELIER_PERIOD"]
+
+    def chandelier():
+        # highest high of the period minus the ATR of the previous period true ranges
+        atr = ind.calculate_atr(h, l, c, cp)
+        out = np.full(n, np.nan)
+        if n > cp + 1:
+            out[cp + 1:] = _rolling_max(h, cp)[cp + 1:] - atr[:n - cp - 1] * p["ATR_MULTIPLIER"]
+        return out
+
+    builders = {
+        "ema_short": lambda: ind.calculate_ema(c, p["EMA_SHORT"]),
+        "ema_long": lambda: ind.calculate_ema(c, p["EMA_LONG"]),
+        "rsi": lambda: ind.calculate_rsi(c, p["RSI_PERIOD"]),
+        "macd": lambda: ind.calculate_macd(c, p["MACD_SHORT"], p["MACD_LONG"], p["MACD_SIGNAL"])[:2],
+        "zlsma": lambda: ind.calculate_zlsma(c, p["ZLSAMA_PERIOD"]),
+        # resistance over the previous BREAKOUT_PERIOD - 1 closes (find_resistance)
+        "resistance": lambda: _shift(_rolling_max(c, p["BREAKOUT_PERIOD"] - 1), 1),
+        "chandelier": chandelier,
+    }
+    cache = {}
+
+    def get(name):
+        if name not in cache:
+            cache[name] = builders[name]()
+        return cache[name]
+    return get
+
+def _macd_cross(get, bullish):
+    macd, signal = get("macd")
+    prev_macd, prev_signal = _shift(macd, 1), _shift(signal, 1)
+    if bullish:
+        return (prev_macd <= prev_signal) & (macd > signal)
+    return (prev_macd >= prev_signal) & (macd < signal)
+
+def _below_before(get, p):
+    # short EMA below long EMA on each of the LOOK_BACK bars ending two bars ago
+    below = (get("ema_short") < get("ema_long")).astype(np.float64)
+    lb = p["LOOK_BACK"]
+    return _shift(np.convolve(below, np.ones(lb))[:len(below)], 2) == lb
+
+def _price_increased(c, p):
+    # change since the first close inside the MONITOR_MINUTES horizon (PriceWindow.pct_change)
+    first = _shift(c, max(1, p["MONITOR_BARS"]) - 1)
+    change = (c - first) / first * 100.0
+    return (p["MIN_INCREASE"] <= change) & (change <= p["MAX_INCREASE"])
+
+CONDITIONS = {
+    "USE_BULLISH_CROSS": lambda c, get, p: (
+        (_shift(get("ema_short"), 1) <= _shift(get("ema_long"), 1)) & (get("ema_short") > get("ema_long"))),
+    "USE_BELOW_BEFORE": lambda c, get, p: _below_before(get, p),
+    "USE_RSI_CRITICAL": lambda c, get, p: (p["RSI_OVERSELL"] <= get("rsi")) & (get("rsi") <= p["RSI_OVERBOUGHT"]),
+    "USE_PRICE_INCREASES_RECENTLY": lambda c, get, p: _price_increased(c, p),
+    "USE_EMA_SLOPE": lambda c, get, p: get("ema_long") > _shift(get("ema_long"), 3),
+    "USE_PRICE_ABOVE_ZLSMA": lambda c, get, p: c > get("zlsma"),
+    "USE_MACD_BULLISH": lambda c, get, p: _macd_cross(get, bullish=True),
+    "USE_BREAKOUT_CROSS": lambda c, get, p: (
+        (c - get("resistance")) / get("resistance") * 100.0 > p["BREAKOUT_THRESHOLD"]),
+    "USE_CHANDELIER_CROSS": lambda c, get, p: c < get("chandelier"),
+    "USE_MACD_BEARISH": lambda c, get, p: _macd_cross(get, bullish=False),
+    "USE_PRICE_BELOW_ZLSMA": lambda c, get, p: c < get("zlsma"),
+}
+
+def condition_arrays(ohlcv, p, flags=None):
+    """
+    The strategy's entry/exit conditions as boolean arrays over all bars, keyed
+    by their USE_* flag. Only `flags` (default: all) and the indicators they
+    need are computed.
+    """
+    get = _indicators(ohlcv, p)
+    c = ohlcv[CLOSE]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return {flag: CONDITIONS[flag](c, get, p) for flag in (flags or CONDITIONS)}
+
+def entry_exit_signals(ohlcv, p, require_all=False, warmup=None):
+    """
+    Combine the enabled conditions like strategy_loop: buy when any enabled
+    entry condition holds (all of them with require_all=True); signal exit when
+    Chandelier, MACD bearish and price below ZLSMA all hold. Bars before
+    `warmup` never enter.
+    """
+    n = ohlcv.shape[1]
+    entry_flags = [f for f in ENTRY_FLAGS if p[f]]
+    # the live indicator exit needs all three of its conditions enabled
+    exit_flags = list(EXIT_FLAGS[1:]) if all(p[f] for f in EXIT_FLAGS[1:]) else []
+    conditions = condition_arrays(ohlcv, p, entry_flags + exit_flags) if entry_flags or exit_flags else {}
+
+    if entry_flags:
+        enabled = [conditions[f] for f in entry_flags]
+        entry = np.logical_and.reduce(enabled) if require_all else np.logical_or.reduce(enabled)
+    else:
+        entry = np.zeros(n, dtype=bool)
+    if warmup is None:
+        warmup = max(p["EMA_LONG"], p["RSI_PERIOD"], 2 * p["ZLSAMA_PERIOD"], p["CHANDELIER_PERIOD"] + 2,
+                     p["BREAKOUT_PERIOD"], p["LOOK_BACK"] + 2)
+    entry[:warmup] = False
+
+    if exit_flags:
+        signal_exit = np.logical_and.reduce([conditions[f] for f in exit_flags])
+    else:
+        signal_exit = np.zeros(n, dtype=bool)
+    return entry, signal_exit
+
+# -------------------------
+# Trade walk
+# -------------------------
+def simulate(symbol, ohlcv, entry, signal_exit, p, fee_pct=0.1, slippage_pct=0.05):
+    """Walk one symbol's signals and return its trades (one position at a time)."""
+    o, h, l, c, t = ohlcv[OPEN], ohlcv[HIGH], ohlcv[LOW], ohlcv[CLOSE], ohlcv[OPEN_TIME]
+    n = len(c)
+    fee, slip = fee_pct / 100.0, slippage_pct / 100.0
+    use_tpsl = p["USE_TPORSL_CROSS"]
+    entries = np.flatnonzero(entry)
+    trades = []
+    k = 0
+    while k < len(entries) and entries[k] < n - 1:
+        e = int(entries[k])
+        entry_price = c[e] * (1 + slip)
+        tp_px = entry_price * (1 + p["TP_PCT"] / 100.0)
+        sl_px = entry_price * (1 + p["SL_PCT"] / 100.0)
+
+        # first exit after the entry bar, scanning in growing blocks
+        x, start, block = n - 1, e + 1, 64
+        hit_sl = hit_tp = None
+        while start < n:
+            end = min(n, start + block)
+            sig = signal_exit[start:end]
+            if use_tpsl:
+                hit_sl, hit_tp = l[start:end] <= sl_px, h[start:end] >= tp_px
+                hit = sig | hit_sl | hit_tp
+            else:
+                hit = sig
+            if hit.any():
+                j = int(hit.argmax())
+                x = start + j
+                break
+            start, block = end, block * 4
+        else:
+            j = None
+
+        if j is None:
+            exit_price, reason = c[x], "end"
+        elif use_tpsl and hit_sl[j]:
+            exit_price, reason = min(o[x], sl_px), "stop_loss"
+        elif use_tpsl and hit_tp[j]:
+            exit_price, reason = max(o[x], tp_px), "take_profit"
+        else:
+            exit_price, reason = c[x], "signal"
+        exit_price *= 1 - slip
+
+        trades.append({
+            "symbol": symbol,
+            "entry_time": int(t[e]),
+            "exit_time": int(t[x]),
+            "entry_price": float(entry_price),
+            "exit_price": float(exit_price),
+            "bars": x - e,
+            "return_pct": float((exit_price * (1 - fee)) / (entry_price * (1 + fee)) * 100.0 - 100.0),
+            "reason": reason,
+        })
+        k = int(np.searchsorted(entries, x, side="right"))
+    return trades
+
+def portfolio(trades, max_positions=3):
+    """
+    Replay `trades` on one account starting at 1.0: a trade is taken only while
+    fewer than `max_positions` are open, with (equity - committed) / free slots,
+    and settles at its exit. Returns (equity after each settled trade, taken).
+    """
+    equity, committed, open_ = 1.0, 0.0, []
+    curve = [equity]
+
+    def settle(until):
+        nonlocal equity, committed
+        while open_ and open_[0][0] <= until:
+            _, _, size, return_pct = heapq.heappop(open_)
+            committed -= size
+            equity += size * return_pct / 100.0
+            curve.append(equity)
+
+    taken = 0
+    for n, tr in enumerate(sorted(trades, key=lambda tr: (tr["entry_time"], tr["exit_time"]))):
+        settle(tr["entry_time"])
+        slots = max_positions - len(open_)
+        if slots <= 0 or equity <= committed:
+            continue
+        size = (equity - committed) / slots
+        committed += size
+        heapq.heappush(open_, (tr["exit_time"], n, size, tr["return_pct"]))
+        taken += 1
+    settle(float("inf"))
+    return np.array(curve), taken
+
+def summarize(trades, max_positions=3):
+    if not trades:
+        return {"trades": 0}
+    returns = np.array([tr["return_pct"] for tr in trades])
+    wins, losses = returns[returns > 0], returns[returns <= 0]
+    equity, taken = portfolio(trades, max_positions)
+    reasons = {}
+    for tr in trades:
+        reasons[tr["reason"]] = reasons.get(tr["reason"], 0) + 1
+    return {
+        "trades": len(returns),
+        "symbols": len({tr["symbol"] for tr in trades}),
+        "win_rate_pct": len(wins) / len(returns) * 100.0,
+        "avg_return_pct": float(returns.mean()),
+        "median_return_pct": float(np.median(returns)),
+        "portfolio_trades": taken,
+        "total_return_pct": float(equity[-1] - 1.0) * 100.0,
+        "profit_factor": float(wins.sum() / -losses.sum()) if losses.sum() < 0 else float("inf"),
+        "max_drawdown_pct": float((1.0 - equity / np.maximum.accumulate(equity)).max()) * 100.0,
+        "avg_bars_held": float(np.mean([tr["bars"] for tr in trades])),
+        "exits": reasons,
+    }
+
+def backtest(history, params=None, fee_pct=0.1, slippage_pct=0.05, require_all=False):
+    """
+    Backtest every symbol in `history` with the live condition set (or
+    `params` overrides). Returns (trades, summary); summary includes the run time.
+    """
+    p = live_params()
+    p.update(params or {})
+    started = time.perf_counter()
+    trades = []
+    for symbol, ohlcv in history.items():
+        ohlcv = np.asarray(ohlcv, dtype=np.float64)
+        entry, signal_exit = entry_exit_signals(ohlcv, p, require_all)
+        trades += simulate(symbol, ohlcv, entry, signal_exit, p, fee_pct, slippage_pct)
+    summary = summarize(trades, p["MAX_POSITIONS"])
+    summary["elapsed_sec"] = time.perf_counter() - started
+    return trades, summary
+
+# -------------------------
+# History sources
+# -------------------------
+def history_from_store(store):
+    """Copy every symbol's candles out of a CandleStore (or the mapped cache)."""
+    return {s: store[s].window().copy() for s in store if store[s].count}
+
+def save_history(path, history):
+    np.savez(path, **history)
+
+def load_history(path):
+    with np.load(path) as data:
+        return {s: data[s] for s in data.files}
+
+def synthetic_history(n_symbols=400, bars=35_040, step_ms=900_000, seed=1):
+    """Random-walk OHLCV for `n_symbols` (default: one year of 15m bars each)."""
+    rng = np.random.default_rng(seed)
+    history = {}
+    t = 1_700_000_000_000 + np.arange(bars, dtype=np.float64) * step_ms
+    for i in range(n_symbols):
+        c = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.004, bars)))
+        o = np.concatenate([[c[0]], c[:-1]])
+        wick = rng.uniform(0, 0.003, (2, bars))
+        h = np.maximum(o, c) * (1 + wick[0])
+        l = np.minimum(o, c) * (1 - wick[1])
+        history[f"SYM{i}USDT"] = np.stack([t, o, h, l, c, rng.uniform(1000, 5000, bars)])
+    return history
+
+# Backtest stored history (or a synthetic year of 15m bars for 400 symbols)
+if __name__ == "__main__":
+    import argparse
+    import contextlib
+    import io
+
+    parser = argparse.ArgumentParser(description="Backtest the live condition set on OHLCV history")
+    parser.add_argument("history", nargs="?", help=".npz written by save_history; omit for synthetic data")
+    parser.add_argument("--fee", type=float, default=0.1, help="fee per side, percent")
+    parser.add_argument("--slippage", type=float, default=0.05, help="slippage per side, percent")
+    parser.add_argument("--require-all", action="store_true", help="enter only when every enabled condition holds")
+    args = parser.parse_args()
+
+    history = load_history(args.history) if args.history else synthetic_history()
+    with contextlib.redirect_stdout(io.StringIO()):
+        params = live_params()
+    trades, summary = backtest(history, params, args.fee, args.slippage, args.require_all)
+    bars = sum(a.shape[1] for a in history.values())
+    print(f"Backtested {len(history)} symbols ({bars} bars) in {summary.pop('elapsed_sec'):.2f}s")
+    for key, value in summary.items():
+        print(f"  {key}: {value:.2f}" if isinstance(value, float) else f"  {key}: {value}")
@@ -0,0 +1,200 @@
+# trading/bootstrap.py
+"""
+Concurrent kline history fetching for cold starts.
+
+Requests run on a thread pool but every request first takes its weight from a
+shared WeightBudget (a token bucket refilled at the exchange's per-minute
+request-weight limit), so the whole USDT universe can be fetched in parallel
+without tripping the exchange's rate limiter. Failed requests are retried with
+exponential backoff; a 429/418 response pauses the whole budget for the
+Retry-After period. Results are yielded as each symbol completes.
+"""
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+KLINES_PATH = "/api/v3/klines"
+REST_URL = "https://api.binance.com"
+
+
+def kline_request_weight(limit):
+    # GET /api/v3/klines costs 2 weight for any limit
+    return 2
+
+
+class RateLimitError(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"rate limited, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class WeightBudget:
+    """Thread-safe token bucket of request weight, refilled continuously."""
+
+    def __init__(self, weight_per_minute=6000):
+        self.capacity = float(weight_per_minute)
+        self.rate = self.capacity / 60.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, weight):
+        """Block until `weight` is available, then take it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._paused_until - now
+                if wait <= 0:
+                    if self._tokens >= weight:
+                        self._tokens -= weight
+                        return
+                    wait = (weight - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Stop handing out weight for `seconds` (server asked us to back off)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def sync(self, used_weight):
+        """Align with the weight the server reports as used this minute."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, self.capacity - float(used_weight))
+
+
+def fetch_klines_http(symbol, interval, limit, base_url=REST_URL, budget=None, timeout=10):
+    """GET klines from a REST endpoint, feeding the reported used weight back into `budget`."""
+    query = urllib.parse.urlencode({"symbol": symbol, "interval": interval, "limit": limit})
+    try:
+        with urllib.request.urlopen(f"{base_url}{KLINES_PATH}?{query}", timeout=timeout) as resp:
+            used = resp.headers.get("X-MBX-USED-WEIGHT-1M")
+            if budget is not None and used is not None:
+                budget.sync(used)
+            return json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        if e.code in (418, 429):
+            raise RateLimitError(float(e.headers.get("Retry-After", 60))) from e
+        raise
+
+
+def fetch_concurrently(symbols, fetch, interval, limit, budget=None, max_workers=16, retries=3, backoff=0.5,
+                       limits=None):
+    """
+    Fetch klines for every symbol on a thread pool under `budget`. `limits`
+    optionally overrides `limit` per symbol (e.g. to backfill only a gap).
+    Yields (symbol, klines, error) in completion order; error is None on success.
+    """
+    budget = budget or WeightBudget()
+    limits = limits or {}
+
+    def fetch_one(symbol):
+        symbol_limit = limits.get(symbol, limit)
+        for attempt in range(retries + 1):
+            budget.acquire(kline_request_weight(symbol_limit))
+            try:
+                return fetch(symbol, interval, symbol_limit)
+            except RateLimitError as e:
+                budget.pause(e.retry_after)
+                if attempt == retries:
+                    raise
+            except Exception:
+                if attempt == retries:
+                    raise
+                time.sleep(backoff * 2 ** attempt * (1 + random.random()))
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bootstrap") as pool:
+        futures = {pool.submit(fetch_one, s): s for s in symbols}
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                yield symbol, future.result(), None
+            except Exception as e:
+                yield symbol, None, e
+
+# -------------------------
+# Local fake klines endpoint
+# -------------------------
+def serve_fake_klines(latency=0.05, failure_rate=0.0, step_ms=900_000, host="127.0.0.1", port=0):
+    """
+    Start a threaded HTTP server answering GET /api/v3/klines with random-walk
+    klines after `latency` seconds; a `failure_rate` share of requests get a
+    500. Returns (server, base_url); call server.shutdown() when done.
+    """
+    used = {"weight": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            time.sleep(latency)
+            url = urllib.parse.urlparse(self.path)
+            params = dict(urllib.parse.parse_qsl(url.query))
+            if url.path != KLINES_PATH or random.random() < failure_rate:
+                self.send_response(500)
+                self.end_headers()
+                return
+            limit = int(params.get("limit", 100))
+            used["weight"] += kline_request_weight(limit)
+            # the last row is the still-open candle, like the real endpoint
+            open_now = int(time.time() * 1000) // step_ms * step_ms
+            price = 100.0
+            rows = []
+            for i in range(limit):
+                open_time = open_now - (limit - 1 - i) * step_ms
+                close = price * (1 + random.uniform(-0.01, 0.01))
+                rows.append([open_time, f"{price:.8f}", f"{max(price, close) * 1.002:.8f}",
+                             f"{min(price, close) * 0.998:.8f}", f"{close:.8f}",
+                             f"{random.uniform(1000, 5000):.2f}", open_time + step_ms - 1])
+                price = close
+            body = json.dumps(rows).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("X-MBX-USED-WEIGHT-1M", str(used["weight"]))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+# Compare sequential and concurrent bootstrap against the fake endpoint
+if __name__ == "__main__":
+    from trading import streaming
+
+    n_symbols, latency = 200, 0.05
+    server, base_url = serve_fake_klines(latency=latency, failure_rate=0.02)
+    symbols = [f"SYM{i}USDT" for i in range(n_symbols)]
+
+    def fetch(symbol, interval, limit):
+        return fetch_klines_http(symbol, interval, limit, base_url=base_url)
+
+    started = time.perf_counter()
+    for s in symbols[:20]:
+        try:
+            fetch(s, "15m", 100)
+        except Exception:
+            pass
+        time.sleep(0.05)
+    sequential = (time.perf_counter() - started) * n_symbols / 20
+
+    started = time.perf_counter()
+    ready = streaming.bootstrap_history(symbols, interval="15m", limit=100, fetch=fetch)
+    concurrent = time.perf_counter() - started
+    server.shutdown()
+    print(f"Sequential (estimated): {sequential:.1f}s | concurrent: {concurrent:.2f}s "
+          f"| {len(ready)}/{n_symbols} symbols ready")
@@ -0,0 +1,452 @@
+# trading/candles.py
+"""
+Columnar OHLCV candle store.
+
+Each symbol gets a preallocated float64 block with one row per field
+(open time, open, high, low, close, volume). Rows are written twice, at slot i
+and slot i + capacity, so the most recent `count` candles are always one
+contiguous slice: indicator code gets zero-copy views and no per-tick lists
+are allocated. Memory per symbol is fixed at 2 * capacity * 6 * 8 bytes.
+
+MappedCandleStore keeps the same layout in a memory-mapped file, one per kline
+interval, so a restart maps the previous session's candles instead of
+re-downloading them.
+"""
+import os
+import time
+
+import numpy as np
+
+FIELDS = ("open_time", "open", "high", "low", "close", "volume")
+OPEN_TIME, OPEN, HIGH, LOW, CLOSE, VOLUME = range(len(FIELDS))
+
+
+class SymbolCandles:
+    """Fixed-capacity OHLCV ring buffer for a single symbol."""
+    __slots__ = ("capacity", "count", "_head", "_data")
+
+    def __init__(self, capacity, data=None):
+        self.capacity = int(capacity)
+        self.count = 0
+        self._head = 0  # slot the next candle is written to
+        if data is None:
+            data = np.zeros((len(FIELDS), 2 * self.capacity), dtype=np.float64)
+        self._data = data
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def nbytes(self):
+        return self._data.nbytes
+
+    def append(self, open_time, open_, high, low, close, volume=0.0):
+        """
+        Store one closed candle. A candle with the same open time as the last
+        one replaces it, an older one is ignored. Returns True only when a new
+        bar was added.
+        """
+        if self.count:
+            last_open_time = self._data[OPEN_TIME, self._head + self.capacity - 1]
+            if open_time < last_open_time:
+                return False
+            if open_time == last_open_time:
+                self._write((self._head - 1) % self.capacity, open_time, open_, high, low, close, volume)
+                return False
+
+        self._write(self._head, open_time, open_, high, low, close, volume)
+        self._head = (self._head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+        return True
+
+    def _write(self, slot, open_time, open_, high, low, close, volume):
+        data = self._data
+        for s in (slot, slot + self.capacity):
+            data[OPEN_TIME, s] = open_time
+            data[OPEN, s] = open_
+            data[HIGH, s] = high
+            data[LOW, s] = low
+            data[CLOSE, s] = close
+            data[VOLUME, s] = volume
+
+    def load(self, klines):
+        """Bulk-load exchange kline rows ([open_time, open, high, low, close, volume, ...])."""
+        for k in klines:
+            volume = k[5] if len(k) > 5 else 0.0
+            self.append(float(k[0]), float(k[1]), float(k[2]), float(k[3]), float(k[4]), float(volume))
+
+    def clear(self):
+        self.count = 0
+        self._head = 0
+
+    # ---- zero-copy views, oldest first ----
+    def view(self, field):
+        end = self._head + self.capacity
+        return self._data[field, end - self.count:end]
+
+    def window(self):
+        """All six columns as a (6, count) view."""
+        end = self._head + self.capacity
+        return self._data[:, end - self.count:end]
+
+    @property
+    def open_times(self):
+        return self.view(OPEN_TIME)
+
+    @property
+    def opens(self):
+        return self.view(OPEN)
+
+    @property
+    def highs(self):
+        return self.view(HIGH)
+
+    @property
+    def lows(self):
+        return self.view(LOW)
+
+    @property
+    def closes(self):
+        return self.view(CLOSE)
+
+    @property
+    def volumes(self):
+        return self.view(VOLUME)
+
+    @property
+    def last_open_time(self):
+        return int(self._data[OPEN_TIME, self._head + self.capacity - 1]) if self.count else None
+
+    @property
+    def last_close(self):
+        return float(self._data[CLOSE, self._head + self.capacity - 1]) if self.count else None
+
+
+class CandleStore:
+    """Per-symbol SymbolCandles, created on first write."""
+
+    def __init__(self, capacity=120):
+        self.capacity = int(capacity)
+        self._symbols = {}
+
+    def __contains__(self, symbol):
+        return symbol in self._symbols
+
+    def __getitem__(self, symbol):
+        return self._symbols[symbol]
+
+    def __iter__(self):
+        return iter(self._symbols)
+
+    def __len__(self):
+        return len(self._symbols)
+
+    def get(self, symbol, default=None):
+        return self._symbols.get(symbol, default)
+
+    def symbol(self, symbol):
+        """Return the symbol's buffer, allocating it if needed."""
+        candles = self._symbols.get(symbol)
+        if candles is None:
+            candles = self._symbols[symbol] = self._allocate(symbol)
+        return candles
+
+    def _allocate(self, symbol):
+        return SymbolCandles(self.capacity)
+
+    def count(self, symbol):
+        candles = self._symbols.get(symbol)
+        return candles.count if candles is not None else 0
+
+    def append(self, symbol, open_time, open_, high, low, close, volume=0.0):
+        return self.symbol(symbol).append(open_time, open_, high, low, close, volume)
+
+    def load(self, symbol, klines):
+        candles = self.symbol(symbol)
+        candles.clear()
+        candles.load(klines)
+        return candles
+
+    @property
+    def nbytes(self):
+        return sum(c.nbytes for c in self._symbols.values())
+
+    def matrix(self, symbols, bars, fields=(CLOSE,)):
+        """
+        The last `bars` candles of each symbol as (len(symbols), bars) float64
+        matrices, one per field, aligned on the newest bar. Symbols with shorter
+        history are NaN-padded on the left; unknown symbols are all NaN.
+        """
+        out = [np.full((len(symbols), bars), np.nan) for _ in fields]
+        get = self._symbols.get
+        for row, symbol in enumerate(symbols):
+            candles = get(symbol)
+            if candles is None or not candles.count:
+                continue
+            n = min(bars, candles.count)
+            end = candles._head + candles.capacity
+            data = candles._data
+            for matrix, field in zip(out, fields):
+                matrix[row, bars - n:] = data[field, end - n:end]
+        return tuple(out)
+
+
+def interval_to_ms(interval):
+    """Kline interval string ('1m', '15m', '4h', '1d', ...) to milliseconds."""
+    units = {"s": 1000, "m": 60_000, "h": 3_600_000, "d": 86_400_000, "w": 604_800_000}
+    return int(interval[:-1]) * units[interval[-1]]
+
+# -------------------------
+# Memory-mapped persistence
+# -------------------------
+CACHE_MAGIC = b"CNDL"
+CACHE_VERSION = 1
+
+# File layout: header | index (one entry per symbol slot) | data blocks
+_HEADER = np.dtype([("magic", "S4"), ("version", "<u4"), ("capacity", "<u4"),
+                    ("max_symbols", "<u4"), ("interval", "S8")])
+_ENTRY = np.dtype([("symbol", "S24"), ("seq", "<u8"), ("head", "<u4"),
+                   ("count", "<u4"), ("last_open_time", "<i8")])
+_PAGE = 4096
+
+
+def _align(n):
+    return (n + _PAGE - 1) // _PAGE * _PAGE
+
+
+class MappedSymbolCandles(SymbolCandles):
+    """
+    SymbolCandles whose buffer lives in the cache file. Every write bumps the
+    index entry's sequence number to odd before touching the data and back to
+    even once head/count/last_open_time are updated, so a crash mid-write is
+    visible on the next open.
+    """
+    __slots__ = ("_entry",)
+
+    def __init__(self, capacity, data, entry):
+        SymbolCandles.__init__(self, capacity, data)
+        self._entry = entry
+        self._head = int(entry["head"]) % self.capacity
+        self.count = min(int(entry["count"]), self.capacity)
+
+    def append(self, open_time, open_, high, low, close, volume=0.0):
+        entry = self._entry
+        entry["seq"] += 1
+        added = SymbolCandles.append(self, open_time, open_, high, low, close, volume)
+        self._commit()
+        return added
+
+    def clear(self):
+        self._entry["seq"] += 1
+        SymbolCandles.clear(self)
+        self._commit()
+
+    def _commit(self):
+        entry = self._entry
+        entry["head"] = self._head
+        entry["count"] = self.count
+        entry["last_open_time"] = self.last_open_time or 0
+        entry["seq"] += entry["seq"] & 1
+
+    @property
+    def torn(self):
+        """True if the last write never completed."""
+        return bool(self._entry["seq"] & 1)
+
+    def repair(self):
+        """
+        Check every stored candle against its mirror copy, for finite values and
+        for strictly increasing open times, and keep the longest valid run.
+        Returns the number of candles dropped.
+        """
+        count, cap = self.count, self.capacity
+        end = self._head + cap
+        slots = np.arange(end - count, end)
+        mirror = np.where(slots >= cap, slots - cap, slots + cap)
+        rows, twins = self._data[:, slots], self._data[:, mirror]
+        valid = np.all((rows == twins) & np.isfinite(rows), axis=0)
+        valid[1:] &= np.diff(rows[OPEN_TIME]) > 0
+
+        # longest run of consecutive valid candles
+        best_start = best_len = run_start = 0
+        for i in range(count + 1):
+            if i == count or not valid[i]:
+                if i - run_start > best_len:
+                    best_start, best_len = run_start, i - run_start
+                run_start = i + 1
+        dropped = count - best_len
+        if dropped or self.torn:
+            self._entry["seq"] += 1
+            self._head = (self._head - (count - best_start - best_len)) % cap
+            self.count = best_len
+            self._commit()
+        return dropped
+
+
+class MappedCandleStore(CandleStore):
+    """
+    CandleStore backed by a memory-mapped file. The header records the file
+    format, capacity and kline interval; the index holds each symbol's name,
+    ring position and last open time. Opening an existing file maps it without
+    copying and repairs any symbol whose last write was torn; a file written
+    with a different layout or interval is recreated.
+    """
+
+    def __init__(self, path, capacity=120, interval="15m", max_symbols=1024):
+        super().__init__(capacity)
+        self.path = path
+        self.interval = interval
+        self.max_symbols = int(max_symbols)
+        self.repaired = {}  # symbol -> candles dropped by the integrity check
+        self._next_slot = 0
+
+        index_offset = _align(_HEADER.itemsize)
+        data_offset = index_offset + _align(_ENTRY.itemsize * self.max_symbols)
+        block = (len(FIELDS), 2 * self.capacity)
+        size = data_offset + self.max_symbols * block[0] * block[1] * 8
+
+        created = not self._valid_file(size)
+        if created:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(path, "wb") as f:
+                f.truncate(size)
+
+        self._header = np.memmap(path, dtype=_HEADER, mode="r+", shape=(1,))
+        self._index = np.memmap(path, dtype=_ENTRY, mode="r+", offset=index_offset, shape=(self.max_symbols,))
+        self._blocks = np.memmap(path, dtype=np.float64, mode="r+", offset=data_offset,
+                                 shape=(self.max_symbols,) + block)
+        if created:
+            self._header[0] = (CACHE_MAGIC, CACHE_VERSION, self.capacity, self.max_symbols, interval.encode())
+            self.flush()
+        else:
+            self._load_index()
+
+    def _valid_file(self, size):
+        if not os.path.exists(self.path) or os.path.getsize(self.path) != size:
+            return False
+        header = np.fromfile(self.path, dtype=_HEADER, count=1)
+        if len(header) != 1:
+            return False
+        h = header[0]
+        return (h["magic"] == CACHE_MAGIC and h["version"] == CACHE_VERSION
+                and h["capacity"] == self.capacity and h["max_symbols"] == self.max_symbols
+                and h["interval"] == self.interval.encode())
+
+    def _load_index(self):
+        for slot in range(self.max_symbols):
+            entry = self._index[slot]
+            name = bytes(entry["symbol"])
+            if not name:
+                break
+            self._next_slot = slot + 1
+            try:
+                symbol = name.decode("ascii")
+            except UnicodeDecodeError:
+                continue
+            candles = MappedSymbolCandles(self.capacity, self._blocks[slot], entry)
+            dropped = candles.repair()
+            if dropped:
+                self.repaired[symbol] = dropped
+            self._symbols[symbol] = candles
+
+    def _allocate(self, symbol):
+        if self._next_slot >= self.max_symbols:
+            print(f"⚠️ Candle cache full, keeping {symbol} in memory only")
+            return SymbolCandles(self.capacity)
+        slot = self._next_slot
+        self._next_slot += 1
+        entry = self._index[slot]
+        entry["seq"] = 0
+        entry["head"] = entry["count"] = entry["last_open_time"] = 0
+        entry["symbol"] = symbol.encode("ascii")
+        return MappedSymbolCandles(self.capacity, self._blocks[slot], entry)
+
+    def last_open_times(self):
+        """Header index view: {symbol: last stored open time in ms}."""
+        return {s: c.last_open_time for s, c in self._symbols.items() if c.count}
+
+    def flush(self):
+        """Write dirty pages back to disk (the OS does this on its own too)."""
+        for mm in (self._header, self._index, self._blocks):
+            mm.flush()
+
+    def close(self):
+        self.flush()
+        self._symbols.clear()
+        del self._header, self._index, self._blocks
+
+class MappedCandleReader:
+    """
+    Read-only view of a MappedCandleStore file for other processes. Each
+    symbol is copied under the writer's sequence number: a symbol whose write
+    is in progress, or that changes while being copied, is read again after a
+    short backoff. A symbol still not read consistently after `retries`
+    attempts is left out (all NaN, like an unknown symbol) and counted in
+    `skipped`, rather than returned torn.
+    """
+
+    def __init__(self, path, retries=100):
+        header = np.fromfile(path, dtype=_HEADER, count=1)
+        if len(header) != 1 or header[0]["magic"] != CACHE_MAGIC or header[0]["version"] != CACHE_VERSION:
+            raise ValueError(f"{path} is not a version {CACHE_VERSION} candle cache")
+        self.path = path
+        self.capacity = int(header[0]["capacity"])
+        self.max_symbols = int(header[0]["max_symbols"])
+        self.retries = retries
+        index_offset = _align(_HEADER.itemsize)
+        data_offset = index_offset + _align(_ENTRY.itemsize * self.max_symbols)
+        self._index = np.memmap(path, dtype=_ENTRY, mode="r", offset=index_offset, shape=(self.max_symbols,))
+        self._blocks = np.memmap(path, dtype=np.float64, mode="r", offset=data_offset,
+                                 shape=(self.max_symbols, len(FIELDS), 2 * self.capacity))
+        self._seq = self._index["seq"]
+        self._slots = {}
+        self._scanned = 0
+        self.skipped = 0
+
+    def _slot(self, symbol):
+        slot = self._slots.get(symbol)
+        if slot is None:
+            # pick up symbols the writer allocated since the last lookup
+            names = self._index["symbol"]
+            while self._scanned < self.max_symbols and names[self._scanned]:
+                self._slots[names[self._scanned].decode("ascii", "replace")] = self._scanned
+                self._scanned += 1
+            slot = self._slots.get(symbol)
+        return slot
+
+    def matrix(self, symbols, bars, fields=(CLOSE,)):
+        """Same as CandleStore.matrix, read consistently from the shared file."""
+        out = [np.full((len(symbols), bars), np.nan) for _ in fields]
+        seq, index, blocks, cap = self._seq, self._index, self._blocks, self.capacity
+        for row, symbol in enumerate(symbols):
+            slot = self._slot(symbol)
+            if slot is None:
+                continue
+            for attempt in range(self.retries):
+                if attempt:
+                    _backoff(attempt)
+                before = seq[slot]
+                if before & 1:
+                    continue
+                entry = index[slot]
+                n = min(bars, int(entry["count"]), cap)
+                end = int(entry["head"]) % cap + cap
+                for matrix, field in zip(out, fields):
+                    matrix[row, bars - n:] = blocks[slot, field, end - n:end]
+                if seq[slot] == before:
+                    break
+            else:
+                for matrix in out:
+                    matrix[row] = np.nan
+                self.skipped += 1
+                print(f"⚠️ Candle cache: skipped {symbol}, still being written after {self.retries} reads")
+        return tuple(out)
+
+
+def _backoff(attempt):
+    """Yield the CPU for the first retries, then sleep 16µs, 32µs, ... up to 1ms."""
+    time.sleep(0 if attempt < 4 else min(1e-3, 1e-6 * (1 << min(attempt, 10))))
+
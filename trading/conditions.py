@@ -0,0 +1,141 @@
+# trading/conditions.py
+"""
+Short-circuiting condition chains for the strategy's buy and sell rules.
+
+A ConditionPipeline holds the enabled conditions in evaluation order and stops
+as soon as the outcome is known: at the first true condition when any one is
+enough (the live rule), at the first false one when all are required. Each
+condition times itself and counts its hits, and every `reorder_every`
+evaluations the chain is re-sorted so the conditions most likely to decide
+the outcome per nanosecond run first: cost / P(true) for "any",
+cost / P(false) for "all". A pipeline is itself a condition, so an AND group
+can sit inside an OR chain.
+
+Hit rates are conditional on reaching the condition: a condition behind one
+that usually decides is sampled less often, which is what the ordering needs.
+"""
+import time
+
+
+class Condition:
+    """
+    One named predicate over an evaluation context. `label` is the reason text
+    (or a function of the context returning it); `cost_ns` is the prior cost
+    estimate used until enough timings exist.
+    """
+    __slots__ = ("name", "label", "predicate", "prior_cost_ns", "evaluations", "hits", "total_ns")
+
+    # prior weight, in evaluations, of the static cost / 50% hit-rate estimates
+    PRIOR = 8
+
+    def __init__(self, name, predicate, label=None, cost_ns=1000):
+        self.name = name
+        self.predicate = predicate
+        self.label = label if label is not None else name
+        self.prior_cost_ns = cost_ns
+        self.evaluations = 0
+        self.hits = 0
+        self.total_ns = 0
+
+    def test(self, ctx, reasons):
+        if self.predicate(ctx):
+            label = self.label
+            reasons.append(label(ctx) if callable(label) else label)
+            return True
+        return False
+
+    @property
+    def hit_rate(self):
+        return (self.hits + self.PRIOR * 0.5) / (self.evaluations + self.PRIOR)
+
+    @property
+    def cost_ns(self):
+        return (self.total_ns + self.PRIOR * self.prior_cost_ns) / (self.evaluations + self.PRIOR)
+
+    def rank_key(self, require_all):
+        """Expected cost per decisive outcome; lower runs earlier."""
+        decisive = 1.0 - self.hit_rate if require_all else self.hit_rate
+        return self.cost_ns / max(decisive, 1e-6)
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "evaluations": self.evaluations,
+            "hit_rate_pct": self.hits / self.evaluations * 100.0 if self.evaluations else None,
+            "avg_cost_us": self.total_ns / self.evaluations / 1e3 if self.evaluations else None,
+        }
+
+
+class ConditionPipeline(Condition):
+    """Ordered chain of conditions combined with any() or all()."""
+    __slots__ = ("conditions", "require_all", "reorder_every", "_since_reorder")
+
+    def __init__(self, name, conditions, require_all=False, reorder_every=256):
+        super().__init__(name, None, cost_ns=sum(c.prior_cost_ns for c in conditions) or 1000)
+        self.conditions = list(conditions)
+        self.require_all = require_all
+        self.reorder_every = reorder_every
+        self._since_reorder = 0
+        self.reorder()
+
+    def __len__(self):
+        return len(self.conditions)
+
+    def evaluate(self, ctx):
+        """Return (decision, reasons) for `ctx`; an empty pipeline never fires."""
+        reasons = []
+        return self.test(ctx, reasons), reasons
+
+    def test(self, ctx, reasons):
+        if not self.conditions:
+            return False
+        require_all = self.require_all
+        found = []
+        decision = require_all
+        clock = time.perf_counter_ns
+        for condition in self.conditions:
+            started = clock()
+            hit = condition.test(ctx, found)
+            condition.total_ns += clock() - started
+            condition.evaluations += 1
+            if hit:
+                condition.hits += 1
+                if not require_all:
+                    decision = True
+                    break
+            elif require_all:
+                decision = False
+                break
+
+        self._since_reorder += 1
+        if self._since_reorder >= self.reorder_every:
+            self.reorder()
+        if decision:
+            reasons += found
+        return decision
+
+    def reorder(self):
+        self._since_reorder = 0
+        self.conditions.sort(key=lambda c: c.rank_key(self.require_all))
+
+    def stats(self):
+        """Per-condition stats in current evaluation order (nested groups flattened under their name)."""
+        rows = []
+        for condition in self.conditions:
+            row = Condition.stats(condition)
+            row["rank_key"] = condition.rank_key(self.require_all)
+            rows.append(row)
+            if isinstance(condition, ConditionPipeline):
+                rows += [dict(r, name=f"{condition.name} / {r['name']}") for r in condition.stats()]
+        return rows
+
+    def report(self):
+        mode = "all" if self.require_all else "any"
+        lines = [f"🧮 {self.name} ({mode} of {len(self.conditions)}):"]
+        for row in self.stats():
+            if row["evaluations"]:
+                lines.append(f"  {row['name']}: {row['evaluations']} evals, hit {row['hit_rate_pct']:.1f}%, "
+                             f"{row['avg_cost_us']:.2f}µs")
+            else:
+                lines.append(f"  {row['name']}: not evaluated yet")
+        return "\n".join(lines)
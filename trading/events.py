@@ -0,0 +1,113 @@
+# trading/events.py
+"""
+Candle-close events from the streaming layer to the strategy.
+
+The streaming side publishes a symbol when one of its candles closes; the
+strategy blocks on the queue and evaluates only the symbols that changed.
+A symbol that is already waiting is not queued again (its earliest receipt
+time is kept), so the queue never holds more than one event per symbol.
+"""
+import queue
+import threading
+import time
+from collections import deque
+
+
+class LatencyStats:
+    """Receipt-to-decision latency samples (seconds), reported in microseconds."""
+
+    def __init__(self, sample_size=10000):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._samples = deque(maxlen=sample_size)
+        self._lock = threading.Lock()
+
+    def record(self, latency):
+        with self._lock:
+            self.count += 1
+            self.total += latency
+            if latency > self.max:
+                self.max = latency
+            self._samples.append(latency)
+
+    def snapshot(self):
+        with self._lock:
+            samples = sorted(self._samples)
+            count, total, max_latency = self.count, self.total, self.max
+
+        def pct(q):
+            return samples[min(len(samples) - 1, int(q * len(samples)))] * 1e6 if samples else 0.0
+
+        return {
+            "count": count,
+            "avg_us": total / count * 1e6 if count else 0.0,
+            "p50_us": pct(0.50),
+            "p99_us": pct(0.99),
+            "max_us": max_latency * 1e6,
+        }
+
+
+class CandleCloseEvents:
+    """Bounded queue of candle-close events plus the set of dirty symbols."""
+
+    def __init__(self, maxsize=2048):
+        self._queue = queue.Queue(maxsize)
+        self._dirty = {}  # symbol -> perf_counter() receipt time of its oldest pending close
+        self._lock = threading.Lock()
+        self.published = 0
+        self.coalesced = 0
+        self.overflowed = 0
+        self.latency = LatencyStats()
+
+    def publish(self, symbol, received=None):
+        """
+        Mark `symbol` dirty. `received` is the perf_counter() time the kline
+        arrived; leave it None for changes that did not come off the wire.
+        """
+        with self._lock:
+            self.published += 1
+            if symbol in self._dirty:
+                self.coalesced += 1
+                return
+            self._dirty[symbol] = received
+        try:
+            self._queue.put_nowait(symbol)
+        except queue.Full:
+            # the symbol stays in the dirty set and goes out with the next drain
+            self.overflowed += 1
+
+    def drain(self, timeout=None):
+        """
+        Wait up to `timeout` seconds for an event, then take every dirty symbol.
+        Returns {symbol: receipt time or None}, empty on timeout.
+        """
+        try:
+            self._queue.get(timeout=timeout)
+        except queue.Empty:
+            pass
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+        return dirty
+
+    def decided(self, received):
+        """Record receipt-to-decision latency for one evaluated symbol."""
+        if received is not None:
+            self.latency.record(time.perf_counter() - received)
+
+    def pending(self):
+        with self._lock:
+            return len(self._dirty)
+
+    def report(self):
+        s = self.latency.snapshot()
+        return (
+            f"⏱ Candle close → decision: {s['count']} evals | avg {s['avg_us']:.0f}µs "
+            f"p50 {s['p50_us']:.0f}µs p99 {s['p99_us']:.0f}µs max {s['max_us']:.0f}µs "
+            f"| coalesced {self.coalesced} overflowed {self.overflowed}"
+        )
@@ -0,0 +1,232 @@
+# trading/exit_monitor.py
+"""
+Low-latency exit engine for the open positions.
+
+For every open position, ExitMonitor subscribes to the symbol's bookTicker
+(or trade) stream and evaluates the exit conditions on every tick: TP/SL
+against the live price, plus the Chandelier / MACD bearish / ZLSMA exit from
+the symbol's incremental indicators. When one fires it calls
+place_market_sell_order itself, without waiting for the strategy scan or a
+REST ticker round trip. Tick-to-decision latency is recorded per tick.
+"""
+import asyncio
+import json
+import random
+import threading
+import time
+from decimal import Decimal
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+from trading.events import LatencyStats
+from trading.indicators import hit_tp_or_sl
+from trading.streaming import demo_get_config, state
+
+EXIT_STREAM = demo_get_config("EXIT_STREAM", "bookTicker")  # "bookTicker" (best bid) or "trade"
+EXIT_STREAM_URL = demo_get_config("EXIT_STREAM_URL", "wss://stream.binance.com:9443/ws/")
+# Exit condition flags and their defaults; read from config on every tick, so
+# a change from Telegram applies to the positions already being watched
+EXIT_FLAGS = (
+    ("USE_TPORSL_CROSS", True),
+    ("USE_CHANDELIER_CROSS", False),
+    ("USE_MACD_BEARISH", False),
+    ("USE_PRICE_BELOW_ZLSMA", False),
+)
+
+# Price field of each stream's payload: best bid for bookTicker, last price for trade
+_PRICE_KEYS = {"bookTicker": ('"b":"', b'"b":"'), "trade": ('"p":"', b'"p":"')}
+
+
+def parse_tick(frame, stream=EXIT_STREAM):
+    """Price from a bookTicker/trade frame (str or bytes), or None if it has none."""
+    key = _PRICE_KEYS[stream][isinstance(frame, bytes)]
+    i = frame.find(key)
+    if i < 0:
+        return None
+    i += 5
+    return float(frame[i:frame.find(key[-1:], i)])
+
+
+def exit_reasons(symbol, entry_price, price):
+    """Exit reasons for the held position at `price`; empty if it should stay open."""
+    reasons = []
+    use_tporsl, use_chandelier, use_macd_bearish, use_below_zlsma = (
+        demo_get_config(name, default) for name, default in EXIT_FLAGS)
+    if use_tporsl and entry_price and hit_tp_or_sl(entry_price, Decimal(repr(price))):
+        reasons.append("🎯 Take Profit / Stop Loss Cross")
+        return reasons
+
+    ind = getattr(state, "indicators", {}).get(symbol)
+    if ind is None or len(ind.macd) < 2 or not ind.zlsma:
+        return reasons
+    chandelier_cross = ind.chandelier is not None and price < ind.chandelier
+    macd_bearish = ind.macd[-2] >= ind.signal[-2] and ind.macd[-1] < ind.signal[-1]
+    price_below_zlsma = price < ind.zlsma[-1]
+    if (use_chandelier and chandelier_cross and use_macd_bearish and macd_bearish
+            and use_below_zlsma and price_below_zlsma):
+        reasons += ["💡 Chandelier Exit", "📉 MACD Bearish", "⬇️ Price Below ZLSMA"]
+    return reasons
+
+
+class ExitMonitor:
+    """
+    Watches any number of symbols, one stream each, on its own asyncio loop
+    thread. watch() and unwatch() may be called from any thread. The sell
+    runs off the tick loop: the one given to watch() for that symbol, else
+    `sell`, else trading.orders.place_market_sell_order.
+    """
+
+    def __init__(self, base_url=EXIT_STREAM_URL, stream=EXIT_STREAM, sell=None):
+        self.base_url = base_url
+        self.stream = stream
+        self.latency = LatencyStats()
+        self.ticks = 0
+        self.exits = 0
+        self.entry_prices = {}  # symbol -> entry price of each watched position
+        self._sell = sell
+        self._sells = {}  # symbol -> sell callback given to watch()
+        self._tasks = {}
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True, name="exit-monitor")
+        self._thread.start()
+
+    def watch(self, symbol, entry_price, sell=None):
+        """
+        Start evaluating exits for `symbol` on every tick. `sell(symbol)`
+        overrides the monitor's sell for this position (e.g. a demo position
+        that must only leave the book).
+        """
+        if websockets is None:
+            raise RuntimeError("The 'websockets' package is required for the exit monitor")
+        self._loop.call_soon_threadsafe(self._start, symbol, Decimal(str(entry_price)), sell)
+
+    def unwatch(self, symbol=None):
+        """Stop watching `symbol` (every symbol if None)."""
+        self._loop.call_soon_threadsafe(self._stop, symbol)
+
+    def watching(self, symbol):
+        return symbol in self.entry_prices
+
+    def _start(self, symbol, entry_price, sell=None):
+        self._stop(symbol)
+        self.entry_prices[symbol] = entry_price
+        if sell is not None:
+            self._sells[symbol] = sell
+        self._tasks[symbol] = self._loop.create_task(self._run(symbol))
+
+    def _stop(self, symbol=None):
+        for s in ([symbol] if symbol is not None else list(self._tasks)):
+            task = self._tasks.pop(s, None)
+            if task is not None:
+                task.cancel()
+            self.entry_prices.pop(s, None)
+            self._sells.pop(s, None)
+
+    async def _run(self, symbol):
+        url = f"{self.base_url}{symbol.lower()}@{self.stream}"
+        try:
+            while symbol in self.entry_prices:
+                try:
+                    async with websockets.connect(url, ping_interval=20) as ws:
+                        async for raw in ws:
+                            if self.on_tick(symbol, raw, time.perf_counter()):
+                                return
+                except (OSError, websockets.exceptions.WebSocketException) as e:
+                    print(f"[Exit Monitor] Connection error for {symbol}: {e}")
+                    await asyncio.sleep(1)
+                except Exception as e:
+                    # a bad frame or a failing exit check must not end the watch
+                    print(f"[Exit Monitor] Error watching {symbol}: {e}")
+                    await asyncio.sleep(1)
+        finally:
+            # however the task ends, a symbol without a running task is not watched,
+            # so the strategy scan takes its exits over (unless a newer watch replaced it)
+            if self._tasks.get(symbol) is asyncio.current_task():
+                self._tasks.pop(symbol, None)
+                self.entry_prices.pop(symbol, None)
+                self._sells.pop(symbol, None)
+
+    def on_tick(self, symbol, raw, received):
+        """Evaluate one tick; returns True once a sell has been triggered."""
+        price = parse_tick(raw, self.stream)
+        entry_price = self.entry_prices.get(symbol)
+        if price is None or entry_price is None:
+            return False
+        self.ticks += 1
+        reasons = exit_reasons(symbol, entry_price, price)
+        self.latency.record(time.perf_counter() - received)
+        if not reasons:
+            return False
+
+        self.exits += 1
+        self.entry_prices.pop(symbol, None)
+        self._tasks.pop(symbol, None)
+        sell = self._sells.pop(symbol, None) or self._sell
+        print(f"🔻 Exit for {symbol} at {price}: " + ", ".join(reasons))
+        self._loop.run_in_executor(None, self._place_sell, symbol, sell)
+        return True
+
+    def _place_sell(self, symbol, sell=None):
+        if sell is None:
+            from trading.orders import place_market_sell_order as sell
+        try:
+            sell(symbol)
+        except Exception as e:
+            print(f"❌ [Exit Monitor] Sell failed for {symbol}: {e}")
+
+    def report(self):
+        s = self.latency.snapshot()
+        return (
+            f"🛡 Exit monitor: {len(self.entry_prices)} watched, {self.ticks} ticks, {self.exits} exits | tick → decision "
+            f"avg {s['avg_us']:.1f}µs p50 {s['p50_us']:.1f}µs p99 {s['p99_us']:.1f}µs max {s['max_us']:.1f}µs"
+        )
+
+    def close(self):
+        self._loop.call_soon_threadsafe(self._stop, None)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+# -------------------------
+# Local stand-in for the exchange tick stream
+# -------------------------
+def book_ticker_frame(symbol, bid, spread=0.0005):
+    return json.dumps({"u": random.randint(1, 1 << 40), "s": symbol, "b": f"{bid:.8f}", "B": "1.0",
+                       "a": f"{bid * (1 + spread):.8f}", "A": "1.0"}, separators=(",", ":"))
+
+async def serve_ticks(start_price, drift=-0.0002, interval=0.001, host="127.0.0.1", port=0):
+    """
+    Local WebSocket server streaming bookTicker frames for whatever symbol the
+    path names, as a random walk from `start_price` with a per-tick `drift`.
+    """
+    async def handler(ws):
+        request = getattr(ws, "request", None)
+        path = request.path if request is not None else ws.path
+        symbol = path.rsplit("/", 1)[-1].split("@", 1)[0].upper()
+        price = start_price
+        try:
+            while True:
+                price *= 1 + drift + random.uniform(-0.0005, 0.0005)
+                await ws.send(book_ticker_frame(symbol, price))
+                await asyncio.sleep(interval)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+    return await websockets.serve(handler, host, port)
+
+# Drive the monitor against the stand-in until the stop loss fires
+if __name__ == "__main__":
+    done = threading.Event()
+
+    def demo_sell(symbol):
+        print(f"[DEMO] Would place market sell order for {symbol}")
+        done.set()
+
+    monitor = ExitMonitor(sell=demo_sell)
+    server = asyncio.run_coroutine_threadsafe(serve_ticks(100.0), monitor._loop).result()
+    monitor.base_url = f"ws://127.0.0.1:{server.sockets[0].getsockname()[1]}/ws/"
+    monitor.watch("DEMOUSDT", 100.0)
+    done.wait(timeout=60)
+    print(monitor.report())
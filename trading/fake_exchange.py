@@ -0,0 +1,74 @@
+# trading/fake_exchange.py
+"""
+Local stand-in for the exchange client, with injected latency.
+
+FakeExchange has the client methods the order path calls (balances, ticker,
+market orders) and answers in the same shapes, after sleeping the latency
+configured for that endpoint (plus random jitter). Orders fill at the set
+price and move the balances, so a buy followed by a sell round-trips.
+Install it with `trading.orders.exchange = FakeExchange(...)`.
+"""
+import random
+import threading
+import time
+from collections import Counter
+from decimal import Decimal
+
+
+class FakeExchange:
+    """
+    `latency` is seconds per call, either one number for every endpoint or
+    {method name: seconds}; `jitter` adds uniform 0..jitter seconds.
+    """
+
+    def __init__(self, prices=None, balances=None, latency=0.0, jitter=0.0, seed=None):
+        self.prices = {s: Decimal(str(p)) for s, p in (prices or {}).items()}
+        self.balances = {a: Decimal(str(b)) for a, b in (balances or {"USDT": "1000"}).items()}
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = Counter()
+        self.waited = 0.0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def set_price(self, symbol, price):
+        self.prices[symbol] = Decimal(str(price))
+
+    def _wait(self, endpoint):
+        latency = self.latency.get(endpoint, 0.0) if isinstance(self.latency, dict) else self.latency
+        if self.jitter:
+            latency += self._random.uniform(0, self.jitter)
+        self.calls[endpoint] += 1
+        self.waited += latency
+        if latency > 0:
+            time.sleep(latency)
+
+    def get_asset_balance(self, asset="USDT"):
+        self._wait("get_asset_balance")
+        return {"asset": asset, "free": str(self.balances.get(asset, Decimal("0")))}
+
+    def get_symbol_ticker(self, symbol):
+        self._wait("get_symbol_ticker")
+        return {"symbol": symbol, "price": str(self.prices[symbol])}
+
+    def _fill(self, symbol, quantity, side):
+        price, qty = self.prices[symbol], Decimal(str(quantity))
+        base = symbol.replace("USDT", "")
+        with self._lock:
+            cost = price * qty
+            self.balances["USDT"] = self.balances.get("USDT", Decimal("0")) + (cost if side == "SELL" else -cost)
+            self.balances[base] = self.balances.get(base, Decimal("0")) + (-qty if side == "SELL" else qty)
+        return {"symbol": symbol, "side": side, "status": "FILLED", "executedQty": str(qty),
+                "fills": [{"price": str(price), "qty": str(qty)}]}
+
+    def order_market_buy(self, symbol, quantity):
+        self._wait("order_market_buy")
+        return self._fill(symbol, quantity, "BUY")
+
+    def order_market_sell(self, symbol, quantity):
+        self._wait("order_market_sell")
+        return self._fill(symbol, quantity, "SELL")
+
+    def report(self):
+        calls = ", ".join(f"{name} {n}" for name, n in self.calls.items())
+        return f"🧪 Fake exchange: {sum(self.calls.values())} calls ({calls}), {self.waited:.2f}s injected latency"
@@ -0,0 +1,181 @@
+# trading/fast_decode.py
+"""
+Fast decoder for kline WebSocket frames.
+
+Frames are scanned with str/bytes .find() for the handful of fields the candle
+store needs (symbol, open time, OHLCV). No JSON parse, no dicts, no Decimals.
+In-progress klines are rejected with a substring check before anything else
+is looked at. Works on both bytes and str frames.
+"""
+
+# Field tokens in the exchange's kline payload, for bytes and str frames
+_TOKENS = {
+    bytes: (b'"x":true', b'"x":false', b'"s":"', b'"t":', b'"o":"', b'"h":"', b'"l":"', b'"c":"', b'"v":"', b'"', b','),
+    str: ('"x":true', '"x":false', '"s":"', '"t":', '"o":"', '"h":"', '"l":"', '"c":"', '"v":"', '"', ','),
+}
+
+# bytes symbol -> str symbol, so the store key is built once per symbol
+_SYMBOLS = {}
+
+
+def decode_kline(frame):
+    """
+    Decode a closed kline frame into
+    (symbol, open_time_ms, open, high, low, close, volume).
+
+    Returns None for in-progress klines and raises ValueError for anything the
+    scanner cannot read (other events, unexpected formatting), so callers can
+    fall back to a full JSON parse instead of silently dropping a candle.
+    """
+    closed, open_, s_key, t_key, o_key, h_key, l_key, c_key, v_key, quote, comma = _TOKENS[type(frame)]
+    if closed not in frame:
+        if open_ in frame:
+            return None
+        raise ValueError("not a compact kline frame")
+    find = frame.find
+
+    i = find(s_key)
+    if i < 0:
+        raise ValueError("kline frame has no symbol")
+    i += 5
+    symbol = frame[i:find(quote, i)]
+    if type(symbol) is bytes:
+        cached = _SYMBOLS.get(symbol)
+        if cached is None:
+            cached = _SYMBOLS[symbol] = symbol.decode()
+        symbol = cached
+
+    i = find(t_key)
+    if i < 0:
+        raise ValueError("kline frame has no open time")
+    i += 4
+    open_time = int(frame[i:find(comma, i)])
+
+    values = []
+    for key in (o_key, h_key, l_key, c_key, v_key):
+        i = find(key)
+        if i < 0:
+            raise ValueError("kline frame is missing an OHLCV field")
+        i += 5
+        values.append(float(frame[i:find(quote, i)]))
+    return (symbol, open_time, *values)
+
+def decode_klines(frames):
+    """Batch decode: closed klines from `frames`, skipping everything else."""
+    out = []
+    append = out.append
+    for frame in frames:
+        try:
+            kline = decode_kline(frame)
+        except ValueError:
+            continue
+        if kline is not None:
+            append(kline)
+    return out
+
+# -------------------------
+# Microbenchmark: dict/Decimal path vs fast path
+# -------------------------
+def _baseline_handle_kline_message(msg, state, MAX_CANDLE_STORE=500, REQUIRED_BARS=300, MONITOR_MINUTES=60):
+    """
+    The benchmark's baseline: streaming.handle_kline_message as it was before
+    the fast path, verbatim apart from `state` and the streaming.py settings
+    (at their demo defaults) being passed in. It writes Decimal closes into
+    deques, so it needs a state with `candles = {}` and `price_history = {}`.
+    """
+    from collections import deque
+    from decimal import Decimal
+    import random
+    import time
+    try:
+        # Demo message sanity: ensure kline structure exists
+        if not isinstance(msg, dict):
+            return
+
+        # support both full 'data' wrapper and raw kline dict for demo
+        data = msg.get('data', msg)
+        if data.get('e') and data['e'] != 'kline':
+            return
+
+        k = data.get('k', data)
+        is_closed = k.get('x', True)
+        if not is_closed:
+            return
+
+        symbol = data.get('s', k.get('s', 'DEMOSYM'))
+        close_price = Decimal(str(k.get('c', k.get('close', random.uniform(100, 200)))))
+
+        # initialize candle deque if needed
+        if symbol not in state.candles:
+            state.candles[symbol] = deque(maxlen=MAX_CANDLE_STORE)
+        state.candles[symbol].append(close_price)
+
+        # update price_history
+        now = time.time()
+        if symbol not in state.price_history:
+            state.price_history[symbol] = deque(maxlen=REQUIRED_BARS)
+        state.price_history[symbol].append((now, close_price))
+
+        # prune old entries beyond MONITOR_MINUTES
+        cutoff = MONITOR_MINUTES * 60
+        while state.price_history[symbol] and now - state.price_history[symbol][0][0] > cutoff:
+            state.price_history[symbol].popleft()
+
+        print(f"[DEMO] Kline closed for {symbol} -> {close_price}")
+    except Exception as e:
+        print(f"[DEMO] WebSocket msg error: {e}")
+
+def benchmark(n_frames=50_000, n_symbols=400, closed_ratio=0.05):
+    """
+    Ingest the same frames through the original json.loads +
+    handle_kline_message path (_baseline_handle_kline_message), the fast
+    single-frame path and the batch path, and return msg/s for each. Most live
+    frames are in-progress klines, so only `closed_ratio` of them are closed.
+    """
+    import contextlib
+    import io
+    import random
+    import time
+
+    from trading import streaming
+    from trading.async_streaming import kline_frame
+    from trading.candles import CandleStore
+
+    symbols = [f"BENCH{i}USDT" for i in range(n_symbols)]
+    frames = []
+    for n in range(n_frames):
+        closed = random.random() < closed_ratio
+        frames.append(kline_frame(symbols[n % n_symbols], 1_700_000_000_000 + n * 900_000,
+                                  100.0 + random.uniform(-1, 1), closed=closed).encode())
+
+    def run(label, fn):
+        streaming.state.candles = CandleStore(streaming.state.candles.capacity)
+        streaming.state.price_history.clear()
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        return label, n_frames / elapsed
+
+    def legacy():
+        import json
+        from types import SimpleNamespace
+        state = SimpleNamespace(candles={}, price_history={})
+        for frame in frames:
+            _baseline_handle_kline_message(json.loads(frame), state)
+
+    def fast():
+        for frame in frames:
+            streaming.ingest_frame(frame)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = [
+            run("original json + Decimal path", legacy),
+            run("fast ingest_frame", fast),
+            run("fast ingest_frames (batch)", lambda: streaming.ingest_frames(frames)),
+        ]
+    return results
+
+# Print the benchmark when executed directly
+if __name__ == "__main__":
+    for label, rate in benchmark():
+        print(f"{label:<30} {rate:>12,.0f} msg/s")
@@ -1,8 +1,12 @@
 # trading/indicators.py
+from collections import deque
 from decimal import Decimal, getcontext
 import math
+import sys
 import time
 
+from trading.timing import clock, timers
+
 TP_PCT = Decimal("2.0")     # Take profit % example
 SL_PCT = Decimal("-1.0")    # Stop loss % example
 MIN_INC = Decimal("0.5")    # Example min % increase
@@ -12,11 +16,31 @@ MACD_LONG = 26
 MACD_SIGNAL = 9
 CHANDELIER_PERIOD = 22
 BREAKOUT_PERIOD = 20
+ZLSAMA_PERIOD = 30
+
+# --------------------------------------
+def get_indicator_backend(name="decimal"):
+    """
+    Return the module implementing the indicator functions: this Decimal module
+    or the vectorized float64 one in trading/indicators_np.py when name == "numpy".
+    Both expose the same function names and arguments.
+    """
+    if name == "numpy":
+        try:
+            from trading import indicators_np
+            return indicators_np
+        except ImportError as e:
+            print(f"⚠️ NumPy indicator backend unavailable ({e}), using Decimal indicators")
+    return sys.modules[__name__]
+
+def as_series(values):
+    return [v if isinstance(v, Decimal) else Decimal(str(v)) for v in values]
 
 # --------------------------------------
 def calculate_ema(prices, period):
     getcontext().prec = 28
     ema = []
+    alpha = Decimal('2') / Decimal(period + 1)
     for i in range(len(prices)):
         if i < period:
             avg = sum(prices[:i+1]) / Decimal(len(prices[:i+1]))
@@ -24,7 +48,7 @@ def calculate_ema(prices, period):
         else:
             current = prices[i]
             prev_ema = ema[i - 1]
-            ema_value = current + prev_ema * (Decimal('1') )
+            ema_value = prev_ema + (current - prev_ema) * alpha
             ema.append(ema_value)
     return ema    
 
@@ -32,6 +56,11 @@ def calculate_rsi(prices, period):
     getcontext().prec = 28
 
     rsi = [Decimal('0')] * len(prices)
+    deltas = [prices[i] - prices[i - 1] for i in range(1, len(prices))]
+    if len(deltas) < period:
+        return rsi
+    gains = [d if d > 0 else Decimal('0') for d in deltas]
+    losses = [-d if d < 0 else Decimal('0') for d in deltas]
     avg_gain = sum(gains[:period]) / Decimal(period)
     avg_loss = sum(losses[:period]) / Decimal(period)
 
@@ -47,11 +76,12 @@ def calculate_rsi(prices, period):
         rsi[i + 1] = Decimal('100') - (Decimal('100') / (Decimal('1') + rs))
     return rsi   
 
-def price_increased_recently(price_history):
-    if len(price_history) < 2:
+def price_increased_recently(window, min_inc=MIN_INC, max_inc=MAX_INC):
+    # window is the symbol's PriceWindow; its change over the horizon is one lookup
+    price_change = window.pct_change() if window is not None else None
+    if price_change is None:
         return False
-    price_change = (newest_price - oldest_price) / oldest_price * Decimal('100')
-    return MIN_INC <= price_change <= MAX_INC    
+    return min_inc <= Decimal(str(price_change)) <= max_inc
 
 def hit_tp_or_sl(entry_price: Decimal, current_price: Decimal) -> bool:
     change_pct = (current_price - entry_price) / entry_price * Decimal('100')
@@ -63,69 +93,73 @@ def hit_tp_or_sl(entry_price: Decimal, current_price: Decimal) -> bool:
         return True
     return False    
 
+def true_range(high, low, prev_close):
+    return max(high - low, abs(high - prev_close), abs(low - prev_close))
+
 def calculate_atr(highs, lows, closes, period):
+    # ATR at each bar is the mean of the previous `period` true ranges
     getcontext().prec = 28
-    trs = []
-    for i in range(1, len(closes)):
-        high = highs[i]
-        low = lows[i]
-        prev_close = closes[i - 1]
-        trs.append(tr)
+    trs = RollingWindow(period)
     atrs = []
-    for i in range(period, len(trs)):
-        atr = sum(trs[i - period:i]) / Decimal(period)
-        atrs.append(atr)
+    for i in range(1, len(closes)):
+        if trs.full:
+            atrs.append(trs.mean())
+        trs.push(true_range(highs[i], lows[i], closes[i - 1]))
     return atrs    
 
 def get_chandelier_exit(highs, lows, closes, period=CHANDELIER_PERIOD, atr_multiplier=3):
+    # Long exit: highest high of the last `period` bars minus a multiple of ATR.
+    # The last entry lines up with the last candle.
     atrs = calculate_atr(highs, lows, closes, period)
+    highest = RollingWindow(period)
     chandelier_exit_list = []
-    for i in range(period, len(closes)):
-        chandelier_exit_list.append(exit_price)
+    for i in range(len(closes)):
+        highest.push(highs[i])
+        if i > period:
+            exit_price = highest.max() - atrs[i - period - 1] * atr_multiplier
+            chandelier_exit_list.append(exit_price)
     return chandelier_exit_list
 
 def calculate_zlsma(prices, period):
+    # ZLSMA = LSMA + (LSMA - LSMA of LSMA); 0 until 2 * period - 1 bars exist.
+    # Single pass with running regression sums, see ZlsmaState.
     getcontext().prec = 28
-    zlsma = []
-    for i in range(len(prices)):
-        if i + 1 < period:
-            zlsma.append(Decimal('0'))
-            continue
-        subset = prices[i + 1 - period: i + 1]
-        sum_x = sum(Decimal(j) for j in range(period))
-        sum_y = sum(subset)
-        sum_xy = sum(Decimal(j) * subset[j] for j in range(period))
-        sum_xx = sum(Decimal(j) * Decimal(j) for j in range(period))
-        divisor = (Decimal(period) * sum_xx - sum_x * sum_x)
-        if divisor == 0:
-            zlsma.append(Decimal('0'))
-            continue
-        if len(zlsma) >= 1:
-            prev = zlsma[-1]
-            zlsma.append(Decimal('2') * lsma - prev)
-        else:
-            zlsma.append(lsma)
-    return zlsma
+    state = ZlsmaState(period)
+    zero = Decimal('0')
+    return [zero if value is None else value for value in map(state.update, prices)]
 
 def calculate_macd(prices, short_period=MACD_SHORT, long_period=MACD_LONG, signal_period=MACD_SIGNAL):
     ema_short = calculate_ema(prices, short_period)
     ema_long = calculate_ema(prices, long_period)
+    macd_line = [s - l for s, l in zip(ema_short, ema_long)]
     signal_line = calculate_ema(macd_line, signal_period)
     macd_histogram = [m - s for m, s in zip(macd_line[-len(signal_line):], signal_line)]
     return macd_line[-len(macd_histogram):], signal_line, macd_histogram
 
 def is_breakout(closes, lookback=BREAKOUT_PERIOD, threshold_pct=0.5):
-    resistance = max(closes[-lookback:-1])
+    resistance = find_resistance(closes, lookback)
     current_price = closes[-1]
     change_pct = ((current_price - resistance) / resistance) * 100
     return change_pct > threshold_pct
 
 def find_resistance(closes, lookback=BREAKOUT_PERIOD):
-    return max(closes[-lookback:-1])    
+    # Highest close of the `lookback - 1` bars before the current one. The live
+    # path gets this from IndicatorState without rescanning.
+    return max(closes[-lookback:-1])
+
+def _local_lows(values):
+    return [(i, values[i]) for i in range(1, len(values) - 1)
+            if values[i] < values[i - 1] and values[i] < values[i + 1]]
+
+def _local_highs(values):
+    return [(i, values[i]) for i in range(1, len(values) - 1)
+            if values[i] > values[i - 1] and values[i] > values[i + 1]]
 
 def detect_rsi_bullish_divergence(prices, rsi_values, lookback=10):
     if len(prices) < lookback + 2 or len(rsi_values) < lookback + 2:
         return False
+    recent_lows = _local_lows(prices[-lookback:])
+    rsi_lows = _local_lows(rsi_values[-lookback:])
     if len(recent_lows) < 2 or len(rsi_lows) < 2:
         return False
     price_low_1, price_low_2 = recent_lows[-2][1], recent_lows[-1][1]
@@ -135,6 +169,8 @@ def detect_rsi_bullish_divergence(prices, rsi_values, lookback=10):
 def detect_rsi_bearish_divergence(prices, rsi_values, lookback=10):
     if len(prices) < lookback + 2 or len(rsi_values) < lookback + 2:
         return False
+    recent_highs = _local_highs(prices[-lookback:])
+    rsi_highs = _local_highs(rsi_values[-lookback:])
     if len(recent_highs) < 2 or len(rsi_highs) < 2:
         return False
     price_high_1, price_high_2 = recent_highs[-2][1], recent_highs[-1][1]
@@ -144,6 +180,8 @@ def detect_rsi_bearish_divergence(prices, rsi_values, lookback=10):
 def detect_macd_bearish_divergence(prices, macd_values, lookback=10):
     if len(prices) < lookback + 2 or len(macd_values) < lookback + 2:
         return False
+    price_highs = _local_highs(prices[-lookback:])
+    macd_highs = _local_highs(macd_values[-lookback:])
     if len(price_highs) < 2 or len(macd_highs) < 2:
         return False
     price_high_1, price_high_2 = price_highs[-2][1], price_highs[-1][1]
@@ -155,8 +193,374 @@ def detect_macd_bullish_divergence(prices, macd_line, lookback=10):
         return False
     recent_prices = prices[-lookback:]
     recent_macd = macd_line[-lookback:]
+    price_lows = [i for i, _ in _local_lows(recent_prices)]
+    macd_lows = [i for i, _ in _local_lows(recent_macd)]
     if len(price_lows) < 2 or len(macd_lows) < 2:
         return False
     price_low1, price_low2 = recent_prices[price_lows[-2]], recent_prices[price_lows[-1]]
     macd_low1, macd_low2 = recent_macd[macd_lows[-2]], recent_macd[macd_lows[-1]]
     return price_low2 < price_low1 and macd_low2 > macd_low1
+
+# --------------------------------------
+# Incremental (one closed candle at a time) indicator engine.
+# Each state reproduces the matching calculate_* function above, but only does
+# O(1) work per new close instead of rescanning the whole candle history.
+class EmaState:
+    """Running EMA seeded with the cumulative average, like calculate_ema."""
+    __slots__ = ("period", "value", "_count", "_seed_sum", "_alpha")
+
+    def __init__(self, period):
+        self.period = int(period)
+        self.value = None
+        self._count = 0
+        self._seed_sum = None
+        self._alpha = None
+
+    def update(self, price):
+        self._count += 1
+        if self._count <= self.period:
+            self._seed_sum = price if self._seed_sum is None else self._seed_sum + price
+            self.value = self._seed_sum / self._count
+            if self._alpha is None:
+                # Match the numeric type of the input (Decimal or float)
+                num = type(price)
+                self._alpha = num(2) / num(self.period + 1)
+        else:
+            self.value = self.value + (price - self.value) * self._alpha
+        return self.value
+
+
+class RsiState:
+    """Running Wilder RSI with the same warm-up and zero handling as calculate_rsi."""
+    __slots__ = ("period", "value", "avg_gain", "avg_loss", "_prev", "_count")
+
+    def __init__(self, period):
+        self.period = int(period)
+        self.value = None
+        self.avg_gain = None
+        self.avg_loss = None
+        self._prev = None
+        self._count = 0
+
+    def update(self, price):
+        zero = price - price
+        if self._prev is None:
+            self._prev = price
+            self.value = zero
+            return self.value
+        delta = price - self._prev
+        self._prev = price
+        gain = delta if delta > 0 else zero
+        loss = -delta if delta < 0 else zero
+        self._count += 1
+
+        if self._count <= self.period:
+            # Warm-up: accumulate the seed averages, RSI stays at zero
+            self.avg_gain = gain if self.avg_gain is None else self.avg_gain + gain
+            self.avg_loss = loss if self.avg_loss is None else self.avg_loss + loss
+            if self._count == self.period:
+                self.avg_gain = self.avg_gain / self.period
+                self.avg_loss = self.avg_loss / self.period
+            self.value = zero
+            return self.value
+
+        self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+        self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+        rs = zero if self.avg_loss == 0 else self.avg_gain / self.avg_loss
+        self.value = 100 - 100 / (1 + rs)
+        return self.value
+
+
+class RollingWindow:
+    """
+    The last `size` values with amortized O(1) max, min and sum.
+
+    Max and min are kept in monotonic deques of (index, value): a new value
+    drops every queued value it dominates, and the front is evicted once it
+    slides out of the window, so each value is pushed and popped at most once.
+    """
+    __slots__ = ("size", "_values", "_max", "_min", "_sum", "_index")
+
+    def __init__(self, size):
+        self.size = max(1, int(size))
+        self._values = deque()
+        self._max = deque()
+        self._min = deque()
+        self._sum = None
+        self._index = 0
+
+    def __len__(self):
+        return len(self._values)
+
+    @property
+    def full(self):
+        return len(self._values) >= self.size
+
+    def push(self, value):
+        values = self._values
+        if len(values) >= self.size:
+            self._sum -= values.popleft()
+        values.append(value)
+        self._sum = value if self._sum is None else self._sum + value
+
+        index = self._index
+        self._index += 1
+        oldest = index - self.size + 1
+
+        max_q = self._max
+        while max_q and max_q[-1][1] <= value:
+            max_q.pop()
+        max_q.append((index, value))
+        if max_q[0][0] < oldest:
+            max_q.popleft()
+
+        min_q = self._min
+        while min_q and min_q[-1][1] >= value:
+            min_q.pop()
+        min_q.append((index, value))
+        if min_q[0][0] < oldest:
+            min_q.popleft()
+        return self
+
+    def extend(self, values):
+        for value in values:
+            self.push(value)
+        return self
+
+    def max(self):
+        return self._max[0][1] if self._max else None
+
+    def min(self):
+        return self._min[0][1] if self._min else None
+
+    def sum(self):
+        return self._sum
+
+    def mean(self):
+        return self._sum / len(self._values) if self._values else None
+
+
+class RollingLinReg:
+    """
+    Least-squares line over the last `period` values, evaluated at the newest
+    bar. Keeps running sums of y and x*y so each new value costs O(1); the
+    x-only sums are constants of the period and computed once.
+    """
+    __slots__ = ("period", "value", "_window", "_sum_y", "_sum_xy", "_consts")
+
+    def __init__(self, period):
+        self.period = int(period)
+        self.value = None
+        self._window = deque()
+        self._sum_y = None
+        self._sum_xy = None
+        self._consts = None
+
+    def _constants(self, num):
+        p = self.period
+        sum_x = num(p * (p - 1) // 2)
+        sum_xx = num((p - 1) * p * (2 * p - 1) // 6)
+        divisor = num(p) * sum_xx - sum_x * sum_x
+        return num(p), sum_x, divisor, num(p - 1)
+
+    def update(self, y):
+        if self._consts is None:
+            self._consts = self._constants(type(y))
+            self._sum_y = y - y
+            self._sum_xy = y - y
+        n, sum_x, divisor, last_x = self._consts
+        window = self._window
+
+        if len(window) < self.period:
+            self._sum_xy += len(window) * y
+            self._sum_y += y
+            window.append(y)
+        else:
+            # Slide by one: every x shifts down by one, the oldest value leaves
+            # at x = 0 and the new one enters at x = period - 1.
+            y_out = window.popleft()
+            self._sum_xy = self._sum_xy - self._sum_y + y_out + last_x * y
+            self._sum_y = self._sum_y - y_out + y
+            window.append(y)
+
+        if len(window) < self.period or divisor == 0:
+            self.value = None
+            return None
+        slope = (n * self._sum_xy - sum_x * self._sum_y) / divisor
+        intercept = (self._sum_y - slope * sum_x) / n
+        self.value = intercept + slope * last_x
+        return self.value
+
+
+class ZlsmaState:
+    """Streaming ZLSMA: the LSMA and its zero-lag correction updated in one pass."""
+    __slots__ = ("period", "value", "_lsma", "_lsma2")
+
+    def __init__(self, period):
+        self.period = int(period)
+        self.value = None
+        self._lsma = RollingLinReg(period)
+        self._lsma2 = RollingLinReg(period)
+
+    def update(self, price):
+        lsma = self._lsma.update(price)
+        if lsma is None:
+            return None
+        lsma2 = self._lsma2.update(lsma)
+        if lsma2 is None:
+            return None
+        self.value = 2 * lsma - lsma2
+        return self.value
+
+
+class IndicatorState:
+    """
+    Per-symbol EMA/RSI/ZLSMA/MACD values updated once per closed candle.
+
+    The latest values are at index -1 of each series; only the last `history`
+    values are kept, which is enough for the cross, slope and divergence checks
+    in the strategy. Breakout resistance, ATR and the Chandelier exit are kept
+    as current values only, on top of RollingWindow aggregates.
+    """
+
+    def __init__(self, ema_short, ema_long, rsi_period, zlsma_period=ZLSAMA_PERIOD,
+                 macd_short=MACD_SHORT, macd_long=MACD_LONG, macd_signal=MACD_SIGNAL,
+                 breakout_period=BREAKOUT_PERIOD, chandelier_period=CHANDELIER_PERIOD,
+                 atr_multiplier=3, breakout_threshold=0.5, history=32):
+        self.params = (int(ema_short), int(ema_long), int(rsi_period), int(zlsma_period),
+                       int(macd_short), int(macd_long), int(macd_signal),
+                       int(breakout_period), int(chandelier_period))
+        self.atr_multiplier = atr_multiplier
+        self.breakout_threshold = breakout_threshold
+        self.bars = 0
+
+        self._ema_short = EmaState(ema_short)
+        self._ema_long = EmaState(ema_long)
+        self._rsi = RsiState(rsi_period)
+        self._zlsma = ZlsmaState(zlsma_period)
+        self._macd_short = EmaState(macd_short)
+        self._macd_long = EmaState(macd_long)
+        self._macd_signal = EmaState(macd_signal)
+
+        self.ema_short = deque(maxlen=history)
+        self.ema_long = deque(maxlen=history)
+        self.rsi = deque(maxlen=history)
+        self.zlsma = deque(maxlen=history)
+        self.macd = deque(maxlen=history)
+        self.signal = deque(maxlen=history)
+        self.histogram = deque(maxlen=history)
+
+        self._prior_closes = RollingWindow(int(breakout_period) - 1)
+        self._highs = RollingWindow(chandelier_period)
+        self._true_ranges = RollingWindow(chandelier_period)
+        self._prev_close = None
+        self.resistance = None
+        self.breakout = False
+        self.atr = None
+        self.chandelier = None
+
+    def matches(self, ema_short, ema_long, rsi_period, zlsma_period=ZLSAMA_PERIOD,
+                macd_short=MACD_SHORT, macd_long=MACD_LONG, macd_signal=MACD_SIGNAL,
+                breakout_period=BREAKOUT_PERIOD, chandelier_period=CHANDELIER_PERIOD):
+        return self.params == (int(ema_short), int(ema_long), int(rsi_period), int(zlsma_period),
+                               int(macd_short), int(macd_long), int(macd_signal),
+                               int(breakout_period), int(chandelier_period))
+
+    def update(self, close, high=None, low=None):
+        high = close if high is None else high
+        low = close if low is None else low
+        self.bars += 1
+        # sampled bars read the clock once per indicator: each ends where the next starts
+        sampled = not self.bars % INDICATOR_TIMING_SAMPLE
+        started = t0 = clock()
+        self.ema_short.append(self._ema_short.update(close))
+        self.ema_long.append(self._ema_long.update(close))
+        if sampled:
+            t1 = clock()
+            _EMA.record(t1 - t0)
+        self.rsi.append(self._rsi.update(close))
+        if sampled:
+            t0 = clock()
+            _RSI.record(t0 - t1)
+        zlsma = self._zlsma.update(close)
+        self.zlsma.append(close - close if zlsma is None else zlsma)
+        if sampled:
+            t1 = clock()
+            _ZLSMA.record(t1 - t0)
+
+        macd = self._macd_short.update(close) - self._macd_long.update(close)
+        signal = self._macd_signal.update(macd)
+        self.macd.append(macd)
+        self.signal.append(signal)
+        self.histogram.append(macd - signal)
+        if sampled:
+            t0 = clock()
+            _MACD.record(t0 - t1)
+
+        # Breakout against the highest of the previous closes (find_resistance)
+        if len(self._prior_closes):
+            self.resistance = self._prior_closes.max()
+            self.breakout = (close - self.resistance) / self.resistance * 100 > self.breakout_threshold
+        self._prior_closes.push(close)
+        if sampled:
+            t1 = clock()
+            _BREAKOUT.record(t1 - t0)
+
+        # ATR over the previous true ranges and Chandelier exit (get_chandelier_exit)
+        self._highs.push(high)
+        if self._prev_close is not None:
+            self.atr = self._true_ranges.mean() if self._true_ranges.full else None
+            self._true_ranges.push(true_range(high, low, self._prev_close))
+            if self.atr is not None:
+                self.chandelier = self._highs.max() - self.atr * self.atr_multiplier
+        self._prev_close = close
+        ended = clock()
+        if sampled:
+            _CHANDELIER.record(ended - t1)
+        _UPDATE.record(ended - started)
+
+    def seed(self, closes, highs=None, lows=None):
+        if highs is None or lows is None:
+            for close in closes:
+                self.update(close)
+        else:
+            for close, high, low in zip(closes, highs, lows):
+                self.update(close, high, low)
+        return self
+
+
+# IndicatorState.update is timed as a whole on every bar; the split per
+# indicator is taken on every INDICATOR_TIMING_SAMPLE-th bar of a symbol,
+# since six more clock reads would add about half the cost of the update
+INDICATOR_TIMING_SAMPLE = 16
+_UPDATE = timers.stage("indicator.update")
+_EMA = timers.stage("indicator.ema", INDICATOR_TIMING_SAMPLE)
+_RSI = timers.stage("indicator.rsi", INDICATOR_TIMING_SAMPLE)
+_ZLSMA = timers.stage("indicator.zlsma", INDICATOR_TIMING_SAMPLE)
+_MACD = timers.stage("indicator.macd", INDICATOR_TIMING_SAMPLE)
+_BREAKOUT = timers.stage("indicator.breakout", INDICATOR_TIMING_SAMPLE)
+_CHANDELIER = timers.stage("indicator.chandelier", INDICATOR_TIMING_SAMPLE)
+_MATRIX = timers.stage("indicator.matrix")
+
+
+# --------------------------------------
+# Batched indicators for the whole symbol universe
+# --------------------------------------
+def calculate_indicator_matrix(closes, highs=None, lows=None, symbols=None, **periods):
+    """
+    EMA/RSI/MACD/ZLSMA/ATR for a (symbols x bars) matrix in one call, one row
+    per symbol, NaN-padded on the left for symbols with shorter history.
+    Always float64 (NumPy backend); returns an IndicatorMatrix whose row(symbol)
+    has the same attribute names as IndicatorState.
+    """
+    from trading import indicators_np
+    started = clock()
+    matrix = indicators_np.calculate_indicator_matrix(closes, highs, lows, symbols, **periods)
+    _MATRIX.record(clock() - started)
+    return matrix
+
+def indicator_matrix(store, symbols, bars, **periods):
+    """calculate_indicator_matrix over the last `bars` candles of `symbols` in a CandleStore."""
+    from trading.candles import CLOSE, HIGH, LOW
+    closes, highs, lows = store.matrix(symbols, bars, (CLOSE, HIGH, LOW))
+    return calculate_indicator_matrix(closes, highs, lows, symbols, **periods)
@@ -0,0 +1,491 @@
+# trading/indicators_np.py
+"""
+Vectorized float64 indicator backend.
+
+Mirrors the signal functions in trading/indicators.py with the same names and
+arguments, but works on contiguous float64 arrays instead of Decimal lists.
+Series functions operate along the last axis, so a 1-D array of closes and a
+2-D (symbols x bars) matrix are both accepted. Warm-up values follow the
+Decimal path (cumulative-average EMA seed, zero RSI) except ZLSMA, which is
+NaN until enough bars exist.
+
+Order-side math (quantities, P/L, TP/SL) stays on the Decimal path.
+"""
+import functools
+import math
+import sys
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+MACD_SHORT = 12
+MACD_LONG = 26
+MACD_SIGNAL = 9
+BREAKOUT_PERIOD = 20
+
+# Largest exponent used when unrolling the EMA recursion in one block; keeps
+# decay ** -k far away from float64 overflow.
+_MAX_BLOCK_EXPONENT = 200.0
+
+# Longest history the batched indicators compute as n x n matrix products;
+# past it the O(n) filters are cheaper than O(n^2) products.
+_MAX_OPERATOR_BARS = 512
+
+
+def as_series(values):
+    """Return `values` as a contiguous float64 array (no copy if it already is one)."""
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+# --------------------------------------
+def _recursive_filter(x, alpha, y0):
+    """
+    Evaluate y[t] = y[t-1] + alpha * (x[t] - y[t-1]) with y[-1] = y0 along the
+    last axis. The recursion is unrolled into cumulative sums over blocks short
+    enough for the decay powers to stay in range, so the Python loop runs once
+    per block rather than once per bar.
+    """
+    out = np.empty_like(x)
+    n = x.shape[-1]
+    decay = 1.0 - alpha
+    if n == 0:
+        return out
+    if decay <= 0.0:
+        out[...] = x
+        return out
+
+    block = max(1, int(_MAX_BLOCK_EXPONENT / -math.log(decay)))
+    prev = np.asarray(y0, dtype=np.float64)
+    for start in range(0, n, block):
+        seg = x[..., start:start + block]
+        k = np.arange(seg.shape[-1], dtype=np.float64)
+        acc = np.cumsum(seg * decay ** -k, axis=-1)
+        out[..., start:start + block] = decay ** (k + 1) * (prev[..., None] + alpha / decay * acc)
+        prev = out[..., start + seg.shape[-1] - 1]
+    return out
+
+def calculate_ema(prices, period):
+    x = as_series(prices)
+    period = int(period)
+    n = x.shape[-1]
+    out = np.empty_like(x)
+    head = min(period, n)
+    out[..., :head] = np.cumsum(x[..., :head], axis=-1) / np.arange(1, head + 1)
+    if n > period:
+        out[..., period:] = _recursive_filter(x[..., period:], 2.0 / (period + 1), out[..., period - 1])
+    return out
+
+def calculate_rsi(prices, period):
+    x = as_series(prices)
+    period = int(period)
+    rsi = np.zeros_like(x)
+    deltas = np.diff(x, axis=-1)
+    if deltas.shape[-1] < period:
+        return rsi
+    gains = np.clip(deltas, 0.0, None)
+    losses = np.clip(-deltas, 0.0, None)
+
+    avg_gain = _recursive_filter(gains[..., period:], 1.0 / period, gains[..., :period].mean(axis=-1))
+    avg_loss = _recursive_filter(losses[..., period:], 1.0 / period, losses[..., :period].mean(axis=-1))
+    rs = np.divide(avg_gain, avg_loss, out=np.zeros_like(avg_gain), where=avg_loss != 0)
+    rsi[..., period + 1:] = 100.0 - 100.0 / (1.0 + rs)
+    return rsi
+
+def calculate_macd(prices, short_period=MACD_SHORT, long_period=MACD_LONG, signal_period=MACD_SIGNAL):
+    x = as_series(prices)
+    macd_line = calculate_ema(x, short_period) - calculate_ema(x, long_period)
+    signal_line = calculate_ema(macd_line, signal_period)
+    return macd_line, signal_line, macd_line - signal_line
+
+def calculate_atr(highs, lows, closes, period):
+    h, l, c = as_series(highs), as_series(lows), as_series(closes)
+    period = int(period)
+    prev_close = c[..., :-1]
+    h, l = h[..., 1:], l[..., 1:]
+    trs = np.maximum(h - l, np.maximum(np.abs(h - prev_close), np.abs(l - prev_close)))
+    n = trs.shape[-1]
+    if n <= period:
+        return np.empty(trs.shape[:-1] + (0,))
+    csum = np.concatenate([np.zeros(trs.shape[:-1] + (1,)), np.cumsum(trs, axis=-1)], axis=-1)
+    # Same window as the Decimal path: mean of trs[i - period:i] for i in [period, n)
+    return (csum[..., period:n] - csum[..., :n - period]) / period
+
+def _linreg_weights(period):
+    # LSMA at the last bar of a window is a fixed weighted sum of the window
+    j = np.arange(period, dtype=np.float64)
+    x_mean = j.mean()
+    sxx = ((j - x_mean) ** 2).sum()
+    return 1.0 / period + (j - x_mean) * (period - 1 - x_mean) / sxx
+
+def _linreg(x, period):
+    out = np.full_like(x, np.nan)
+    if x.shape[-1] >= period:
+        out[..., period - 1:] = sliding_window_view(x, period, axis=-1) @ _linreg_weights(period)
+    return out
+
+def calculate_zlsma(prices, period):
+    x = as_series(prices)
+    period = int(period)
+    lsma = _linreg(x, period)
+    return 2.0 * lsma - _linreg(lsma, period)
+
+def find_resistance(closes, lookback=BREAKOUT_PERIOD):
+    return float(as_series(closes)[-lookback:-1].max())
+
+def is_breakout(closes, lookback=BREAKOUT_PERIOD, threshold_pct=0.5):
+    x = as_series(closes)
+    resistance = x[-lookback:-1].max()
+    return bool((x[-1] - resistance) / resistance * 100.0 > threshold_pct)
+
+# --------------------------------------
+def _local_lows(values):
+    v = as_series(values)
+    idx = np.flatnonzero((v[1:-1] < v[:-2]) & (v[1:-1] < v[2:])) + 1
+    return idx, v[idx]
+
+def _local_highs(values):
+    v = as_series(values)
+    idx = np.flatnonzero((v[1:-1] > v[:-2]) & (v[1:-1] > v[2:])) + 1
+    return idx, v[idx]
+
+def detect_rsi_bullish_divergence(prices, rsi_values, lookback=10):
+    if len(prices) < lookback + 2 or len(rsi_values) < lookback + 2:
+        return False
+    _, price_lows = _local_lows(prices[-lookback:])
+    _, rsi_lows = _local_lows(rsi_values[-lookback:])
+    if len(price_lows) < 2 or len(rsi_lows) < 2:
+        return False
+    return bool(price_lows[-1] < price_lows[-2] and rsi_lows[-1] > rsi_lows[-2])
+
+def detect_rsi_bearish_divergence(prices, rsi_values, lookback=10):
+    if len(prices) < lookback + 2 or len(rsi_values) < lookback + 2:
+        return False
+    _, price_highs = _local_highs(prices[-lookback:])
+    _, rsi_highs = _local_highs(rsi_values[-lookback:])
+    if len(price_highs) < 2 or len(rsi_highs) < 2:
+        return False
+    return bool(price_highs[-1] > price_highs[-2] and rsi_highs[-1] < rsi_highs[-2])
+
+def detect_macd_bearish_divergence(prices, macd_values, lookback=10):
+    if len(prices) < lookback + 2 or len(macd_values) < lookback + 2:
+        return False
+    _, price_highs = _local_highs(prices[-lookback:])
+    _, macd_highs = _local_highs(macd_values[-lookback:])
+    if len(price_highs) < 2 or len(macd_highs) < 2:
+        return False
+    return bool(price_highs[-1] > price_highs[-2] and macd_highs[-1] < macd_highs[-2])
+
+def detect_macd_bullish_divergence(prices, macd_line, lookback=10):
+    if len(prices) < lookback + 1 or len(macd_line) < lookback + 1:
+        return False
+    recent_prices = as_series(prices[-lookback:])
+    recent_macd = as_series(macd_line[-lookback:])
+    price_lows, _ = _local_lows(recent_prices)
+    macd_lows, _ = _local_lows(recent_macd)
+    if len(price_lows) < 2 or len(macd_lows) < 2:
+        return False
+    return bool(recent_prices[price_lows[-1]] < recent_prices[price_lows[-2]]
+                and recent_macd[macd_lows[-1]] > recent_macd[macd_lows[-2]])
+
+# --------------------------------------
+# Batched indicators over a (symbols x bars) matrix
+# --------------------------------------
+def _history_starts(m):
+    """Index of each row's first finite value (m.shape[-1] for an all-NaN row)."""
+    finite = np.isfinite(m)
+    return np.where(finite.any(axis=-1), finite.argmax(axis=-1), m.shape[-1])
+
+def _row_shifter(shifts, shape):
+    """
+    Return f(m) moving row r of a `shape` matrix left by shifts[r] columns
+    (right if negative), filling vacated cells with NaN. The gather index is
+    built once and reused for every matrix; m may also stack matrices on a
+    leading axis. f(m, out) gathers into `out` instead of a new array.
+    """
+    rows, n = shape
+    cols = np.arange(n) + shifts[:, None]
+    vacated = ((cols < 0) | (cols >= n)).ravel()
+    flat = (np.clip(cols, 0, n - 1) + (np.arange(rows) * n)[:, None]).ravel()
+
+    def shift(m, out=None):
+        out = np.empty(m.shape) if out is None else out
+        for src, dst in zip(np.ascontiguousarray(m).reshape(-1, rows * n), out.reshape(-1, rows * n)):
+            np.take(src, flat, out=dst, mode="clip")
+            dst[vacated] = np.nan
+        return out
+    return shift
+
+_scratch_arrays = threading.local()
+
+def _scratch(name, shape):
+    """
+    Per-thread float64 work array `name` of `shape`, reused from call to call
+    so a scan does not page in fresh memory for its temporaries. The contents
+    are undefined.
+    """
+    size = math.prod(shape)
+    buf = getattr(_scratch_arrays, name, None)
+    if buf is None or buf.size < size:
+        buf = np.empty(size)
+        setattr(_scratch_arrays, name, buf)
+    return buf[:size].reshape(shape)
+
+@functools.lru_cache(maxsize=16)
+def _close_operators(n, ema_short, ema_long, macd_short, macd_long, macd_signal, zlsma_period):
+    """
+    EMA short/long, MACD, signal and ZLSMA over n bars are linear in the
+    closes, so each is a fixed n x n matrix: closes @ op. Returns the five
+    stacked (5 x n x n), with the ZLSMA warm-up zeroed, and that warm-up's
+    length. The rows are the 1-D functions applied to the unit impulses.
+    """
+    eye = np.eye(n)
+    macd = calculate_ema(eye, macd_short) - calculate_ema(eye, macd_long)
+    zlsma = calculate_zlsma(eye, zlsma_period)
+    warmup = int(np.isnan(zlsma).any(axis=0).sum())
+    ops = (calculate_ema(eye, ema_short), calculate_ema(eye, ema_long), macd,
+           calculate_ema(macd, macd_signal), np.nan_to_num(zlsma, nan=0.0))
+    return np.stack(ops), warmup
+
+@functools.lru_cache(maxsize=16)
+def _move_operators(n, rsi_period, atr_period):
+    """
+    The bar-to-bar series of n closes are linear too: returns (3 x n-1 x n)
+    operators taking the gains, the losses and the true ranges to the RSI
+    average gain and loss (Wilder smoothing, as in calculate_rsi) and the ATR
+    (as in calculate_atr), placed at the bar each value belongs to. Columns
+    still warming up are zero.
+    """
+    ops = np.zeros((3, n - 1, n))
+    if n - 1 >= rsi_period:
+        eye = np.eye(n - 1)
+        ops[0, :, rsi_period + 1:] = _recursive_filter(eye[:, rsi_period:], 1.0 / rsi_period,
+                                                       eye[:, :rsi_period].mean(axis=-1))
+        ops[1] = ops[0]
+    # the ATR at bar t is the mean of the true ranges of bars t - atr_period .. t - 1
+    lag = np.arange(n)[None, :] - np.arange(n - 1)[:, None]
+    ops[2] = ((lag >= 2) & (lag <= atr_period + 1) & (np.arange(n) > atr_period)) / atr_period
+    return ops
+
+class IndicatorMatrix:
+    """
+    Indicator matrices for many symbols, one row per symbol, aligned on the
+    newest bar like the input. Cells before a symbol's first bar are NaN.
+    row(symbol) gives that symbol's series trimmed to its own history, with
+    the same attribute names and warm-up values as IndicatorState.
+    """
+    SERIES = ("ema_short", "ema_long", "rsi", "macd", "signal", "histogram", "zlsma", "atr")
+
+    def __init__(self, symbols, bars, **values):
+        self.symbols = list(symbols)
+        self.index = {s: i for i, s in enumerate(self.symbols)}
+        self.bars = bars  # bars of history per symbol
+        self.__dict__.update(values)
+
+    def __contains__(self, symbol):
+        return symbol in self.index
+
+    def row(self, symbol):
+        i = self.index[symbol]
+        n = int(self.bars[i])
+        values = {name: getattr(self, name)[i, -n:] if n else getattr(self, name)[i, :0]
+                  for name in self.SERIES if getattr(self, name) is not None}
+        if "zlsma" in values:
+            # IndicatorState holds 0 until ZLSMA has warmed up
+            values["zlsma"] = np.nan_to_num(values["zlsma"], nan=0.0)
+        values.update(bars=n, breakout=bool(self.breakout[i]),
+                      resistance=None if np.isnan(self.resistance[i]) else float(self.resistance[i]),
+                      chandelier=None if np.isnan(self.chandelier[i]) else float(self.chandelier[i]))
+        return SimpleNamespace(**values)
+
+def calculate_indicator_matrix(closes, highs=None, lows=None, symbols=None, ema_short=12, ema_long=26,
+                               rsi_period=14, zlsma_period=30, macd_short=MACD_SHORT, macd_long=MACD_LONG,
+                               macd_signal=MACD_SIGNAL, breakout_period=BREAKOUT_PERIOD, chandelier_period=22,
+                               atr_multiplier=3, breakout_threshold=0.5):
+    """
+    EMA/RSI/MACD/ZLSMA/ATR for every row of a (symbols x bars) matrix at once.
+    Rows may be NaN-padded on the left for symbols with shorter history; each
+    row's values equal the 1-D functions run on that symbol's own bars (to
+    rounding). The ATR at a bar is the mean of the previous `chandelier_period`
+    true ranges, and breakout/resistance/chandelier are last-bar values, as in
+    IndicatorState. Returns an IndicatorMatrix.
+
+    The rows are shifted to start at column 0 so warm-ups begin at each
+    symbol's first bar; the linear filters then run as two batched matrix
+    products (closes @ _close_operators, gains, losses and true ranges @
+    _move_operators) into one (series x symbols x bars) block, which shifts
+    back in one gather per series.
+    """
+    closes = as_series(np.atleast_2d(closes))
+    n = closes.shape[-1]
+    starts = _history_starts(closes)
+    counts = n - starts
+    symbols = list(symbols) if symbols is not None else list(range(closes.shape[0]))
+
+    # shift every row's history to column 0 so warm-ups start at each symbol's first bar
+    rows = len(closes)
+    have_hl = highs is not None and lows is not None
+    to_left, to_right = _row_shifter(starts, closes.shape), _row_shifter(-starts, closes.shape)
+    c = to_left(closes, _scratch("closes", closes.shape))
+    # zeros past a row's history only reach columns that shift out again
+    np.copyto(c, 0.0, where=np.isnan(c))
+    rsi_period, cp = int(rsi_period), int(chandelier_period)
+
+    # series block: ema_short, ema_long, macd, signal, zlsma, rsi, histogram, atr
+    out = _scratch("series", (8 if have_hl else 7, rows, n))
+    moves = _scratch("moves", (len(out) - 5, rows, max(n - 1, 0)))  # gains, losses, true ranges
+    np.subtract(c[:, 1:], c[:, :-1], out=moves[0])
+    np.negative(moves[0], out=moves[1])
+    np.maximum(moves[:2], 0.0, out=moves[:2])
+    if have_hl:
+        highs = as_series(np.atleast_2d(highs))
+        h = to_left(highs, _scratch("highs", closes.shape))[:, 1:]
+        l = to_left(as_series(np.atleast_2d(lows)), _scratch("lows", closes.shape))[:, 1:]
+        trs = moves[2]
+        np.subtract(h, l, out=trs)
+        np.maximum(trs, np.abs(h - c[:, :-1]), out=trs)
+        np.maximum(trs, np.abs(l - c[:, :-1]), out=trs)
+        np.copyto(trs, 0.0, where=np.isnan(trs))
+
+    if n <= _MAX_OPERATOR_BARS:
+        ops, warmup = _close_operators(n, int(ema_short), int(ema_long), int(macd_short), int(macd_long),
+                                       int(macd_signal), int(zlsma_period))
+        np.matmul(c, ops, out=out[:5])
+        out[4, :, :warmup] = np.nan
+        np.matmul(moves, _move_operators(n, rsi_period, cp)[:len(moves)], out=out[5:])
+    else:
+        out[0], out[1] = calculate_ema(c, ema_short), calculate_ema(c, ema_long)
+        out[2], out[3], _ = calculate_macd(c, macd_short, macd_long, macd_signal)
+        out[4] = calculate_zlsma(c, zlsma_period)
+        out[5:] = 0.0
+        if n - 1 >= rsi_period:
+            out[5:7, :, rsi_period + 1:] = _recursive_filter(moves[:2, :, rsi_period:], 1.0 / rsi_period,
+                                                             moves[:2, :, :rsi_period].mean(axis=-1))
+        if have_hl and n > cp + 1:
+            csum = np.cumsum(moves[2], axis=-1)
+            out[7, :, cp + 1] = csum[:, cp - 1] / cp
+            out[7, :, cp + 2:] = (csum[:, cp:n - 2] - csum[:, :n - 2 - cp]) / cp
+
+    # RSI from the average gain (slot 5) and loss (slot 6); no losses count as RS 0, as in calculate_rsi
+    gain, loss = out[5], out[6]
+    flat = loss == 0
+    np.divide(gain, loss, out=gain, where=~flat)
+    gain[flat] = 0.0
+    gain += 1.0
+    np.subtract(100.0, np.divide(100.0, gain, out=gain), out=gain)
+    gain[counts - 1 < rsi_period] = 0.0  # too short for RSI: zeros, as in calculate_rsi
+    np.subtract(out[2], out[3], out=out[6])
+    if have_hl:
+        out[7, :, :cp + 1] = np.nan
+    out = to_right(out)
+    values = dict(ema_short=out[0], ema_long=out[1], macd=out[2], signal=out[3], histogram=out[6],
+                  zlsma=out[4], rsi=out[5], atr=out[7] if have_hl else None)
+
+    chandelier = np.full(rows, np.nan)
+    with np.errstate(invalid="ignore"):
+        # last-bar breakout against the previous breakout_period - 1 closes (find_resistance)
+        prior = closes[:, -int(breakout_period):-1]
+        resistance = np.where(counts > 1, np.nanmax(np.where(np.isfinite(prior), prior, -np.inf), axis=1), np.nan)
+        resistance[~np.isfinite(resistance)] = np.nan
+        breakout = (closes[:, -1] - resistance) / resistance * 100.0 > breakout_threshold
+        if have_hl:
+            highest = np.nanmax(np.where(np.isfinite(highs[:, -cp:]), highs[:, -cp:], -np.inf), axis=1)
+            chandelier = highest - values["atr"][:, -1] * atr_multiplier
+
+    return IndicatorMatrix(symbols, counts, resistance=resistance, breakout=breakout, chandelier=chandelier, **values)
+
+# --------------------------------------
+def signal_snapshot(backend, closes, highs, lows, ema_short, ema_long, rsi_period, zlsma_period):
+    """
+    Evaluate the strategy's indicator-derived signals on the last bar with the
+    given backend module. Used to check that both backends agree.
+    """
+    ema_s = backend.calculate_ema(closes, ema_short)
+    ema_l = backend.calculate_ema(closes, ema_long)
+    rsi = backend.calculate_rsi(closes, rsi_period)
+    macd_line, signal_line, _ = backend.calculate_macd(closes)
+    zlsma = backend.calculate_zlsma(closes, zlsma_period)
+    atr = backend.calculate_atr(highs, lows, closes, 14)
+    tail = len(closes) - 32
+    return {
+        "ema_short": float(ema_s[-1]),
+        "ema_long": float(ema_l[-1]),
+        "rsi": float(rsi[-1]),
+        "macd": float(macd_line[-1]),
+        "signal": float(signal_line[-1]),
+        "zlsma": float(zlsma[-1]),
+        "atr": float(atr[-1]),
+        "bullish_cross": bool(ema_s[-2] <= ema_l[-2] and ema_s[-1] > ema_l[-1]),
+        "macd_bullish": bool(macd_line[-2] <= signal_line[-2] and macd_line[-1] > signal_line[-1]),
+        "macd_bearish": bool(macd_line[-2] >= signal_line[-2] and macd_line[-1] < signal_line[-1]),
+        "price_above_zlsma": bool(closes[-1] > zlsma[-1]),
+        "breakout": backend.is_breakout(closes),
+        "rsi_bullish_div": backend.detect_rsi_bullish_divergence(closes[tail:], rsi[tail:]),
+        "rsi_bearish_div": backend.detect_rsi_bearish_divergence(closes[tail:], rsi[tail:]),
+        "macd_bullish_div": backend.detect_macd_bullish_divergence(closes[tail:], macd_line[tail:]),
+        "macd_bearish_div": backend.detect_macd_bearish_divergence(closes[tail:], macd_line[tail:]),
+    }
+
+def check_parity(closes, highs, lows, ema_short=8, ema_long=30, rsi_period=10, zlsma_period=30, rel_tol=1e-9):
+    """
+    Compare the Decimal and NumPy backends on one price series. Returns a list
+    of (name, decimal_value, numpy_value) for every signal that disagrees.
+    """
+    from decimal import Decimal
+    from trading import indicators
+
+    def to_dec(values):
+        return [Decimal(repr(float(v))) for v in values]
+
+    dec = signal_snapshot(indicators, to_dec(closes), to_dec(highs), to_dec(lows),
+                          ema_short, ema_long, rsi_period, zlsma_period)
+    vec = signal_snapshot(sys.modules[__name__], as_series(closes), as_series(highs), as_series(lows),
+                          ema_short, ema_long, rsi_period, zlsma_period)
+    mismatches = []
+    for name, expected in dec.items():
+        got = vec[name]
+        if isinstance(expected, bool):
+            ok = expected == got
+        else:
+            ok = math.isclose(expected, got, rel_tol=rel_tol, abs_tol=1e-9)
+        if not ok:
+            mismatches.append((name, expected, got))
+    return mismatches
+
+# Run a parity check on random walks when executed directly
+if __name__ == "__main__":
+    rng = np.random.default_rng(7)
+    failures = 0
+    for trial in range(50):
+        closes = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.01, 120)))
+        highs = closes * (1 + rng.uniform(0, 0.01, 120))
+        lows = closes * (1 - rng.uniform(0, 0.01, 120))
+        mismatches = check_parity(closes, highs, lows)
+        if mismatches:
+            failures += 1
+            print(f"Trial {trial}: {mismatches}")
+    print(f"Parity check: {50 - failures}/50 series agree")
+
+    # Batched universe scan vs one symbol at a time (400 symbols, ragged history)
+    import time
+    closes = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.01, (400, 120)), axis=1))
+    highs, lows = closes * 1.003, closes * 0.997
+    for row, bars in enumerate(rng.integers(20, 121, 400)):
+        closes[row, :120 - bars] = highs[row, :120 - bars] = lows[row, :120 - bars] = np.nan
+    periods = dict(ema_short=8, ema_long=30, rsi_period=10, zlsma_period=30)
+    started = time.perf_counter()
+    matrix = calculate_indicator_matrix(closes, highs, lows, **periods)
+    first_ms = (time.perf_counter() - started) * 1e3  # includes building the cached operators
+    timings = []
+    for _ in range(20):
+        started = time.perf_counter()
+        calculate_indicator_matrix(closes, highs, lows, **periods)
+        timings.append((time.perf_counter() - started) * 1e3)
+    batched_ms = float(np.median(timings))
+    started = time.perf_counter()
+    for row, bars in enumerate(matrix.bars):
+        c, h, l = closes[row, -bars:], highs[row, -bars:], lows[row, -bars:]
+        calculate_ema(c, 8), calculate_ema(c, 30), calculate_rsi(c, 10)
+        calculate_macd(c), calculate_zlsma(c, 30), calculate_atr(h, l, c, 22)
+    print(f"400 symbols x 120 bars: batched {batched_ms:.2f}ms (median of 20, first call {first_ms:.2f}ms), "
+          f"per symbol {(time.perf_counter() - started) * 1e3:.2f}ms")
@@ -0,0 +1,139 @@
+# trading/ingest.py
+"""
+Bounded multi-producer, single-consumer queue between the socket readers and
+the candle store.
+
+Socket threads (or the asyncio loop) put decoded closed klines; one consumer
+thread applies them with ingest_kline, so the candle store, indicators and
+price history only ever have a single writer. Pending klines are kept in a
+FIFO per symbol, so every closed candle is applied in order. A kline with the
+same open time as the newest waiting one (a corrected candle) replaces it.
+Only when `maxsize` klines are already waiting does the queue shed load: a
+newer candle then replaces the newest waiting one of its symbol (that candle
+is lost), and a symbol with nothing waiting is dropped. Every outcome is
+counted.
+"""
+import threading
+import time
+
+
+class IngestQueue:
+    def __init__(self, maxsize=2048):
+        self.maxsize = int(maxsize)
+        self._pending = {}  # symbol -> [kline tuple, ...] oldest first, symbols in arrival order
+        self._size = 0      # klines waiting across all symbols
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+        self.enqueued = 0
+        self.coalesced = 0   # replaced a waiting kline with the same open time
+        self.superseded = 0  # queue full: replaced a waiting, older closed candle (that candle is lost)
+        self.dropped = 0     # queue full: rejected a symbol with nothing waiting
+        self.applied = 0
+        self.high_water = 0
+        self.last_lag = 0.0  # seconds the oldest kline of the last batch waited
+        self.max_lag = 0.0
+
+    @property
+    def depth(self):
+        return self._size
+
+    def put(self, symbol, open_time, open_, high, low, close, volume, received=None):
+        """Queue one closed kline. Returns False if it was dropped."""
+        if received is None:
+            received = time.perf_counter()
+        kline = (symbol, open_time, open_, high, low, close, volume, received)
+        with self._cond:
+            waiting = self._pending.get(symbol)
+            if waiting:
+                newest = waiting[-1]
+                if open_time < newest[1]:
+                    # older than what is already waiting: nothing to keep
+                    self.coalesced += 1
+                    return True
+                if open_time == newest[1] or self._size >= self.maxsize:
+                    if open_time == newest[1]:
+                        self.coalesced += 1
+                    else:
+                        self.superseded += 1
+                    # keep the original arrival time so lag reflects the oldest data
+                    waiting[-1] = kline[:-1] + (newest[-1],)
+                    return True
+                waiting.append(kline)
+            elif self._size >= self.maxsize:
+                self.dropped += 1
+                return False
+            else:
+                self._pending[symbol] = [kline]
+            self._size += 1
+            self.enqueued += 1
+            if self._size > self.high_water:
+                self.high_water = self._size
+            self._cond.notify()
+        return True
+
+    def take(self, timeout=None):
+        """Wait up to `timeout` for klines and take every pending one, each symbol's oldest first."""
+        with self._cond:
+            if not self._pending:
+                self._cond.wait(timeout)
+            batch, self._pending, self._size = self._pending, {}, 0
+        if batch:
+            self.last_lag = time.perf_counter() - min(klines[0][-1] for klines in batch.values())
+            if self.last_lag > self.max_lag:
+                self.max_lag = self.last_lag
+        return [kline for klines in batch.values() for kline in klines]
+
+    def start(self, consumer):
+        """Run `consumer(*kline)` for every queued kline on a single daemon thread."""
+        if self._thread is not None:
+            return self._thread
+        self._running = True
+
+        def run():
+            while self._running:
+                for kline in self.take(timeout=1.0):
+                    try:
+                        consumer(*kline)
+                    except Exception as e:
+                        print(f"❌ Ingest error for {kline[0]}: {e}")
+                    self.applied += 1
+
+        self._thread = threading.Thread(target=run, daemon=True, name="kline-ingest")
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def snapshot(self):
+        return {
+            "enqueued": self.enqueued,
+            "coalesced": self.coalesced,
+            "superseded": self.superseded,
+            "dropped": self.dropped,
+            "applied": self.applied,
+            "depth": self.depth,
+            "high_water": self.high_water,
+            "last_lag_ms": self.last_lag * 1e3,
+            "max_lag_ms": self.max_lag * 1e3,
+        }
+
+    def falling_behind(self, max_lag=1.0):
+        """True if the last batch waited longer than `max_lag` seconds or the queue is full."""
+        return self.last_lag > max_lag or self._size >= self.maxsize
+
+    def report(self):
+        s = self.snapshot()
+        return (
+            f"📥 Ingest queue: depth {s['depth']}/{self.maxsize} (high-water {s['high_water']}) | "
+            f"enqueued {s['enqueued']} applied {s['applied']} coalesced {s['coalesced']} "
+            f"superseded {s['superseded']} dropped {s['dropped']} | "
+            f"lag {s['last_lag_ms']:.1f}ms (max {s['max_lag_ms']:.1f}ms)"
+            + (" ⚠️ falling behind the feed" if self.falling_behind() else "")
+        )
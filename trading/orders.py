@@ -10,18 +10,19 @@ try:
 except Exception:
     config = None
 
+from trading.positions import CapitalAllocator, PositionBook
+from trading.snapshots import StateDomain
+from trading.timing import timed
+from trading.tracing import Trace, trace_stats
+
 try:
     import state
 except Exception:
     class _State:
-        in_position = False
-        current_symbol = None
-        last_entry_price = None
-        last_entry_amount = None
-        usdt_before = Decimal('0.0')
+        positions = PositionBook()
+        stats = StateDomain("stats", {"total_profit_loss": Decimal('0.0')})
         price_history = {}
         symbols_info_dict = {}
-        total_profit_loss = Decimal('0.0')
     state = _State()
 
 # Try to import bot helpers for shape parity (but don't call them in demo)
@@ -44,6 +45,17 @@ except Exception:
     class BinanceAPIException(Exception):
         pass
 
+# ----------------------
+# Exchange client
+# ----------------------
+exchange = None  # overrides config.client, e.g. a trading.fake_exchange.FakeExchange
+
+def get_client():
+    """The exchange client orders go to; None means the demo mocks below."""
+    if exchange is not None:
+        return exchange
+    return getattr(config, "client", None) if config else None
+
 # ----------------------
 # Mock exchange-layer (demo-safe)
 # ----------------------
@@ -111,22 +123,29 @@ def adjust_quantity(qty, step_size):
 # ----------------------
 # place_market_buy_order (demo)
 # ----------------------
-def place_market_buy_order(symbol):
+@timed("order.buy")
+def place_market_buy_order(symbol, trace=None):
     """
     Demo-safe buy: uses mock balance and mock order; no network required.
     Preserves original logic flow but replaces external calls with prints/mocks.
+    The order size is this position's share of MAX_TRADE_USDT (CapitalAllocator)
+    and the filled position is added to state.positions and returned.
+    `trace` (a Trace marked up to the buy decision) gets the exchange round
+    trips marked and is kept on the position; without one a trace starts here.
     """
-    if getattr(state, "in_position", False) and state.current_symbol == symbol:
+    if symbol in state.positions:
         print(f"[DEMO] 🚫 Already in a trade for {symbol}")
-        print("[DEMO] Would send bot message: Insufficient USDT balance")
         return
 
+    trace = trace or Trace(symbol, "decided")
+    client = get_client()
     try:
         # get balance (mock or real if config.client exists)
-        if config and hasattr(config, "client"):
-            bal = config.client.get_asset_balance(asset='USDT')['free']
+        if client:
+            bal = client.get_asset_balance(asset='USDT')['free']
         else:
             bal = mock_get_asset_balance('USDT')['free']
+        trace.mark("balance")
 
         usdt_balance = Decimal(str(bal))
         print(f"[DEMO] USDT balance available: {usdt_balance}")
@@ -135,44 +154,51 @@ def place_market_buy_order(symbol):
             print("[DEMO] 🚫 Insufficient USDT balance (demo)")
             return
 
-        notional = (usdt_balance * Decimal('0.999')).quantize(Decimal('0.0001'))
-        print(f"[DEMO] Computed notional: {notional}")
+        notional = CapitalAllocator.from_config().allocate(state.positions, usdt_balance)
+        print(f"[DEMO] Allocated notional: {notional} ({len(state.positions)} positions open)")
 
-        if notional < Decimal('10'):
-            print("[DEMO] Notional below exchange minimum (demo)")
+        if notional is None or notional < Decimal('10'):
+            print("[DEMO] No free position slot or notional below exchange minimum (demo)")
             return
 
-        if config and hasattr(config, "client"):
-            price = Decimal(config.client.get_symbol_ticker(symbol=symbol)['price'])
+        if client:
+            price = Decimal(client.get_symbol_ticker(symbol=symbol)['price'])
         else:
             price = Decimal(str(mock_get_symbol_ticker(symbol)['price']))
+        trace.mark("ticker")
 
         print(f"[DEMO] Market price for {symbol}: {price}")
 
-        qty = (usdt_balance / price)
+        info = state.symbols_info_dict.get(symbol, {})
+        min_qty = Decimal(str(info.get('min_qty', '0')))
+        qty = Decimal(str(adjust_quantity(notional / price, float(info.get('step_size', 0.000001)))))
 
-        if qty >= min_qty:
+        if qty > 0 and qty >= min_qty:
             print(f"[DEMO] Calculated quantity: {qty} (meets min {min_qty})")
             # place mock order
-            if config and hasattr(config, "client"):
-                order = config.client.order_market_buy(symbol=symbol, quantity=float(qty))
+            trace.mark("sent")
+            if client:
+                order = client.order_market_buy(symbol=symbol, quantity=float(qty))
             else:
                 order = mock_order_market_buy(symbol, float(qty))
-
-            state.in_position = True
-            state.current_symbol = symbol
+            trace.mark("filled")
 
             fills = order.get('fills', [])
             if fills:
                 total_cost = sum(Decimal(f['price']) * Decimal(f['qty']) for f in fills)
                 total_qty = sum(Decimal(f['qty']) for f in fills)
-                state.last_entry_price = Decimal(str(avg_price))
-                state.last_entry_amount = Decimal(str(total_qty))
-                state.usdt_before = Decimal(str(usdt_balance))
+                avg_price = total_cost / total_qty
+                position = state.positions.open(symbol, avg_price, total_qty, total_cost, usdt_before=usdt_balance,
+                                                trace=trace)
+                trace_stats.record(trace)
                 print(f"[DEMO] 📌 New Buy Trade (demo): {symbol} | entry={avg_price} | qty={total_qty}")
+                print(f"[DEMO] ⏱ {trace}")
+                monitor = getattr(state, "exit_monitor", None)
+                if monitor is not None:
+                    monitor.watch(symbol, position.entry_price)
                 # mimic sending bot message
                 print(f"[DEMO] Would send bot message: New Buy Trade for {symbol}")
-                return None
+                return position
             else:
                 print(f"[DEMO] ⚠️ No fills returned by mock order for {symbol}")
         else:
@@ -186,17 +212,32 @@ def place_market_buy_order(symbol):
         print(f"[DEMO] ❌ Unexpected error in buy order (demo): {e}")
         return None
 
+def close_position(symbol):
+    """Drop the symbol's position from the book and stop its exit monitor watch."""
+    position = state.positions.close(symbol)
+    monitor = getattr(state, "exit_monitor", None)
+    if monitor is not None:
+        monitor.unwatch(symbol)
+    return position
+
 # ----------------------
 # place_market_sell_order (demo)
 # ----------------------
+@timed("order.sell")
 def place_market_sell_order(symbol):
     """
-    Demo-safe sell: uses mock balances and mock orders. Resets position without real market activity.
+    Demo-safe sell: uses mock balances and mock orders. Sells the symbol's
+    position amount and removes it from state.positions.
     """
+    position = state.positions.get(symbol)
+    if position is None:
+        print(f"[DEMO] 🚫 No open position for {symbol}")
+        return
+    client = get_client()
     try:
         base_asset = symbol.replace('USDT', '')
-        if config and hasattr(config, "client"):
-            bal = config.client.get_asset_balance(asset=base_asset)['free']
+        if client:
+            bal = client.get_asset_balance(asset=base_asset)['free']
         else:
             bal = mock_get_asset_balance(base_asset)['free']
 
@@ -205,47 +246,56 @@ def place_market_sell_order(symbol):
             print(f"[DEMO] ⚠️ Balance is zero or less for {base_asset} (demo)")
             return
 
-        adjusted_balance = (balance * Decimal('0.999')).quantize(Decimal(f'1e-{precision}'), rounding=ROUND_DOWN)
+        info = state.symbols_info_dict.get(symbol, {})
+        precision = int(info.get('quantity_precision', 6))
+        min_qty = Decimal(str(info.get('min_qty', '0')))
+
+        # only this position's amount: other positions never share the base asset
+        adjusted_balance = (min(balance, position.amount) * Decimal('0.999')).quantize(
+            Decimal(f'1e-{precision}'), rounding=ROUND_DOWN)
         qty = adjusted_balance
         if qty < min_qty:
             print(f"[DEMO] ❌ Quantity ({qty}) < min ({min_qty}) for {symbol} (demo)")
-            state.in_position = False
-            state.current_symbol = None
+            close_position(symbol)
             return
         else:
             print(f"[DEMO] Placing mock sell for {symbol}, qty={qty}")
-            if config and hasattr(config, "client"):
-                order = config.client.order_market_sell(symbol=symbol, quantity=float(qty))
+            if client:
+                order = client.order_market_sell(symbol=symbol, quantity=float(qty))
             else:
                 order = mock_order_market_sell(symbol, float(qty))
 
             # simulate short delay
             time.sleep(0.5)
-            state.in_position = False
-            state.current_symbol = None
+            close_position(symbol)
 
             fills = order.get('fills', [])
             if fills:
                 total_cost = sum(Decimal(f['price']) * Decimal(f['qty']) for f in fills)
+                total_qty = sum(Decimal(f['qty']) for f in fills)
+                avg_price = total_cost / total_qty
                 # mock usdt after
-                if config and hasattr(config, "client"):
-                    usdt_after = Decimal(config.client.get_asset_balance(asset='USDT')['free'])
+                if client:
+                    usdt_after = Decimal(client.get_asset_balance(asset='USDT')['free'])
                 else:
                     usdt_after = Decimal(mock_get_asset_balance('USDT')['free'])
 
                 state.last_exit_price = avg_price
-                amount_dec = Decimal(str(state.last_entry_amount)) if state.last_entry_amount else Decimal('0')
-                entry_price_dec = Decimal(str(state.last_entry_price)) if state.last_entry_price else Decimal('0')
+                # the executed quantity, not position.amount: the order sells 99.9% of it
+                amount_dec = total_qty
+                entry_price_dec = position.entry_price
                 exit_price_dec = avg_price
 
-                profit_or_loss = ((exit_price_dec - entry_price_dec) / entry_price_dec * 100) if entry_price_dec > 0 else Decimal('0')
-                usd_profit_loss = usdt_after - state.usdt_before if hasattr(state, 'usdt_before') else Decimal('0')
-                state.total_profit_loss = getattr(state, 'total_profit_loss', Decimal('0')) + usd_profit_loss
+                # per position: the account balance also moves with the other open positions
+                sold_cost = position.cost_usdt * total_qty / position.amount
+                usd_profit_loss = total_cost - sold_cost
+                state.stats.update(lambda data: data.update(total_profit_loss=data["total_profit_loss"] + usd_profit_loss))
 
                 trade_status = "success" if exit_price_dec > entry_price_dec else "failure"
                 print(f"[DEMO] 🔻 Sell executed (demo) {symbol} avg_exit={avg_price} profit_usd={usd_profit_loss}")
                 # send trade report (demo stub)
-                send_trade_report(symbol, amount_dec, entry_price_dec, exit_price_dec, usdt_after, trade_status)
+                send_trade_report(symbol, amount_dec, entry_price_dec, exit_price_dec, usdt_after, trade_status,
+                                  cost_usdt=sold_cost)
                 # small delay similar to original
                 time.sleep(0.5)
                 return None
@@ -254,13 +304,11 @@ def place_market_sell_order(symbol):
 
     except BinanceAPIException as e:
         print(f"[DEMO] ❌ Binance API Error (demo): {e}")
-        state.in_position = False
-        state.current_symbol = None
+        close_position(symbol)
         return
     except Exception as e:
         print(f"[DEMO] ❌ Error in sell order (demo): {e}")
-        state.in_position = False
-        state.current_symbol = None
+        close_position(symbol)
         return
 
 # ----------------------
@@ -270,9 +318,10 @@ def check_balance():
     """
     Returns a float balance for USDT. In demo reads from mock_get_asset_balance.
     """
+    client = get_client()
     try:
-        if config and hasattr(config, "client"):
-            bal = float(config.client.get_asset_balance(asset='USDT')['free'])
+        if client:
+            bal = float(client.get_asset_balance(asset='USDT')['free'])
         else:
             bal = float(mock_get_asset_balance('USDT')['free'])
         print(f"[DEMO] check_balance -> {bal}")
@@ -286,32 +335,35 @@ def check_balance():
 # ----------------------
 def current_balance():
     """
-    Compute a human-readable report of the current open trade (demo). Returns string or None.
+    Compute a human-readable report of the open trades (demo). Returns string or None.
     """
     try:
-        if not getattr(state, "in_position", False) or not getattr(state, "current_symbol", None):
+        if not state.positions:
             print("[DEMO] 🚫 No active trade at the moment.")
             return None
 
-        if config and hasattr(config, "client"):
-            current_price = Decimal(config.client.get_symbol_ticker(symbol=state.current_symbol)['price'])
-        else:
-            current_price = Decimal(str(mock_get_symbol_ticker(state.current_symbol)['price']))
-
-        current_amount = Decimal(str(state.last_entry_amount)) if state.last_entry_amount else Decimal('0')
-        profit_or_loss = ((current_price - state.last_entry_price) / state.last_entry_price * 100) if state.last_entry_price else Decimal('0')
-        usd_profit_loss = current_value - (state.usdt_before if hasattr(state, 'usdt_before') else Decimal('0'))
-
-        report = (
-            f"⚡️ Current Trade (DEMO)\n"
-            f"🔹 Symbol: {state.current_symbol}\n"
-            f"💸 Entry Price: {state.last_entry_price}\n"
-            f"💰 Current Price: {current_price}\n"
-            f"📈 Current Balance: {current_value} USDT\n"
-            f"📈 Current P/L (%): {profit_or_loss:.2f}%\n"
-            f"💵 Current Profit: {usd_profit_loss:.2f} USDT\n"
-        )
-        print(f"[DEMO] Current value for {state.current_symbol}: {current_value} USDT")
+        client = get_client()
+        report = "⚡️ Current Trades (DEMO)\n"
+        for position in state.positions.positions():
+            symbol = position.symbol
+            if client:
+                current_price = Decimal(client.get_symbol_ticker(symbol=symbol)['price'])
+            else:
+                current_price = Decimal(str(mock_get_symbol_ticker(symbol)['price']))
+
+            current_value = position.value(current_price)
+            profit_or_loss = position.change_pct(current_price)
+            usd_profit_loss = current_value - position.cost_usdt
+
+            report += (
+                f"🔹 Symbol: {symbol}\n"
+                f"💸 Entry Price: {position.entry_price}\n"
+                f"💰 Current Price: {current_price}\n"
+                f"📈 Current Value: {current_value:.2f} USDT\n"
+                f"📈 Current P/L (%): {profit_or_loss:.2f}%\n"
+                f"💵 Current Profit: {usd_profit_loss:.2f} USDT\n"
+            )
+            print(f"[DEMO] Current value for {symbol}: {current_value} USDT")
         return report
     except Exception as e:
         print(f"[DEMO] ❌ Error while calculating current value (demo): {e}")
@@ -321,9 +373,15 @@ def current_balance():
 if __name__ == "__main__":
     # prepare demo symbol info
     state.symbols_info_dict['BTCUSDT'] = {'quantity_precision': 6, 'price_precision': 2, 'min_qty': '0.000001', 'step_size': 0.000001}
-    print("[DEMO] Running small demo sequence: BUY -> CURRENT -> SELL")
+    state.symbols_info_dict['ETHUSDT'] = {'quantity_precision': 5, 'price_precision': 2, 'min_qty': '0.0001', 'step_size': 0.0001}
+    print("[DEMO] Running small demo sequence: BUY x2 -> CURRENT -> SELL x2")
     place_market_buy_order('BTCUSDT')
+    place_market_buy_order('ETHUSDT')
     time.sleep(0.5)
     print(current_balance())
+    print(state.positions.report())
+    print(trace_stats.report())
     time.sleep(0.5)
-    place_market_sell_order('BTCUSDT')
\ No newline at end of file
+    place_market_sell_order('BTCUSDT')
+    place_market_sell_order('ETHUSDT')
+    print(state.positions.report())
\ No newline at end of file
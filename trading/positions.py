@@ -0,0 +1,148 @@
+# trading/positions.py
+"""
+Open positions, one record per symbol, and the capital split between them.
+
+PositionBook indexes the open Position records by symbol, so the exit checks
+walk only the held symbols and "already in this trade?" is one dict lookup.
+The book is a StateDomain: opens and closes go through its single writer
+thread, and reads (from the strategy, the exit monitor or Telegram) look at
+the latest immutable snapshot without locking.
+CapitalAllocator sizes each new entry: MAX_TRADE_USDT is shared by at most
+MAX_POSITIONS concurrent positions, each new one getting the uncommitted part
+of the budget divided by the free slots (capped by the free USDT balance).
+"""
+import time
+from decimal import Decimal
+
+from trading.snapshots import StateDomain
+
+try:
+    import config
+except Exception:
+    config = None
+
+
+class Position:
+    """One open trade; not modified once it is in the book."""
+    __slots__ = ("symbol", "entry_price", "amount", "cost_usdt", "usdt_before", "opened_at", "reasons", "trace")
+
+    def __init__(self, symbol, entry_price, amount, cost_usdt, usdt_before=None, reasons=(), trace=None):
+        self.symbol = symbol
+        self.entry_price = entry_price
+        self.amount = amount
+        self.cost_usdt = cost_usdt
+        self.usdt_before = usdt_before
+        self.opened_at = time.time()
+        self.reasons = tuple(reasons)
+        self.trace = trace  # signal-to-fill Trace of the entry (trading.tracing), if it was traced
+
+    def change_pct(self, price):
+        return (Decimal(str(price)) - self.entry_price) / self.entry_price * Decimal("100")
+
+    def value(self, price):
+        return self.amount * Decimal(str(price))
+
+    def __repr__(self):
+        return f"Position({self.symbol} {self.amount} @ {self.entry_price}, {self.cost_usdt} USDT)"
+
+
+class PositionBook:
+    """Open positions by symbol, in the order they were opened."""
+
+    def __init__(self, domain=None):
+        self.domain = domain or StateDomain("positions")
+
+    def open(self, symbol, entry_price, amount, cost_usdt, usdt_before=None, reasons=(), trace=None):
+        position = Position(symbol, Decimal(str(entry_price)), Decimal(str(amount)), Decimal(str(cost_usdt)),
+                            usdt_before, reasons, trace)
+
+        def add(data):
+            if symbol in data:
+                raise ValueError(f"Already in a position for {symbol}")
+            data[symbol] = position
+            return position
+        return self.domain.update(add)
+
+    def close(self, symbol):
+        """Remove and return the symbol's position (None if it has none)."""
+        return self.domain.update(lambda data: data.pop(symbol, None))
+
+    def clear(self):
+        self.domain.update(lambda data: data.clear())
+
+    @property
+    def _positions(self):
+        return self.domain.snapshot().data
+
+    def get(self, symbol):
+        return self._positions.get(symbol)
+
+    def symbols(self):
+        return list(self._positions)
+
+    def positions(self):
+        return list(self._positions.values())
+
+    @property
+    def committed_usdt(self):
+        return sum((p.cost_usdt for p in self._positions.values()), Decimal("0"))
+
+    def __contains__(self, symbol):
+        return symbol in self._positions
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __bool__(self):
+        return bool(self._positions)
+
+    def __iter__(self):
+        return iter(self._positions)
+
+    def report(self, prices=None):
+        """One line per position; `prices` ({symbol: price}) adds the unrealised change."""
+        positions = self._positions  # one snapshot for the whole report
+        if not positions:
+            return "📭 No open positions"
+        committed = sum((p.cost_usdt for p in positions.values()), Decimal("0"))
+        lines = [f"📒 {len(positions)} open positions, {committed:.2f} USDT committed:"]
+        for p in positions.values():
+            line = f"  {p.symbol}: {p.amount} @ {p.entry_price} ({p.cost_usdt:.2f} USDT)"
+            price = (prices or {}).get(p.symbol)
+            if price is not None:
+                line += f" → {price} ({p.change_pct(price):+.2f}%)"
+            lines.append(line)
+        return "\n".join(lines)
+
+
+class CapitalAllocator:
+    """Splits `max_trade_usdt` across up to `max_positions` concurrent positions."""
+
+    def __init__(self, max_trade_usdt=5000, max_positions=3, min_trade_usdt=11):
+        self.max_trade_usdt = Decimal(str(max_trade_usdt))
+        self.max_positions = int(max_positions)
+        self.min_trade_usdt = Decimal(str(min_trade_usdt))
+
+    @classmethod
+    def from_config(cls):
+        """Allocator with the current config limits (they can change from Telegram)."""
+        return cls(getattr(config, "MAX_TRADE_USDT", 5000), getattr(config, "MAX_POSITIONS", 3),
+                   getattr(config, "MIN_TRADE_USDT", 11))
+
+    def has_capacity(self, book):
+        return self.allocate(book) is not None
+
+    def allocate(self, book, free_usdt=None):
+        """
+        USDT to commit to the next entry, or None when the book is full or the
+        share would be below min_trade_usdt. `free_usdt` caps it at what the
+        account can pay (keeping 0.1% for fees).
+        """
+        slots = self.max_positions - len(book)
+        if slots <= 0:
+            return None
+        size = (self.max_trade_usdt - book.committed_usdt) / slots
+        if free_usdt is not None:
+            size = min(size, Decimal(str(free_usdt)) * Decimal("0.999"))
+        size = size.quantize(Decimal("0.0001"))
+        return size if size >= self.min_trade_usdt else None
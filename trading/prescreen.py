@@ -0,0 +1,231 @@
+# trading/prescreen.py
+"""
+First, cheap stage of the symbol scan.
+
+The candidate symbols' closes and volumes are gathered into one symbols x bars
+matrix and filtered with a few whole-matrix NumPy expressions, so the full
+indicator/condition stage only runs on the survivors. The filters, in order:
+
+- change:     percent change over the price-monitor horizon within MIN_INC..MAX_INC
+- resistance: last close no more than `resistance_pct` below the highest of the
+              previous `resistance_bars` closes (breakout candidates)
+- volume:     mean quote volume (close * volume) of the last `volume_bars`
+              bars at least `min_quote_volume`
+
+A filter whose threshold is None is skipped. The change is taken from the
+closes unless the Prescreen has a `changes` source, e.g. the live PriceWindows
+that "Price Increased Recently" reads. The strategy enables the change and
+resistance filters only where they are weaker than a buy condition the
+pipeline requires (see strategy.prescreen_settings), so screening never
+changes which symbols signal; check_parity() verifies that on a universe.
+"""
+import time
+from collections import deque
+
+import numpy as np
+
+from trading.candles import CLOSE, VOLUME
+
+
+def price_change(closes, bars=96):
+    """
+    Percent change of each row's last close over the last `bars` bars, from
+    the oldest close a shorter (NaN-padded) history has.
+    """
+    window = closes[:, -bars:]
+    first_valid = np.isfinite(window).argmax(axis=1)
+    first = window[np.arange(len(window)), first_valid]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (closes[:, -1] - first) / first * 100.0
+
+
+def screen(closes, volumes, min_inc=None, max_inc=None, change_bars=96, resistance_bars=19,
+           resistance_pct=None, min_quote_volume=None, volume_bars=4, changes=None):
+    """
+    Apply the filters to (symbols, bars) matrices aligned on the newest bar
+    (NaN-padded on the left). `changes` replaces price_change(closes) with
+    given per-row percent changes (NaN: unknown, filtered out).
+    Returns [(stage, cumulative survivor mask), ...].
+    """
+    last = closes[:, -1]
+    alive = np.isfinite(last)
+    stages = [("history", alive)]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if min_inc is not None or max_inc is not None:
+            change = price_change(closes, change_bars) if changes is None else changes
+            if min_inc is not None:
+                alive = alive & (change >= float(min_inc))
+            if max_inc is not None:
+                alive = alive & (change <= float(max_inc))
+            stages.append(("change", alive))
+
+        if resistance_pct is not None:
+            prior = closes[:, -resistance_bars - 1:-1]
+            resistance = np.nanmax(np.where(np.isfinite(prior), prior, -np.inf), axis=1)
+            alive = alive & (last >= resistance * (1.0 - float(resistance_pct) / 100.0))
+            stages.append(("resistance", alive))
+
+        if min_quote_volume is not None:
+            quote = closes[:, -volume_bars:] * volumes[:, -volume_bars:]
+            mean_quote = np.nanmean(np.where(np.isfinite(quote), quote, np.nan), axis=1)
+            alive = alive & (mean_quote >= float(min_quote_volume))
+            stages.append(("volume", alive))
+    return stages
+
+
+class ScanStats:
+    """Survivor counts and stage timings of the last scan, plus averages over recent scans."""
+
+    def __init__(self, history=256):
+        self.scans = 0
+        self.last = None
+        self._recent = deque(maxlen=history)
+
+    def record(self, candidates, stages, gather_s, screen_s, evaluate_s):
+        self.scans += 1
+        self.last = {
+            "candidates": candidates,
+            "survivors": [(name, int(mask.sum())) for name, mask in stages],
+            "gather_ms": gather_s * 1e3,
+            "screen_ms": screen_s * 1e3,
+            "evaluate_ms": evaluate_s * 1e3,
+        }
+        self._recent.append(self.last)
+
+    def report(self):
+        if self.last is None:
+            return "🔎 Pre-screen: no scans yet"
+        s = self.last
+        funnel = " → ".join(f"{name} {n}" for name, n in s["survivors"])
+        recent = self._recent
+        avg_total = sum(r["gather_ms"] + r["screen_ms"] + r["evaluate_ms"] for r in recent) / len(recent)
+        return (
+            f"🔎 Scan #{self.scans}: {s['candidates']} symbols → {funnel} | "
+            f"gather {s['gather_ms']:.2f}ms, screen {s['screen_ms']:.2f}ms, evaluate {s['evaluate_ms']:.2f}ms "
+            f"(avg total {avg_total:.2f}ms over {len(recent)} scans)"
+        )
+
+
+class Prescreen:
+    """
+    Two-stage scan over a CandleStore: screen() the candidates, then hand the
+    survivors to `evaluate` one by one. Filter settings are keyword arguments
+    of screen() and may be replaced between scans. `changes`, if given, is
+    changes(symbols) -> {symbol: percent change or None} for the change filter.
+    """
+
+    def __init__(self, store, changes=None, **settings):
+        self.store = store
+        self.changes = changes
+        self.settings = settings
+        self.stats = ScanStats()
+
+    @property
+    def bars(self):
+        s = self.settings
+        change_bars = s.get("change_bars", 96) if self.changes is None else 1
+        return max(change_bars, s.get("resistance_bars", 19) + 1, s.get("volume_bars", 4))
+
+    def survivors(self, symbols):
+        """Stage one only: (survivors, stages, gather seconds, screen seconds)."""
+        started = time.perf_counter()
+        closes, volumes = self.store.matrix(symbols, self.bars, (CLOSE, VOLUME))
+        changes = None
+        if self.changes is not None and (self.settings.get("min_inc") is not None
+                                         or self.settings.get("max_inc") is not None):
+            known = self.changes(symbols)
+            changes = np.array([np.nan if known.get(s) is None else known[s] for s in symbols], dtype=np.float64)
+        gathered = time.perf_counter()
+        stages = screen(closes, volumes, changes=changes, **self.settings)
+        screened = time.perf_counter()
+        mask = stages[-1][1]
+        return [s for s, keep in zip(symbols, mask) if keep], stages, gathered - started, screened - gathered
+
+    def run(self, symbols, stage):
+        """Screen `symbols` and return stage(survivors), timing it as the evaluate stage."""
+        survivors, stages, gather_s, screen_s = self.survivors(symbols)
+        started = time.perf_counter()
+        result = stage(survivors)
+        self.stats.record(len(symbols), stages, gather_s, screen_s, time.perf_counter() - started)
+        return result
+
+    def scan(self, symbols, evaluate=None, prepare=None):
+        """
+        Screen `symbols`, then call evaluate(symbol) on every survivor and
+        return {symbol: result} for the truthy results. If given,
+        prepare(survivors) runs first (timed with the evaluate stage) and
+        returns the evaluate function to use.
+        """
+        def stage(survivors):
+            fn = prepare(survivors) if prepare is not None else evaluate
+            results = {}
+            for symbol in survivors:
+                result = fn(symbol)
+                if result:
+                    results[symbol] = result
+            return results
+        return self.run(symbols, stage)
+
+
+def check_parity(scanner, symbols, evaluate):
+    """
+    Raise AssertionError unless scanning `symbols` through `scanner` finds the
+    same {symbol: result} as calling evaluate(symbol) on every one of them.
+    """
+    unscreened = {s: r for s, r in ((s, evaluate(s)) for s in symbols) if r}
+    screened = scanner.scan(symbols, evaluate)
+    if screened != unscreened:
+        lost = sorted(set(unscreened) - set(screened))
+        raise AssertionError(f"pre-screen changed the signals: lost {lost}, "
+                             f"extra {sorted(set(screened) - set(unscreened))}")
+    return screened
+
+# Screen a synthetic 400-symbol universe, check it finds the same signals as
+# evaluating every symbol and compare the timings
+if __name__ == "__main__":
+    import contextlib
+    import io
+
+    from trading.backtest import synthetic_history
+    from trading.candles import CandleStore
+    from trading.price_window import PriceWindows
+    from trading.ranking import TopK
+    from trading import strategy
+
+    store = CandleStore(capacity=120)
+    windows = PriceWindows(bucket_sec=900, horizon_minutes=1440)
+    for symbol, ohlcv in synthetic_history(400, 120, seed=7).items():
+        store.load(symbol, ohlcv.T.tolist())
+        for open_time, close in zip(ohlcv[0], ohlcv[4]):
+            windows.add(symbol, open_time / 1000.0 + 900, float(close))
+    symbols = list(store)
+    strategy.state.candles = store
+    strategy.state.price_history = windows
+    strategy.state.symbols_info_dict = {s: {"symbol": s} for s in symbols}
+
+    def evaluate(symbol):
+        # buy signals are only offered to a TopK, nothing is entered
+        with contextlib.redirect_stdout(io.StringIO()):
+            return strategy.evaluate_symbol(symbol, candidates=TopK(1))
+
+    for s in symbols:
+        evaluate(s)  # seed every symbol's indicator state first so both runs time evaluation only
+
+    for require_all in (False, True):
+        strategy.REQUIRE_ALL_CONDITIONS = require_all
+        strategy.USE_BULLISH_CROSS = not require_all
+        strategy.USE_BREAKOUT_CROSS = True
+        strategy.USE_PRICE_INCREASES_RECENTLY = require_all
+        strategy.PRESCREEN_RESISTANCE_PCT = 1.0
+        settings = strategy.prescreen_settings()
+        started = time.perf_counter()
+        for s in symbols:
+            evaluate(s)
+        full_ms = (time.perf_counter() - started) * 1e3
+
+        scanner = Prescreen(store, changes=strategy.window_changes, **settings)
+        signals = check_parity(scanner, symbols, evaluate)
+        print(f"{'all' if require_all else 'any'} of the buy conditions: same {len(signals)} signals with and "
+              f"without the pre-screen | full scan of {len(symbols)} symbols: {full_ms:.2f}ms")
+        print(scanner.stats.report())
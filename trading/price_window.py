@@ -0,0 +1,214 @@
+# trading/price_window.py
+"""
+Time-bucketed rolling price windows.
+
+Each symbol keeps a fixed ring of time buckets (first/last/min/max price per
+bucket) plus monotonic deques of bucket ids, bucket minima and bucket maxima.
+Oldest, newest, min, max and percent change over the current horizon are
+O(1) amortized: queries only pop buckets that fell out of the horizon.
+
+The horizon belongs to the PriceWindows store and can be changed at runtime.
+Shrinking it costs nothing up front; a window notices a longer horizon on its
+next query and rebuilds its deques from its own ring once, so no symbol is
+touched at the moment the setting changes.
+
+The ingest thread adds prices while the strategy thread queries them, and a
+query may evict or rebuild, so each window serializes both behind its own
+lock (uncontended almost always: one writer, one reader per symbol).
+"""
+import threading
+from collections import deque
+
+
+class PriceWindow:
+    """Rolling prices for one symbol, bucketed by `owner.bucket_sec`."""
+    __slots__ = ("_owner", "_first", "_last", "_min", "_max", "_ids", "_newest",
+                 "_bucket_ids", "_mins", "_maxs", "_horizon", "_lock")
+
+    def __init__(self, owner):
+        capacity = owner.capacity
+        self._owner = owner
+        self._first = [0.0] * capacity
+        self._last = [0.0] * capacity
+        self._min = [0.0] * capacity
+        self._max = [0.0] * capacity
+        self._ids = [-1] * capacity    # bucket id stored in each ring slot
+        self._newest = -1              # newest bucket id
+        self._bucket_ids = deque()     # non-empty bucket ids inside the horizon
+        self._mins = deque()           # (bucket id, min) with increasing mins
+        self._maxs = deque()           # (bucket id, max) with decreasing maxs
+        self._horizon = owner.horizon_buckets
+        self._lock = threading.Lock()
+
+    def add(self, ts, price):
+        """Record `price` at unix time `ts`. Points older than the newest bucket are ignored."""
+        bid = int(ts // self._owner.bucket_sec)
+        with self._lock:
+            if bid < self._newest:
+                return
+            slot = bid % self._owner.capacity
+            if bid == self._newest:
+                self._last[slot] = price
+                if price < self._min[slot]:
+                    self._min[slot] = price
+                if price > self._max[slot]:
+                    self._max[slot] = price
+            else:
+                self._ids[slot] = bid
+                self._first[slot] = self._last[slot] = self._min[slot] = self._max[slot] = price
+                self._newest = bid
+                self._bucket_ids.append(bid)
+                self._evict(bid - self._horizon + 1)
+
+            mins = self._mins
+            while mins and mins[-1][1] >= price:
+                mins.pop()
+            if not mins or mins[-1][0] != bid:
+                mins.append((bid, price))
+            maxs = self._maxs
+            while maxs and maxs[-1][1] <= price:
+                maxs.pop()
+            if not maxs or maxs[-1][0] != bid:
+                maxs.append((bid, price))
+
+    def _sync(self):
+        """Drop buckets outside the horizon, rebuilding first if the horizon grew."""
+        horizon = self._owner.horizon_buckets
+        if horizon > self._horizon:
+            self._rebuild(horizon)
+        self._horizon = horizon
+        self._evict(self._newest - horizon + 1)
+
+    def _evict(self, cutoff):
+        for dq in (self._mins, self._maxs):
+            while dq and dq[0][0] < cutoff:
+                dq.popleft()
+        ids = self._bucket_ids
+        while ids and ids[0] < cutoff:
+            ids.popleft()
+
+    def _rebuild(self, horizon):
+        self._bucket_ids.clear()
+        self._mins.clear()
+        self._maxs.clear()
+        capacity = self._owner.capacity
+        for bid in range(self._newest - horizon + 1, self._newest + 1):
+            slot = bid % capacity
+            if bid < 0 or self._ids[slot] != bid:
+                continue
+            self._bucket_ids.append(bid)
+            low, high = self._min[slot], self._max[slot]
+            while self._mins and self._mins[-1][1] >= low:
+                self._mins.pop()
+            self._mins.append((bid, low))
+            while self._maxs and self._maxs[-1][1] <= high:
+                self._maxs.pop()
+            self._maxs.append((bid, high))
+
+    def __len__(self):
+        """Number of non-empty buckets inside the horizon."""
+        with self._lock:
+            self._sync()
+            return len(self._bucket_ids)
+
+    @property
+    def oldest(self):
+        with self._lock:
+            self._sync()
+            if not self._bucket_ids:
+                return None
+            return self._first[self._bucket_ids[0] % self._owner.capacity]
+
+    @property
+    def newest(self):
+        with self._lock:
+            return self._last[self._newest % self._owner.capacity] if self._newest >= 0 else None
+
+    @property
+    def low(self):
+        with self._lock:
+            self._sync()
+            return self._mins[0][1] if self._mins else None
+
+    @property
+    def high(self):
+        with self._lock:
+            self._sync()
+            return self._maxs[0][1] if self._maxs else None
+
+    def pct_change(self):
+        """Percent change from the oldest to the newest price in the horizon (None if < 2 buckets)."""
+        with self._lock:
+            self._sync()
+            if len(self._bucket_ids) < 2:
+                return None
+            capacity = self._owner.capacity
+            oldest = self._first[self._bucket_ids[0] % capacity]
+            if not oldest:
+                return None
+            return (self._last[self._newest % capacity] - oldest) / oldest * 100.0
+
+    def clear(self):
+        with self._lock:
+            self._ids = [-1] * self._owner.capacity
+            self._newest = -1
+            self._bucket_ids.clear()
+            self._mins.clear()
+            self._maxs.clear()
+
+
+class PriceWindows:
+    """
+    Per-symbol PriceWindow sharing one bucket size and horizon. `max_minutes`
+    bounds how far back prices are kept (and how long the horizon can be).
+    """
+
+    def __init__(self, bucket_sec=900, horizon_minutes=1440, max_minutes=2880):
+        self.bucket_sec = bucket_sec
+        self.max_minutes = max_minutes
+        self.capacity = max(1, -(-int(max_minutes * 60) // int(bucket_sec)))
+        self.horizon_buckets = 1
+        self._windows = {}
+        self.set_horizon(horizon_minutes)
+
+    def set_horizon(self, minutes):
+        """
+        Change the horizon for every symbol; windows adjust lazily on their next
+        query. Raises ValueError beyond `max_minutes`, the history kept.
+        """
+        if minutes > self.max_minutes:
+            raise ValueError(f"{minutes} minutes is beyond the {self.max_minutes} minutes of prices kept")
+        buckets = -(-int(minutes * 60) // int(self.bucket_sec))
+        self.horizon_buckets = max(1, min(self.capacity, buckets))
+
+    @property
+    def horizon_minutes(self):
+        return self.horizon_buckets * self.bucket_sec / 60
+
+    def __contains__(self, symbol):
+        return symbol in self._windows
+
+    def __getitem__(self, symbol):
+        return self._windows[symbol]
+
+    def __iter__(self):
+        return iter(self._windows)
+
+    def __len__(self):
+        return len(self._windows)
+
+    def get(self, symbol, default=None):
+        return self._windows.get(symbol, default)
+
+    def window(self, symbol):
+        """Return the symbol's window, creating it if needed."""
+        w = self._windows.get(symbol)
+        if w is None:
+            w = self._windows[symbol] = PriceWindow(self)
+        return w
+
+    def add(self, symbol, ts, price):
+        self.window(symbol).add(ts, price)
+
+    def clear(self):
+        self._windows.clear()
@@ -0,0 +1,134 @@
+# trading/ranking.py
+"""
+Ranking of the buy signals found in one scan.
+
+Every symbol that meets the buy conditions is scored and offered to a TopK,
+a bounded min-heap holding the best `k` candidates: each offer is one
+heappush (or heapreplace once full), so collecting a scan's signals costs
+O(signals * log k) on top of the condition checks. The strategy then enters
+the best candidates first, as far as the position book has room.
+
+Scorers take the SignalContext of the symbol and return "higher is better":
+
+- rsi_distance: RSI points below RSI_OVERBOUGHT (room left before overbought)
+- breakout:     % of the last close above the breakout resistance
+- zlsma_gap:    % of the last close above the ZLSMA
+- volume:       mean quote volume (close * volume) of the last 4 bars
+- composite:    sum of the above, volume as log10
+"""
+import heapq
+import itertools
+import math
+
+
+def _rsi_distance(ctx):
+    return float(ctx.settings["RSI_OVERBOUGHT"]) - float(ctx.ind.rsi[-1])
+
+def _breakout(ctx):
+    resistance = getattr(ctx.ind, "resistance", None)
+    if not resistance:
+        return 0.0
+    return (float(ctx.price) - float(resistance)) / float(resistance) * 100.0
+
+def _zlsma_gap(ctx):
+    zlsma = float(ctx.ind.zlsma[-1]) if len(ctx.ind.zlsma) else 0.0
+    if not zlsma:
+        return 0.0
+    return (float(ctx.price) - zlsma) / zlsma * 100.0
+
+def _volume(ctx, bars=4):
+    volumes = ctx.volumes
+    if volumes is None or len(volumes) == 0:
+        return 0.0
+    closes, volumes = ctx.closes[-bars:], volumes[-bars:]
+    return float(sum(float(c) * float(v) for c, v in zip(closes, volumes)) / len(volumes))
+
+def _composite(ctx):
+    return _rsi_distance(ctx) + _breakout(ctx) + _zlsma_gap(ctx) + math.log10(1.0 + _volume(ctx))
+
+SCORERS = {
+    "rsi_distance": _rsi_distance,
+    "breakout": _breakout,
+    "zlsma_gap": _zlsma_gap,
+    "volume": _volume,
+    "composite": _composite,
+}
+
+
+def get_scorer(name):
+    try:
+        return SCORERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown signal score {name!r}; choose one of {', '.join(SCORERS)}") from None
+
+
+class Candidate:
+    """One buy signal of a scan."""
+    __slots__ = ("score", "symbol", "price", "rsi", "reasons")
+
+    def __init__(self, score, symbol, price, rsi, reasons):
+        self.score = score
+        self.symbol = symbol
+        self.price = price
+        self.rsi = rsi
+        self.reasons = reasons
+
+    def __repr__(self):
+        return f"Candidate({self.symbol}, score={self.score:.3f})"
+
+
+class TopK:
+    """The `k` best-scored candidates offered so far; ties keep the first offered."""
+
+    def __init__(self, k):
+        self.k = max(1, int(k))
+        self.offered = 0
+        self._heap = []  # (score, -arrival, candidate): the root is the weakest kept
+        self._arrival = itertools.count()
+
+    def offer(self, score, symbol, price, rsi, reasons):
+        self.offered += 1
+        if score != score:  # NaN (e.g. indicators not warmed up) ranks last
+            score = float("-inf")
+        arrival = -next(self._arrival)
+        heap = self._heap
+        if len(heap) < self.k:
+            heapq.heappush(heap, (score, arrival, Candidate(score, symbol, price, rsi, reasons)))
+        elif score > heap[0][0]:  # a later arrival never wins a tie
+            heapq.heapreplace(heap, (score, arrival, Candidate(score, symbol, price, rsi, reasons)))
+
+    def ranked(self):
+        """Kept candidates, best first."""
+        return [entry[2] for entry in sorted(self._heap, reverse=True)]
+
+    def __len__(self):
+        return len(self._heap)
+
+
+class RankingStats:
+    """The last scan's ranking, for the status view."""
+
+    def __init__(self):
+        self.scans = 0
+        self.score = None
+        self.offered = 0
+        self.ranked = []
+        self.entered = []
+
+    def record(self, score, top, entered):
+        self.scans += 1
+        self.score = score
+        self.offered = top.offered
+        self.ranked = top.ranked()
+        self.entered = list(entered)
+
+    def report(self):
+        if not self.scans:
+            return "🏅 Signal ranking: no scans yet"
+        if not self.ranked:
+            return f"🏅 Signal ranking (scan #{self.scans}): no buy signals"
+        lines = [f"🏅 Top {len(self.ranked)} of {self.offered} signals by {self.score} (scan #{self.scans}):"]
+        for n, c in enumerate(self.ranked, 1):
+            mark = " ✅" if c.symbol in self.entered else ""
+            lines.append(f"  {n}. {c.symbol} score {c.score:.2f} | RSI {c.rsi:.2f} | {c.price}{mark}")
+        return "\n".join(lines)
@@ -0,0 +1,200 @@
+# trading/recorder.py
+"""
+Record raw market-data frames to an append-only binary log and replay them
+through the ingestion path.
+
+Log format: an 8-byte file header (magic + version), then one record per
+frame: receive time in ns since the epoch (int64), payload length (uint32),
+CRC32 of the payload (uint32), payload bytes. A record cut short by a crash,
+or one whose CRC does not match, ends the log on read.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import struct
+import threading
+import time
+import zlib
+
+from trading.async_streaming import StreamStats, kline_frame, stream_groups
+from trading.streaming import chunk_list, demo_get_config, ingest_frame, state
+
+LOG_MAGIC = b"KLOG"
+LOG_VERSION = 1
+_FILE_HEADER = struct.Struct("<4sI")
+_RECORD = struct.Struct("<qII")
+
+
+class FrameRecorder:
+    """Append raw frames with their receive time; safe to share between threads."""
+
+    def __init__(self, path, buffer_size=1 << 16):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.path = path
+        self.frames = 0
+        self._file = open(path, "ab", buffering=buffer_size)
+        self._lock = threading.Lock()
+        if new:
+            self._file.write(_FILE_HEADER.pack(LOG_MAGIC, LOG_VERSION))
+
+    def write(self, raw, received_ns=None):
+        if isinstance(raw, str):
+            raw = raw.encode()
+        if received_ns is None:
+            received_ns = time.time_ns()
+        record = _RECORD.pack(received_ns, len(raw), zlib.crc32(raw))
+        with self._lock:
+            self._file.write(record)
+            self._file.write(raw)
+            self.frames += 1
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def tap(self, ingest=ingest_frame):
+        """Wrap an ingest function so every frame is recorded before it is ingested."""
+        def recording_ingest(raw):
+            self.write(raw)
+            return ingest(raw)
+        return recording_ingest
+
+
+def read_frames(path):
+    """Yield (received_ns, payload bytes) from a frame log, stopping at a torn or corrupt record."""
+    with open(path, "rb") as f:
+        header = f.read(_FILE_HEADER.size)
+        if len(header) < _FILE_HEADER.size:
+            return
+        magic, version = _FILE_HEADER.unpack(header)
+        if magic != LOG_MAGIC or version != LOG_VERSION:
+            raise ValueError(f"{path} is not a version {LOG_VERSION} frame log")
+        read = f.read
+        while True:
+            head = read(_RECORD.size)
+            if len(head) < _RECORD.size:
+                return
+            received_ns, length, crc = _RECORD.unpack(head)
+            payload = read(length)
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                print(f"⚠️ Frame log {path} ends with a damaged record; stopping there")
+                return
+            yield received_ns, payload
+
+
+def replay(path, ingest=ingest_frame, speed=None, stats=None):
+    """
+    Feed a frame log through `ingest`. speed=None replays as fast as possible;
+    otherwise frames are paced at `speed` times the recorded rate (1.0 = wall
+    clock). Returns StreamStats with per-frame ingest latency.
+    """
+    stats = stats or StreamStats()
+    first_ns = started = None
+    for received_ns, payload in read_frames(path):
+        if speed:
+            if first_ns is None:
+                first_ns, started = received_ns, time.perf_counter()
+            delay = started + (received_ns - first_ns) / 1e9 / speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        t0 = time.perf_counter()
+        try:
+            ingest(payload)
+        except Exception as e:
+            stats.errors += 1
+            print(f"[Replay] Ingest error: {e}")
+        stats.record(time.perf_counter() - t0)
+    return stats
+
+
+def peak_rate(path, window_sec=1.0):
+    """Highest number of recorded frames within any `window_sec` of receive time."""
+    times = [ns for ns, _ in read_frames(path)]
+    best, lo, window_ns = 0, 0, int(window_sec * 1e9)
+    for hi, ns in enumerate(times):
+        while ns - times[lo] >= window_ns:
+            lo += 1
+        best = max(best, hi - lo + 1)
+    return best
+
+# -------------------------
+# Capture and synthetic logs
+# -------------------------
+def record_stream(path, symbols, seconds, group_size=demo_get_config("SYMBOLS_PER_SOCKET", 40), **kwargs):
+    """Record the live combined kline streams for `symbols` for `seconds`, ingesting as usual."""
+    with FrameRecorder(path) as recorder:
+        async def run():
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(
+                    stream_groups(list(chunk_list(symbols, group_size)), ingest=recorder.tap(), **kwargs),
+                    timeout=seconds,
+                )
+        asyncio.run(run())
+        return recorder.frames
+
+def write_burst_log(path, n_symbols=400, bars=4, updates_per_bar=20, step_ms=900_000, jitter_ms=300):
+    """
+    Write a synthetic log shaped like live traffic: in-progress kline updates
+    spread across each bar, then every symbol's close landing within
+    `jitter_ms` of the bar boundary (the top-of-the-bar burst).
+    """
+    symbols = [f"SYM{i}USDT" for i in range(n_symbols)]
+    start_ms = 1_700_000_000_000
+    events = []
+    for b in range(bars):
+        open_ms = start_ms + b * step_ms
+        for s in symbols:
+            price = 100.0 + random.uniform(-1, 1)
+            for _ in range(updates_per_bar):
+                events.append((open_ms + random.uniform(0, step_ms - jitter_ms), s, open_ms, price, False))
+            events.append((open_ms + step_ms + random.uniform(0, jitter_ms), s, open_ms, price, True))
+    events.sort()
+    if os.path.exists(path):
+        os.remove(path)
+    with FrameRecorder(path) as recorder:
+        for at_ms, s, open_ms, price, closed in events:
+            recorder.write(kline_frame(s, open_ms, price, closed=closed, step_ms=step_ms), int(at_ms * 1e6))
+    return len(events)
+
+# Record, replay or benchmark a synthetic burst from the command line
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record and replay kline frame logs")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rec = sub.add_parser("record", help="record live kline streams")
+    rec.add_argument("path")
+    rec.add_argument("symbols", nargs="+")
+    rec.add_argument("--seconds", type=float, default=60)
+    rep = sub.add_parser("replay", help="replay a frame log through ingest_frame")
+    rep.add_argument("path")
+    rep.add_argument("--speed", type=float, default=None, help="1.0 = wall clock; omit for max speed")
+    demo = sub.add_parser("demo", help="replay a synthetic top-of-the-bar burst")
+    demo.add_argument("--path", default="cache/burst.klog")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        print(f"Recorded {record_stream(args.path, args.symbols, args.seconds)} frames to {args.path}")
+    else:
+        if args.command == "demo":
+            n = write_burst_log(args.path)
+            print(f"Wrote {n} frames to {args.path}, peak {peak_rate(args.path)} frames/s recorded")
+        with contextlib.redirect_stdout(io.StringIO()):
+            stats = replay(args.path, speed=getattr(args, "speed", None))
+        print(stats.report())
+        print(f"{sum(state.candles.count(s) for s in state.candles)} candles stored, "
+              f"{state.candle_events.pending()} symbols waiting for evaluation")
@@ -0,0 +1,200 @@
+# trading/sharded.py
+"""
+Entry scan sharded across worker processes.
+
+The symbol universe is split into one shard per worker. Workers map the
+coordinator's MappedCandleStore file read-only (MappedCandleReader), so no
+candle data is pickled: a task carries only its shard's symbol names, the
+strategy settings and each symbol's PriceWindow change, and returns the buy
+signals it found. Each worker computes
+its shard's indicators as one IndicatorMatrix and runs the compiled entry
+pipeline on every row.
+
+The coordinator (the strategy loop) keeps the position state, the exit checks
+of the held symbol and order placement; it only acts on the returned signals.
+The PriceWindows live in the coordinator too, so it ships their percent
+changes with the tasks and "Price increased recently" tests the same value
+as the in-process scan.
+"""
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+import numpy as np
+
+from trading.candles import CLOSE, HIGH, LOW, VOLUME, MappedCandleReader
+from trading.indicators_np import calculate_indicator_matrix
+from trading.ranking import get_scorer
+
+# -------------------------
+# Workers
+# -------------------------
+_reader = None
+_compiled = {}  # settings signature -> entry pipeline
+
+
+def _attach_worker(path):
+    global _reader
+    _reader = MappedCandleReader(path)
+
+def _entry_pipeline(settings):
+    from trading.strategy import compile_pipelines
+    signature = tuple(settings.items())
+    entry = _compiled.get(signature)
+    if entry is None:
+        _compiled.clear()
+        entry = _compiled[signature] = compile_pipelines(settings)[0]
+    return entry
+
+def evaluate_shard(symbols, settings, periods, bars, changes, min_bars, score="composite", reader=None):
+    """
+    Run the entry conditions for `symbols` on the last `bars` candles.
+    `changes` is {symbol: percent change or None} over the price-monitor
+    horizon, from the coordinator's PriceWindows, for "Price Increased
+    Recently". Returns (buy signals, seconds spent); a signal is a dict with
+    symbol, price, rsi, reasons and its `score` (a trading.ranking scorer name).
+    """
+    from trading.strategy import SignalContext
+    started = time.perf_counter()
+    reader = reader or _reader
+    closes, highs, lows, volumes = reader.matrix(symbols, bars, (CLOSE, HIGH, LOW, VOLUME))
+    matrix = calculate_indicator_matrix(closes, highs, lows, symbols, **periods)
+    entry = _entry_pipeline(settings)
+    scorer = get_scorer(score)
+
+    signals = []
+    for i, symbol in enumerate(symbols):
+        n = int(matrix.bars[i])
+        if n < max(2, min_bars):
+            continue
+        ind = matrix.row(symbol)
+        change = changes.get(symbol)
+        ctx = SignalContext(symbol, closes[i, -n:], ind, settings, price_change=change, volumes=volumes[i, -n:])
+        buy, reasons = entry.evaluate(ctx)
+        if buy:
+            signals.append({"symbol": symbol, "price": float(ctx.price), "rsi": float(ind.rsi[-1]),
+                            "reasons": reasons, "score": scorer(ctx)})
+    return signals, time.perf_counter() - started
+
+# -------------------------
+# Coordinator
+# -------------------------
+class ShardedScanner:
+    """
+    Process pool scanning shards of the symbol list against the candle file at
+    `path`. Workers are spawned rather than forked, since the coordinator
+    runs socket and bot threads.
+    """
+
+    def __init__(self, path, workers, history=256):
+        self.path = path
+        self.workers = int(workers)
+        self.scans = 0
+        self.last = None
+        self._recent = deque(maxlen=history)
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                         initializer=_attach_worker, initargs=(path,))
+
+    def scan(self, symbols, settings, periods, bars, changes, min_bars=12, score="composite"):
+        """Buy signals for `symbols`, in `symbols` order; `changes` as in evaluate_shard."""
+        started = time.perf_counter()
+        symbols = list(symbols)
+        # interleaved so every shard gets a similar mix of the list
+        shards = [symbols[i::self.workers] for i in range(self.workers)]
+        futures = [self._pool.submit(evaluate_shard, shard, settings, periods, bars,
+                                     {s: changes.get(s) for s in shard}, min_bars, score)
+                   for shard in shards if shard]
+        signals, shard_s = [], []
+        for future in futures:
+            found, elapsed = future.result()
+            signals += found
+            shard_s.append(elapsed)
+        order = {s: i for i, s in enumerate(symbols)}
+        signals.sort(key=lambda signal: order[signal["symbol"]])
+
+        self.scans += 1
+        self.last = {
+            "symbols": len(symbols),
+            "shards": len(futures),
+            "signals": len(signals),
+            "wall_ms": (time.perf_counter() - started) * 1e3,
+            "slowest_shard_ms": max(shard_s, default=0.0) * 1e3,
+        }
+        self._recent.append(self.last)
+        return signals
+
+    def report(self):
+        if self.last is None:
+            return "🧵 Sharded scan: no scans yet"
+        s = self.last
+        avg = sum(r["wall_ms"] for r in self._recent) / len(self._recent)
+        return (
+            f"🧵 Sharded scan #{self.scans}: {s['symbols']} symbols on {s['shards']} workers → "
+            f"{s['signals']} signals | {s['wall_ms']:.2f}ms (slowest shard {s['slowest_shard_ms']:.2f}ms, "
+            f"avg {avg:.2f}ms over {len(self._recent)} scans)"
+        )
+
+    def close(self):
+        self._pool.shutdown(cancel_futures=True)
+
+# Serial vs sharded scan of a synthetic 400-symbol universe held in a /dev/shm candle file
+if __name__ == "__main__":
+    import argparse
+    import contextlib
+    import io
+    import os
+    import tempfile
+
+    from trading.backtest import synthetic_history
+    from trading.candles import MappedCandleStore
+    from trading.price_window import PriceWindows
+    from trading import strategy
+
+    parser = argparse.ArgumentParser(description="Time the sharded entry scan")
+    parser.add_argument("--symbols", type=int, default=400)
+    parser.add_argument("--bars", type=int, default=120)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else None
+    handle, path = tempfile.mkstemp(suffix=".bin", dir=directory)
+    os.close(handle)
+    try:
+        store = MappedCandleStore(path, capacity=args.bars, max_symbols=args.symbols)
+        windows = PriceWindows(bucket_sec=900, horizon_minutes=1440)
+        for symbol, ohlcv in synthetic_history(args.symbols, args.bars, seed=7).items():
+            store.load(symbol, ohlcv.T.tolist())
+            for open_time, close in zip(ohlcv[0], ohlcv[4]):
+                windows.add(symbol, open_time / 1000.0 + 900, float(close))
+        symbols = list(store)
+        changes = {s: windows[s].pct_change() for s in symbols}
+        with contextlib.redirect_stdout(io.StringIO()):
+            settings, _, _ = strategy.get_pipelines()
+        settings = dict(settings, USE_BULLISH_CROSS=True, USE_PRICE_INCREASES_RECENTLY=True)
+        periods = strategy.indicator_periods()
+        scan_args = (settings, periods, args.bars, changes, strategy.LOOK_BACK + 2)
+
+        reader = MappedCandleReader(path)
+        serial = None
+        started = time.perf_counter()
+        for _ in range(args.rounds):
+            serial, _ = evaluate_shard(symbols, *scan_args, reader=reader)
+        serial_ms = (time.perf_counter() - started) / args.rounds * 1e3
+        print(f"Serial: {len(symbols)} symbols in {serial_ms:.2f}ms → {len(serial)} signals")
+
+        for workers in args.workers:
+            scanner = ShardedScanner(path, workers)
+            scanner.scan(symbols, *scan_args)  # spawn and warm the workers
+            started = time.perf_counter()
+            for _ in range(args.rounds):
+                signals = scanner.scan(symbols, *scan_args)
+            wall_ms = (time.perf_counter() - started) / args.rounds * 1e3
+            same = [s["symbol"] for s in signals] == [s["symbol"] for s in serial]
+            print(f"{workers} workers: {wall_ms:.2f}ms ({serial_ms / wall_ms:.2f}x), same signals: {same}")
+            print(scanner.report())
+            scanner.close()
+        print(f"CPU cores available: {os.cpu_count()}")
+    finally:
+        os.remove(path)
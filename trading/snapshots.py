@@ -0,0 +1,241 @@
+# trading/snapshots.py
+"""
+Versioned, immutable snapshots of shared state, one writer per domain.
+
+Each StateDomain (market data, positions, stats) owns a dict that only its
+writer thread modifies. A change is a function applied to a private copy of
+the current data; the copy is then published as a new Snapshot by swapping
+one reference. Readers call snapshot() and get a consistent, read-only view
+with a version number, without taking a lock: the reference load is atomic
+and a published snapshot is never modified again. Values stored in a domain
+must be immutable too (tuples, numbers, records nobody mutates).
+
+Any thread may call update(): from the writer thread the change is applied
+in place, from any other thread it is queued to the writer, which applies
+everything pending as one batch (one copy, one publish) and then wakes the
+waiting callers with their results.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from types import MappingProxyType
+
+
+class Snapshot:
+    """One published version of a domain's data (a read-only mapping)."""
+    __slots__ = ("version", "data", "published")
+
+    def __init__(self, version, data):
+        self.version = version
+        self.data = MappingProxyType(data)
+        self.published = time.time()
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __repr__(self):
+        return f"Snapshot(v{self.version}, {len(self.data)} keys)"
+
+
+class StateDomain:
+    """
+    Shared state with a single writer thread, started on the first update.
+    `max_batch` bounds how many queued changes share one copy/publish;
+    `max_pending` bounds the queue, so fast producers block instead of
+    building an unbounded backlog.
+    """
+
+    def __init__(self, name, initial=None, max_batch=256, max_pending=1024):
+        self.name = name
+        self.max_batch = max_batch
+        self.writes = 0
+        self.batches = 0
+        self._snapshot = Snapshot(0, dict(initial or {}))
+        self._queue = queue.Queue(max_pending)
+        self._start_lock = threading.Lock()
+        self._writer = None
+
+    def snapshot(self):
+        """The latest published Snapshot; lock-free."""
+        return self._snapshot
+
+    @property
+    def version(self):
+        return self._snapshot.version
+
+    def update(self, change, wait=True):
+        """
+        Apply change(data) and publish the result. `data` is a private dict
+        copy; the change's return value is returned once the new snapshot is
+        visible. With wait=False the change is only queued (returns None).
+        """
+        if threading.current_thread() is self._writer:
+            future = Future()
+            self._apply([(change, future)])
+            return future.result()
+        self._ensure_writer()
+        future = Future() if wait else None
+        self._queue.put((change, future))
+        return future.result() if wait else None
+
+    def _ensure_writer(self):
+        if self._writer is None:
+            with self._start_lock:
+                if self._writer is None:
+                    writer = threading.Thread(target=self._run, daemon=True, name=f"state-{self.name}")
+                    writer.start()
+                    self._writer = writer
+
+    def _apply(self, batch):
+        data = dict(self._snapshot.data)
+        outcomes = []
+        for change, _ in batch:
+            try:
+                outcomes.append((True, change(data)))
+            except Exception as e:
+                outcomes.append((False, e))
+        self._snapshot = Snapshot(self._snapshot.version + 1, data)
+        self.writes += len(batch)
+        self.batches += 1
+        # waiters resume only after the snapshot holding their change is published
+        for (_, future), (ok, value) in zip(batch, outcomes):
+            if future is None:
+                if not ok:
+                    print(f"❌ [{self.name}] state change failed: {value}")
+            elif ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def _run(self):
+        get, get_nowait = self._queue.get, self._queue.get_nowait
+        while True:
+            batch = [get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(get_nowait())
+                except queue.Empty:
+                    break
+            self._apply(batch)
+
+    def report(self):
+        per_batch = self.writes / self.batches if self.batches else 0.0
+        return (f"🗂 {self.name}: v{self._snapshot.version}, {len(self._snapshot)} keys | "
+                f"{self.writes} writes in {self.batches} publishes ({per_batch:.1f} per publish)")
+
+# Stress: many readers checking an invariant while many threads submit writes
+# (queued like kline ingestion, plus one thread waiting on each write like an
+# order fill), against a dict behind one lock as the baseline
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Hammer a StateDomain from many threads")
+    parser.add_argument("--seconds", type=float, default=2.0, help="duration of each round")
+    parser.add_argument("--writers", type=int, default=4, help="threads queueing changes without waiting")
+    parser.add_argument("--rate", type=float, default=1000, help="changes/s per queueing writer (0 = unpaced)")
+    parser.add_argument("--readers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--keys", type=int, default=400)
+    args = parser.parse_args()
+    sys.setswitchinterval(0.0005)
+    initial = {**{f"k{i}": 0 for i in range(args.keys)}, "total": 0}
+
+    def move(data):
+        # invariant: the values always sum to zero and "total" counts the moves
+        i = data["total"] % args.keys
+        data[f"k{i}"] += 1
+        data[f"k{(i + 1) % args.keys}"] -= 1
+        data["total"] += 1
+
+    def balance(data):
+        return sum(v for k, v in data.items() if k != "total")
+
+    class LockedState:
+        """Baseline: one dict mutated in place, every access under one lock."""
+
+        def __init__(self, data):
+            self.data, self.version, self.writes = dict(data), 0, 0
+            self.lock = threading.Lock()
+
+        def update(self, change, wait=True):
+            with self.lock:
+                change(self.data)
+                self.version += 1
+                self.writes += 1
+
+        def check(self):
+            with self.lock:
+                return self.version, balance(self.data)
+
+    def run_round(store, check, n_readers):
+        stop = threading.Event()
+        reads, torn, regressions = [0] * n_readers, [0] * n_readers, [0] * n_readers
+        waits = []
+
+        def writer():
+            interval = 1.0 / args.rate if args.rate else 0.0
+            next_at = time.perf_counter()
+            while not stop.is_set():
+                store.update(move, wait=False)
+                if interval:
+                    next_at += interval
+                    delay = next_at - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+
+        def waiting_writer():
+            while not stop.is_set():
+                started = time.perf_counter()
+                store.update(move)
+                waits.append(time.perf_counter() - started)
+
+        def reader(slot):
+            last_version = -1
+            while not stop.is_set():
+                version, total = check()
+                if total != 0:
+                    torn[slot] += 1
+                if version < last_version:
+                    regressions[slot] += 1
+                last_version = version
+                reads[slot] += 1
+
+        threads = [threading.Thread(target=writer) for _ in range(args.writers)]
+        threads.append(threading.Thread(target=waiting_writer))
+        threads += [threading.Thread(target=reader, args=(i,)) for i in range(n_readers)]
+        for t in threads:
+            t.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+        store.update(lambda data: None)  # drain queued writes
+        waits.sort()
+        return (f"{sum(reads) / args.seconds:>8.0f} reads/s ({sum(reads) / args.seconds / n_readers:.0f} per reader), "
+                f"{store.writes / args.seconds:>7.0f} writes/s, waited write p50 {waits[len(waits) // 2] * 1e3:.2f}ms "
+                f"max {waits[-1] * 1e3:.2f}ms | torn reads {sum(torn)}, version regressions {sum(regressions)}")
+
+    pace = f"{args.rate:.0f}/s each" if args.rate else "unpaced"
+    print(f"{args.writers} queueing writers ({pace}) + 1 waiting writer, {args.keys} keys, {args.seconds:.1f}s per round")
+    for n_readers in args.readers:
+        domain = StateDomain("stress", initial)
+
+        def check_snapshot():
+            snap = domain.snapshot()
+            return snap.version, balance(snap.data)
+        print(f"{n_readers:>3} readers, snapshots: {run_round(domain, check_snapshot, n_readers)}")
+        locked = LockedState(initial)
+        print(f"{n_readers:>3} readers, one lock:  {run_round(locked, locked.check, n_readers)}")
@@ -1,5 +1,7 @@
 # trading/strategy_demo.py
 from decimal import Decimal
+from functools import cached_property
+from types import SimpleNamespace
 import time
 import random
 
@@ -10,18 +12,30 @@ try:
 except Exception:
     config = None
 
+from trading.candles import CandleStore
+from trading.conditions import Condition, ConditionPipeline
+from trading.prescreen import Prescreen
+from trading.events import CandleCloseEvents
+from trading.orders import place_market_buy_order, place_market_sell_order
+from trading.positions import CapitalAllocator, PositionBook
+from trading.ranking import RankingStats, TopK, get_scorer
+from trading.streaming import build_indicator_state, indicator_periods
+from trading.timing import clock, timed, timers
+from trading.tracing import take_trace, trace_stats
+
 try:
     import state
 except Exception:
     # Minimal demo state object
     class _State:
-        candles = {}
+        candles = CandleStore(capacity=120)
         is_trading_active = False
-        in_position = False
-        current_symbol = None
-        last_entry_price = None
-        usdt_before = None
+        positions = PositionBook()
         symbols_info_dict = {}
+        indicators = {}
+        stale_indicators = set()
+        candle_events = CandleCloseEvents()
+        traces = {}
     state = _State()
 
 # Import indicator function names (assumed present). In demo they will be stubbed if missing.
@@ -46,6 +60,8 @@ detect_macd_bearish_divergence = _safe_import("detect_macd_bearish_divergence")
 detect_macd_bullish_divergence = _safe_import("detect_macd_bullish_divergence")
 is_breakout = _safe_import("is_breakout")
 calculate_atr = _safe_import("calculate_atr")
+IndicatorState = _safe_import("IndicatorState")
+indicator_matrix = _safe_import("indicator_matrix")
 
 # Placeholder for symbols util
 try:
@@ -75,13 +91,26 @@ def demo_get_config(attr, default):
 
 # Safe demo defaults (used when config is absent)
 TRADE_INTERVAL = demo_get_config("TRADE_INTERVAL", 5)  # seconds in demo
+STRATEGY_MODE = demo_get_config("STRATEGY_MODE", "poll")  # "poll" (rescan every TRADE_INTERVAL) or "events"
+EVENT_REPORT_INTERVAL = demo_get_config("EVENT_REPORT_INTERVAL", 900)  # seconds between latency reports
 EMA_SHORT = demo_get_config("EMA_SHORT", 12)
 EMA_LONG = demo_get_config("EMA_LONG", 26)
 RSI_PERIOD = demo_get_config("RSI_PERIOD", 14)
 ZLSAMA_PERIOD = demo_get_config("ZLSAMA_PERIOD", 21)
 LOOK_BACK = demo_get_config("LOOK_BACK", 10)
+BREAKOUT_PERIOD = demo_get_config("BREAKOUT_PERIOD", 20)
+CHANDELIER_PERIOD = demo_get_config("CHANDELIER_PERIOD", 22)
 RSI_OVERSELL = demo_get_config("RSI_OVERSELL", 30)
 RSI_OVERBOUGHT = demo_get_config("RSI_OVERBOUGHT", 70)
+MIN_INCREASE = demo_get_config("MIN_INCREASE", 0.5)
+MAX_INCREASE = demo_get_config("MAX_INCREASE", 5.0)
+REQUIRE_ALL_CONDITIONS = demo_get_config("REQUIRE_ALL_CONDITIONS", False)  # all enabled buy conditions instead of any
+
+# Pre-screen: cheap whole-universe filters before the full condition stage
+USE_PRESCREEN = demo_get_config("USE_PRESCREEN", False)
+PRESCREEN_RESISTANCE_PCT = demo_get_config("PRESCREEN_RESISTANCE_PCT", None)  # max % below resistance; None = off
+PRESCREEN_MIN_QUOTE_VOLUME = demo_get_config("PRESCREEN_MIN_QUOTE_VOLUME", None)  # USDT per bar; None = off
+PRESCREEN_VOLUME_BARS = demo_get_config("PRESCREEN_VOLUME_BARS", 4)
 
 # Feature flags (demo: keep structure but safe defaults)
 USE_BULLISH_CROSS = demo_get_config("USE_BULLISH_CROSS", True)
@@ -99,6 +128,31 @@ USE_CHANDELIER_CROSS = demo_get_config("USE_CHANDELIER_CROSS", False)
 USE_MACD_BEARISH = demo_get_config("USE_MACD_BEARISH", False)
 USE_PRICE_BELOW_ZLSMA = demo_get_config("USE_PRICE_BELOW_ZLSMA", False)
 
+# Indicator backend: "decimal" (exact, default) or "numpy" (vectorized float64)
+INDICATOR_BACKEND = demo_get_config("INDICATOR_BACKEND", "decimal")
+# Compute each scan's indicators for all its symbols at once instead of per-symbol incremental state
+BATCH_INDICATORS = demo_get_config("BATCH_INDICATORS", False)
+# Worker processes sharing the entry scan (0 = scan in this process); needs a MappedCandleStore
+STRATEGY_WORKERS = demo_get_config("STRATEGY_WORKERS", 0)
+# Ranking of a scan's buy signals (trading.ranking.SCORERS) and how many to keep
+SIGNAL_SCORE = demo_get_config("SIGNAL_SCORE", "composite")
+SIGNAL_TOP_K = demo_get_config("SIGNAL_TOP_K", 5)
+# Buy signals go to place_market_buy_order instead of a demo book entry
+PLACE_ORDERS = demo_get_config("PLACE_ORDERS", False)
+get_indicator_backend = _safe_import("get_indicator_backend")
+as_series = list
+if get_indicator_backend:
+    _backend = get_indicator_backend(INDICATOR_BACKEND)
+    as_series = _backend.as_series
+    calculate_zlsma = _backend.calculate_zlsma
+    calculate_atr = _backend.calculate_atr
+    find_resistance = _backend.find_resistance
+    is_breakout = _backend.is_breakout
+    detect_rsi_bullish_divergence = _backend.detect_rsi_bullish_divergence
+    detect_rsi_bearish_divergence = _backend.detect_rsi_bearish_divergence
+    detect_macd_bearish_divergence = _backend.detect_macd_bearish_divergence
+    detect_macd_bullish_divergence = _backend.detect_macd_bullish_divergence
+
 # ----------------------
 # Mock exchange helpers (no network)
 # ----------------------
@@ -111,30 +165,451 @@ def mock_get_symbol_ticker(symbol='BTCUSDT'):
     price = random.uniform(100.0, 60000.0) if "BTC" in symbol else random.uniform(10.0, 4000.0)
     return {'price': f"{price:.2f}"}
 
+# ----------------------
+# Incremental indicator access
+# ----------------------
+def get_indicator_state(symbol, candles):
+    """
+    Return the symbol's IndicatorState. If it is missing or was built with other
+    indicator periods than config has now, the symbol is marked stale for the
+    ingest writer to reseed on its next candle (state.indicators has that one
+    writer), and a private state seeded from the stored candles is used here.
+    """
+    periods = indicator_periods()
+    ind = state.indicators.get(symbol)
+    if ind is None or not ind.matches(**periods):
+        state.stale_indicators.add(symbol)
+        ind = build_indicator_state(candles, periods)
+    return ind
+
+# ----------------------
+# Compiled buy/sell conditions
+# ----------------------
+class SignalContext:
+    """One symbol's evaluation inputs; derived series are built only if a condition asks for them."""
+
+    def __init__(self, symbol, closes, ind, settings, price_change=None, volumes=None):
+        self.symbol = symbol
+        self.closes = closes
+        self.volumes = volumes
+        self.ind = ind
+        self.settings = settings
+        self.price = closes[-1]
+        # % change over the price-monitor horizon when precomputed (worker processes have no PriceWindows)
+        self.price_change = price_change
+
+    @cached_property
+    def rsi_tail(self):
+        return list(self.ind.rsi)
+
+    @cached_property
+    def macd_tail(self):
+        return list(self.ind.macd)
+
+    @cached_property
+    def closes_tail(self):
+        # divergence detectors work on aligned series tails
+        return as_series(self.closes)[-len(self.rsi_tail):]
+
+def _short_below_long_before(ctx):
+    window = slice(-(LOOK_BACK + 2), -2)
+    prev_short, prev_long = list(ctx.ind.ema_short)[window], list(ctx.ind.ema_long)[window]
+    return all(sv < lv for sv, lv in zip(prev_short, prev_long))
+
+def _macd_cross(ind, bullish):
+    if bullish:
+        return ind.macd[-2] <= ind.signal[-2] and ind.macd[-1] > ind.signal[-1]
+    return ind.macd[-2] >= ind.signal[-2] and ind.macd[-1] < ind.signal[-1]
+
+def _price_increased(ctx):
+    if ctx.price_change is not None:
+        # shipped from the coordinator's PriceWindows; compared like price_increased_recently
+        return ctx.settings["MIN_INC"] <= Decimal(str(ctx.price_change)) <= ctx.settings["MAX_INC"]
+    window = state.price_history.get(ctx.symbol) if hasattr(state, "price_history") else None
+    return price_increased_recently(window, ctx.settings["MIN_INC"], ctx.settings["MAX_INC"])
+
+def window_changes(symbols):
+    """
+    {symbol: PriceWindow percent change over the MONITOR_MINUTES horizon, or
+    None}: the value "Price Increased Recently" tests, for the pre-screen and
+    the scan workers, which cannot read state.price_history themselves.
+    """
+    windows = getattr(state, "price_history", None)
+    changes = {}
+    for symbol in symbols:
+        window = windows.get(symbol) if windows is not None else None
+        changes[symbol] = window.pct_change() if window is not None else None
+    return changes
+
+def _tporsl_cross(ctx):
+    live_price = Decimal(mock_get_symbol_ticker(symbol=ctx.symbol)['price'])
+    try:
+        return hit_tp_or_sl(state.positions.get(ctx.symbol).entry_price, live_price)
+    except Exception:
+        return False
+
+# (flag, reason, predicate, prior cost in ns); a missing indicator function disables its condition
+ENTRY_CONDITIONS = (
+    ("USE_BULLISH_CROSS", "📈 Bullish Cross",
+     lambda c: c.ind.ema_short[-2] <= c.ind.ema_long[-2] and c.ind.ema_short[-1] > c.ind.ema_long[-1], 500),
+    ("USE_BELOW_BEFORE", "🔻 Short Below Long Before", _short_below_long_before, 3000),
+    ("USE_RSI_CRITICAL", lambda c: f"💡 RSI Critical ({c.ind.rsi[-1]:.2f})",
+     lambda c: c.settings["RSI_OVERSELL"] <= c.ind.rsi[-1] <= c.settings["RSI_OVERBOUGHT"], 300),
+    ("USE_PRICE_INCREASES_RECENTLY", "📊 Price Increased Recently",
+     _price_increased if price_increased_recently else None, 5000),
+    ("USE_EMA_SLOPE", "📐 EMA Slope Positive",
+     lambda c: len(c.ind.ema_long) >= 4 and c.ind.ema_long[-1] > c.ind.ema_long[-4], 300),
+    ("USE_PRICE_ABOVE_ZLSMA", "⬆️ Price Above ZLSMA", lambda c: c.price > c.ind.zlsma[-1], 300),
+    ("USE_MACD_BULLISH", "📈 MACD Bullish", lambda c: _macd_cross(c.ind, bullish=True), 500),
+    ("USE_BREAKOUT_CROSS", "🚀 Breakout Above Resistance", lambda c: bool(c.ind.breakout), 200),
+    ("USE_RSI_BULLISH_DIVERGENCE", "📈 RSI Bullish Divergence",
+     (lambda c: bool(detect_rsi_bullish_divergence(c.closes_tail, c.rsi_tail)))
+     if detect_rsi_bullish_divergence else None, 50000),
+    ("USE_MACD_BULLISH_DIVERGENCE", "📈 MACD Bullish Divergence",
+     (lambda c: bool(detect_macd_bullish_divergence(c.closes_tail, c.macd_tail)))
+     if detect_macd_bullish_divergence else None, 50000),
+)
+# sell when TP/SL is hit, or when all three indicator exits hold together
+TPORSL_CONDITION = ("USE_TPORSL_CROSS", "🎯 Take Profit / Stop Loss Cross",
+                    _tporsl_cross if hit_tp_or_sl else None, 20000)
+INDICATOR_EXIT_CONDITIONS = (
+    ("USE_CHANDELIER_CROSS", "💡 Chandelier Exit",
+     lambda c: c.ind.chandelier is not None and c.price < c.ind.chandelier, 200),
+    ("USE_MACD_BEARISH", "📉 MACD Bearish", lambda c: _macd_cross(c.ind, bullish=False), 500),
+    ("USE_PRICE_BELOW_ZLSMA", "⬇️ Price Below ZLSMA", lambda c: c.price < c.ind.zlsma[-1], 300),
+)
+PIPELINE_SETTINGS = (
+    tuple(spec[0] for spec in ENTRY_CONDITIONS + (TPORSL_CONDITION,) + INDICATOR_EXIT_CONDITIONS)
+    + ("RSI_OVERSELL", "RSI_OVERBOUGHT", "MIN_INCREASE", "MAX_INCREASE", "REQUIRE_ALL_CONDITIONS")
+)
+
+def _compile(specs, settings):
+    return [Condition(flag, predicate, label, cost)
+            for flag, label, predicate, cost in specs if settings[flag] and predicate]
+
+def compile_pipelines(settings):
+    entry = ConditionPipeline("Buy conditions", _compile(ENTRY_CONDITIONS, settings),
+                              require_all=settings["REQUIRE_ALL_CONDITIONS"])
+    exits = _compile((TPORSL_CONDITION,), settings)
+    indicator_exits = _compile(INDICATOR_EXIT_CONDITIONS, settings)
+    if len(indicator_exits) == len(INDICATOR_EXIT_CONDITIONS):
+        exits.append(ConditionPipeline("Indicator exit", indicator_exits, require_all=True))
+    return entry, ConditionPipeline("Sell conditions", exits)
+
+_pipelines = None  # (settings signature, settings, entry pipeline, exit pipeline)
+
+def get_pipelines():
+    """
+    Return (settings, entry, exit), recompiling when a setting changed in
+    config (e.g. from the Telegram "Edit Variables" flow).
+    """
+    global _pipelines
+    settings = {name: demo_get_config(name, globals()[name]) for name in PIPELINE_SETTINGS}
+    signature = tuple(settings.values())
+    if _pipelines is None or _pipelines[0] != signature:
+        settings["MIN_INC"] = Decimal(str(settings["MIN_INCREASE"]))
+        settings["MAX_INC"] = Decimal(str(settings["MAX_INCREASE"]))
+        _pipelines = (signature, settings) + compile_pipelines(settings)
+    return _pipelines[1:]
+
+def condition_report():
+    _, entry, exits = get_pipelines()
+    return entry.report() + "\n" + exits.report()
+
+def evaluator(symbols, candidates=None):
+    """
+    Return the per-symbol evaluate function for a scan of `symbols`: with
+    BATCH_INDICATORS, their indicators are computed once as one matrix and each
+    symbol is evaluated on its row. Buy signals go to `candidates` (a TopK)
+    when given, see evaluate_symbol.
+    """
+    if not (BATCH_INDICATORS and indicator_matrix and symbols):
+        return lambda symbol: evaluate_symbol(symbol, candidates=candidates)
+    matrix = indicator_matrix(state.candles, symbols, state.candles.capacity, **indicator_periods())
+    return lambda symbol: evaluate_symbol(symbol, matrix.row(symbol), candidates)
+
+# ----------------------
+# Pre-screen (first scan stage)
+# ----------------------
+_prescreen = None
+
+def prescreen_settings():
+    """
+    Pre-screen filters for the current config. A filter runs only when it can
+    drop nothing but symbols the entry pipeline would reject anyway, so the
+    scan finds the same signals with or without the pre-screen:
+
+    - change: when "Price Increased Recently" is required (all conditions
+      required and it is enabled); it screens the same PriceWindow change
+      the condition tests (window_changes)
+    - resistance: when the breakout cross is required; a close at most
+      PRESCREEN_RESISTANCE_PCT (>= 0) below the resistance is weaker than
+      the breakout itself
+    - volume: no buy condition stands for it, so it is a liquidity rule of
+      its own that changes what can trade; only with PRESCREEN_MIN_QUOTE_VOLUME
+    """
+    settings, entry, _ = get_pipelines()
+    required = {c.name for c in entry.conditions} if entry.require_all else set()
+    change = "USE_PRICE_INCREASES_RECENTLY" in required
+    resistance_pct = demo_get_config("PRESCREEN_RESISTANCE_PCT", PRESCREEN_RESISTANCE_PCT)
+    if resistance_pct is not None:
+        resistance_pct = max(0.0, float(resistance_pct)) if "USE_BREAKOUT_CROSS" in required else None
+    return dict(
+        min_inc=settings["MIN_INCREASE"] if change else None,
+        max_inc=settings["MAX_INCREASE"] if change else None,
+        resistance_bars=indicator_periods()["breakout_period"] - 1,
+        resistance_pct=resistance_pct,
+        min_quote_volume=demo_get_config("PRESCREEN_MIN_QUOTE_VOLUME", PRESCREEN_MIN_QUOTE_VOLUME),
+        volume_bars=PRESCREEN_VOLUME_BARS,
+    )
+
+def get_prescreen():
+    """The shared Prescreen, with filter settings refreshed from config."""
+    global _prescreen
+    settings = prescreen_settings()
+    if _prescreen is None:
+        _prescreen = Prescreen(state.candles, changes=window_changes, **settings)
+    _prescreen.store = state.candles
+    _prescreen.settings = settings
+    return _prescreen
+
+# ----------------------
+# Per-symbol evaluation
+# ----------------------
+_ENTRY_CONDITIONS = timers.stage("conditions.entry")
+_EXIT_CONDITIONS = timers.stage("conditions.exit")
+
+def has_enough_bars(symbol):
+    periods = indicator_periods()
+    return state.candles.count(symbol) >= max(periods["ema_long"], periods["rsi_period"])
+
+def evaluate_symbol(symbol, ind=None, candidates=None):
+    """
+    Run the entry/exit checks for one symbol on its latest candles.
+    `ind` may be a row of a batched IndicatorMatrix instead of the symbol's
+    incremental IndicatorState. With `candidates` (a TopK), a buy signal is
+    scored and offered to it instead of entered ("signal"). Returns "buy" or
+    "sell" when a (demo) order was placed, else None.
+    """
+    # zero-copy float64 views into the symbol's candle ring buffer
+    candles = state.candles[symbol]
+    closes = candles.closes
+    if len(closes) == 0:
+        return None
+
+    # EMA/RSI/ZLSMA/MACD come from the per-symbol incremental state that the
+    # streaming layer advances on every closed candle.
+    if ind is None and IndicatorState:
+        ind = get_indicator_state(symbol, candles)
+    if ind is not None:
+        if ind.bars < 2:
+            return None
+    else:
+        # create mock series aligned with len(closes)
+        mean = sum(closes) / len(closes)
+        ind = SimpleNamespace(macd=[0.0] * len(closes), signal=[0.0] * len(closes),
+                              ema_short=[mean] * len(closes), ema_long=[mean] * len(closes),
+                              rsi=[50.0] * len(closes), zlsma=[mean] * len(closes),
+                              breakout=False, chandelier=None)
+
+    settings, entry_conditions, exit_conditions = get_pipelines()
+    ctx = SignalContext(symbol, closes, ind, settings, volumes=candles.volumes)
+
+    # ---------- ENTRY ----------
+    position = state.positions.get(symbol)
+    if position is None:
+        if len(ind.ema_short) < LOOK_BACK + 2:
+            return None
+        # stops at the first condition that decides; only the conditions it ran are listed
+        started = clock()
+        buy, buy_reasons = entry_conditions.evaluate(ctx)
+        _ENTRY_CONDITIONS.record(clock() - started)
+        if buy:
+            if candidates is not None:
+                candidates.offer(get_scorer(SIGNAL_SCORE)(ctx), symbol, closes[-1], ind.rsi[-1], buy_reasons)
+                return "signal"
+            return enter_position(symbol, closes[-1], buy_reasons, ind.rsi[-1])
+
+    # ---------- EXIT ----------
+    else:
+        monitor = getattr(state, "exit_monitor", None)
+        if monitor is not None and monitor.watching(symbol):
+            # the exit monitor evaluates every tick of the held symbol and sells itself
+            return None
+        print(f"🕒 [DEMO] Still in position: {symbol} since {position.entry_price}...")
+        started = clock()
+        sell, sell_reasons = exit_conditions.evaluate(ctx)
+        _EXIT_CONDITIONS.record(clock() - started)
+        if sell:
+            message = f"🔻 Demo Sell Signal for {symbol}\nReasons:\n" + "\n".join(sell_reasons)
+            print("[DEMO MESSAGE]", message)
+
+            print(f"🔻 [DEMO] Confirmed sell signal for {symbol}")
+            if PLACE_ORDERS:
+                # the position holds real coins: sell them, the order path closes the book entry
+                place_market_sell_order(symbol)
+                return "sell"
+            close_demo_position(symbol)
+            print(f"[DEMO] Would place market sell order for {symbol} at {closes[-1]}")
+            return "sell"
+
+def close_demo_position(symbol):
+    """Demo sell: only the book entry goes, no order is sent."""
+    state.positions.close(symbol)
+    monitor = getattr(state, "exit_monitor", None)
+    if monitor is not None:
+        monitor.unwatch(symbol)
+
+def enter_position(symbol, price, reasons, rsi):
+    """
+    Open a (demo) position on a buy signal, sized by the capital allocator.
+    The latency trace of the symbol's last candle is marked "decided" here and
+    kept with the position; with PLACE_ORDERS the order path finishes it.
+    Returns "buy", or None when the book has no room for it.
+    """
+    size = CapitalAllocator.from_config().allocate(
+        state.positions, Decimal(mock_get_asset_balance(asset='USDT')['free']))
+    if symbol in state.positions or size is None:
+        print(f"⏭ [DEMO] Skipping buy signal for {symbol}: position open or no capital left")
+        return None
+    trace = take_trace(getattr(state, "traces", None), symbol)
+    message = f"✅ Demo Buy Signal for {symbol}\nReasons:\n" + "\n".join(reasons)
+    # demo: print instead of sending to a bot
+    print("[DEMO MESSAGE]", message)
+
+    print(f"✅ [DEMO] Buy signal detected for {symbol} | RSI = {rsi:.2f}")
+    if PLACE_ORDERS:
+        return "buy" if place_market_buy_order(symbol, trace) else None
+    # demo: record the position in the book but DO NOT execute a real order
+    entry_price = Decimal(str(price))
+    position = state.positions.open(symbol, entry_price, size / entry_price, size,
+                                    usdt_before=Decimal(mock_get_asset_balance(asset='USDT')['free']),
+                                    reasons=reasons, trace=trace)
+    trace_stats.record(trace)
+    print(f"[DEMO] Would place market buy order for {symbol}: {size} USDT at {price}")
+    monitor = getattr(state, "exit_monitor", None)
+    if monitor is not None:
+        # the position exists only in the book, so its exit must not reach the exchange
+        monitor.watch(symbol, position.entry_price, sell=close_demo_position)
+    return "buy"
+
+def has_capacity():
+    return CapitalAllocator.from_config().has_capacity(state.positions)
+
+@timed("strategy.check_exits")
+def check_exits(prepare=None):
+    """Run the exit checks of the open positions only (prepare as in scan_entries)."""
+    held = state.positions.symbols()
+    evaluate = (prepare or evaluator)(held) if held else None
+    for symbol in held:
+        evaluate(symbol)
+
+@timed("strategy.scan_entries")
+def scan_entries(symbols, prepare=None):
+    """
+    Entry stage: evaluate every symbol not already held, rank the buy signals
+    by SIGNAL_SCORE keeping the best SIGNAL_TOP_K (at least one per position
+    slot), and enter the best first until the position book is full.
+    `prepare` (default evaluator) maps the symbols and the TopK to the
+    evaluate function. Returns the symbols bought.
+    """
+    symbols = [s for s in symbols if s not in state.positions]
+    if not symbols or not has_capacity():
+        return []
+    top = TopK(max(SIGNAL_TOP_K, CapitalAllocator.from_config().max_positions))
+    sharded = get_sharded_scanner()
+    if sharded:
+        for signal in scan_sharded(sharded, symbols):
+            top.offer(signal["score"], signal["symbol"], signal["price"], signal["rsi"], signal["reasons"])
+    else:
+        evaluate = (prepare or evaluator)(symbols, top)
+        for symbol in symbols:
+            evaluate(symbol)
+
+    bought = []
+    for candidate in top.ranked():
+        if not has_capacity():
+            break
+        if enter_position(candidate.symbol, candidate.price, candidate.reasons, candidate.rsi):
+            bought.append(candidate.symbol)
+    signal_ranking.record(SIGNAL_SCORE, top, bought)
+    return bought
+
+signal_ranking = RankingStats()  # the last scan's ranked candidates, for the status view
+
+# ----------------------
+# Sharded scan (worker processes)
+# ----------------------
+_sharded = None
+
+def get_sharded_scanner():
+    """
+    The shared ShardedScanner when STRATEGY_WORKERS > 0 and the candles live
+    in a MappedCandleStore the workers can map; None otherwise.
+    """
+    global _sharded
+    if not STRATEGY_WORKERS:
+        return None
+    path = getattr(state.candles, "path", None)
+    if path is None:
+        if _sharded is None:
+            print("⚠️ STRATEGY_WORKERS needs a memory-mapped candle store; scanning in-process")
+            _sharded = False
+        return None
+    if not _sharded or _sharded.path != path:
+        from trading.sharded import ShardedScanner
+        _sharded = ShardedScanner(path, STRATEGY_WORKERS)
+    return _sharded
+
+def scan_sharded(scanner, symbols):
+    """
+    Evaluate the entry conditions of `symbols` across the scanner's workers.
+    Returns their scored buy signals in `symbols` order.
+    """
+    settings, _, _ = get_pipelines()
+    periods = indicator_periods()
+    signals = scanner.scan(symbols, settings, periods, state.candles.capacity, window_changes(symbols),
+                           min_bars=LOOK_BACK + 2, score=SIGNAL_SCORE)
+    print(scanner.report())
+    return signals
+
 # ----------------------
 # Strategy loop (demo-safe)
 # ----------------------
-def strategy_loop():
+def strategy_loop(mock_history=False):
+    """
+    Scan the symbols for exits and entries. Symbols without enough candles are
+    skipped until the history bootstrap (or the live stream) has filled them;
+    `mock_history` seeds them with random candles instead, for running the loop
+    without any history source. Never combine it with the bootstrap or the
+    candle cache: the mock rows would be scanned, and persisted, as real ones.
+    """
     try:
         symbols_info = get_symbols()
         state.symbols_info_dict = {s['symbol']: s for s in symbols_info}
 
         # Prepare simple mock candles in state if empty
-        for s in symbols_info:
+        for s in symbols_info if mock_history else ():
             sym = s['symbol']
-            if sym not in state.candles or len(state.candles[sym]) < EMA_LONG:
-                # create mock OHLC close prices as floats
-                mock_closes = [round(random.uniform(100, 200), 2) for _ in range(EMA_LONG + 5)]
-                # store as list of numbers or dicts depending on other code expectations
-                state.candles[sym] = mock_closes
+            if state.candles.count(sym) < EMA_LONG:
+                # create mock OHLCV rows ([open_time, open, high, low, close, volume])
+                now_ms = int(time.time()) * 1000
+                mock_rows = []
+                for i in range(EMA_LONG + 5):
+                    close = round(random.uniform(100, 200), 2)
+                    mock_rows.append([now_ms - (EMA_LONG + 5 - i) * 900_000, close, close + 1, close - 1, close, 1000.0])
+                state.candles.load(sym, mock_rows)
 
         # Activate trading in demo so the loop proceeds once
         state.is_trading_active = True
 
+        if STRATEGY_MODE == "events":
+            event_loop()
+            return
+
         while True:
             print(f"SYMBOLS: {len(symbols_info)}")
-            # accept both list-of-floats or list-of-candle-dicts
-            candle_counts = sum(len(state.candles[s['symbol']]) for s in symbols_info)
+            candle_counts = sum(state.candles.count(s['symbol']) for s in symbols_info)
             print(f"CANDLES (total across symbols): {candle_counts}")
 
             if not state.is_trading_active:
@@ -142,10 +617,7 @@ def strategy_loop():
                 time.sleep(TRADE_INTERVAL)
                 continue
 
-            valid_symbols = [
-                s for s in symbols_info
-                if s['symbol'] in state.candles and len(state.candles[s['symbol']]) >= max(EMA_LONG, RSI_PERIOD)
-            ]
+            valid_symbols = [s for s in symbols_info if has_enough_bars(s['symbol'])]
 
             if not valid_symbols:
                 print("No symbols to check...")
@@ -154,152 +626,19 @@ def strategy_loop():
 
             print(f'\n[{time.strftime("%H:%M:%S")}] Checking {len(valid_symbols)} symbols...')
 
-            for s in valid_symbols:
-                symbol = s['symbol']
-
-                # obtain closes (ensure numeric list)
-                closes = state.candles[symbol]
-                if not closes:
-                    continue
-                # If closes are dicts with 'close' key, extract
-                if isinstance(closes[0], dict):
-                    closes = [float(c.get('close', 0)) for c in closes]
-
-                # Use stubbed indicator outputs if indicator functions missing
-                if calculate_macd:
-                    macd_line, signal_line, macd_hist = calculate_macd(closes)
-                else:
-                    # create mock arrays aligned with len(closes)
-                    macd_line = [0.0] * len(closes)
-                    signal_line = [0.0] * len(closes)
-                    macd_hist = [0.0] * len(closes)
-
-                if calculate_zlsma:
-                    zlsma_list = calculate_zlsma(closes, period=ZLSAMA_PERIOD)
-                else:
-                    zlsma_list = [sum(closes)/len(closes)] * len(closes)
-
-                if calculate_ema:
-                    ema_short = calculate_ema(closes, EMA_SHORT)
-                    ema_long = calculate_ema(closes, EMA_LONG)
-                else:
-                    ema_short = [sum(closes)/len(closes)] * len(closes)
-                    ema_long = [sum(closes)/len(closes)] * len(closes)
-
-                ema_slope = ema_long[-1] > ema_long[-4] if len(ema_long) >= 4 else False
-
-                if calculate_rsi:
-                    rsi = calculate_rsi(closes, RSI_PERIOD)
-                else:
-                    rsi = [50.0] * len(closes)
-
-                macd_bullish_divergence = detect_macd_bullish_divergence(closes, macd_line) if detect_macd_bullish_divergence else False
-                has_rsi_bullish_divergence = detect_rsi_bullish_divergence(closes, rsi) if detect_rsi_bullish_divergence else False
-                has_rsi_bearish_divergence = detect_rsi_bearish_divergence(closes, rsi) if detect_rsi_bearish_divergence else False
-                macd_bearish_divergence = detect_macd_bearish_divergence(closes, macd_line) if detect_macd_bearish_divergence else False
-                macd_bullish = prev_macd <= prev_signal and curr_macd > curr_signal
-                macd_bearish = prev_macd >= prev_signal and curr_macd < curr_signal
-
-                # ---------- ENTRY ----------
-                if not state.in_position:
-                    if len(ema_short) < LOOK_BACK + 2:
-                        continue
-                    prev_short = ema_short[-(LOOK_BACK + 2):-2]
-                    prev_long = ema_long[-(LOOK_BACK + 2):-2]
-                    short_below_long_before = all(sv < lv for sv, lv in zip(prev_short, prev_long))
-                    price_above_zlsma = closes[-1] > zlsma_list[-1]
-                    rsi_critical = RSI_OVERSELL <= rsi[-1] <= RSI_OVERBOUGHT
-                    buy_reasons = []
-                    buy_conditions = []
-
-                    # Keep conditions in place, but in demo only a subset is required
-                    if USE_BULLISH_CROSS:
-                        buy_conditions.append(bullish_cross)
-                        if bullish_cross:
-                            buy_reasons.append("📈 Bullish Cross")
-
-                    if USE_BELOW_BEFORE:
-                        buy_conditions.append(short_below_long_before)
-                        if short_below_long_before:
-                            buy_reasons.append("🔻 Short Below Long Before")
-
-                    if USE_RSI_CRITICAL:
-                        buy_conditions.append(rsi_critical)
-                        if rsi_critical:
-                            buy_reasons.append(f"💡 RSI Critical ({rsi[-1]:.2f})")
-
-                    # demo price increase check uses stub or fallback
-                    if USE_PRICE_INCREASES_RECENTLY and price_increased_recently:
-                        value = price_increased_recently(symbol)
-                        buy_conditions.append(value)
-                        if value:
-                            buy_reasons.append("📊 Price Increased Recently")
-
-                    if USE_EMA_SLOPE:
-                        buy_conditions.append(ema_slope)
-                        if ema_slope:
-                            buy_reasons.append("📐 EMA Slope Positive")
-
-                    # Final decision in demo: require only that at least one active condition is True
-                    if buy_conditions and any(buy_conditions):
-                        message = f"✅ Demo Buy Signal for {symbol}\nReasons:\n" + "\n".join(buy_reasons)
-                        # demo: print instead of sending to a bot
-                        print("[DEMO MESSAGE]", message)
-
-                        print(f"✅ [DEMO] Buy signal detected for {symbol} | RSI = {rsi[-1]:.2f}")
-                        # demo: record mock entry state but DO NOT execute real order
-                        state.in_position = True
-                        state.current_symbol = symbol
-                        state.last_entry_price = Decimal(closes[-1])
-                        state.usdt_before = Decimal(mock_get_asset_balance(asset='USDT')['free'])
-                        print(f"[DEMO] Would place market buy order for {symbol} at {closes[-1]}")
-                        # break to simulate single trade handling like original code
-                        break
-
-                # ---------- EXIT ----------
-                elif state.in_position and symbol == state.current_symbol:
-                    print(f"🕒 [DEMO] Still in position: {state.current_symbol}...")
-                    live_price = Decimal(mock_get_symbol_ticker(symbol=symbol)['price'])
-                    tporsl_cross = False
-                    if hit_tp_or_sl:
-                        try:
-                            tporsl_cross = hit_tp_or_sl(state.last_entry_price, live_price)
-                        except Exception:
-                            tporsl_cross = False
-
-                    price_below_zlsma = closes[-1] < zlsma_list[-1]
-                    chandelier_cross = False
-                    if len(closes) > 30 and get_chandelier_exit:
-                        chandelier_exit_list = get_chandelier_exit([], [], closes)
-                    sell_reasons = []
-                    con_tpsl = USE_TPORSL_CROSS and tporsl_cross
-                    if con_tpsl:
-                        sell_reasons.append("🎯 Take Profit / Stop Loss Cross")
-
-                    cond_chandelier = USE_CHANDELIER_CROSS and chandelier_cross
-                    cond_macd = USE_MACD_BEARISH and macd_bearish
-                    cond_zlsma = USE_PRICE_BELOW_ZLSMA and price_below_zlsma
-
-                    if cond_chandelier and cond_macd and cond_zlsma:
-                        if cond_chandelier:
-                            sell_reasons.append("💡 Chandelier Exit")
-                        if cond_macd:
-                            sell_reasons.append("📉 MACD Bearish")
-                        if cond_zlsma:
-                            sell_reasons.append("⬇️ Price Below ZLSMA")
-
-                    # demo exit: if tp/sl triggered or all three exit flags active
-                    if con_tpsl or (cond_chandelier and cond_macd and cond_zlsma):
-                        message = f"🔻 Demo Sell Signal for {symbol}\nReasons:\n" + "\n".join(sell_reasons)
-                        print("[DEMO MESSAGE]", message)
-
-                        print(f"🔻 [DEMO] Confirmed sell signal for {symbol}")
-                        # demo: reset position (no real sell)
-                        state.in_position = False
-                        state.current_symbol = None
-                        state.last_entry_price = None
-                        print(f"[DEMO] Would place market sell order for {symbol} at {closes[-1]}")
-                        break
+            # exits cost O(open positions); entries fill the free slots of the book
+            check_exits()
+            symbols = [s['symbol'] for s in valid_symbols]
+            if USE_PRESCREEN and has_capacity():
+                scanner = get_prescreen()
+                scanner.run(symbols, scan_entries)
+                print(scanner.stats.report())
+            else:
+                scan_entries(symbols)
+            print(signal_ranking.report())
+            print(state.positions.report())
+            print(timers.report())
+            print(trace_stats.report())
 
             # In demo we run once-through or sleep briefly and then exit loop to avoid infinite background in examples
             time.sleep(TRADE_INTERVAL)
@@ -310,6 +649,59 @@ def strategy_loop():
     except Exception as e:
         print(f"❌ Error in strategy loop (demo): {e}")
 
+def event_loop(stop=None):
+    """
+    Evaluate symbols as their candles close instead of rescanning all of them
+    every TRADE_INTERVAL. The held symbols are rechecked at least every
+    TRADE_INTERVAL, so TP/SL keeps following the live price.
+    Runs until `stop` (a threading.Event) is set.
+    """
+    events = state.candle_events
+    last_report = time.time()
+    while stop is None or not stop.is_set():
+        dirty = events.drain(timeout=TRADE_INTERVAL)
+        if not state.is_trading_active:
+            continue
+
+        def prepare(symbols, candidates=None):
+            evaluate = evaluator(symbols, candidates)
+
+            def decide(symbol):
+                try:
+                    return evaluate(symbol)
+                except Exception as e:
+                    print(f"❌ Error evaluating {symbol}: {e}")
+                finally:
+                    events.decided(dirty.pop(symbol, None))
+            return decide
+
+        # a failing scan (e.g. a broken worker pool) skips this batch, not the loop
+        try:
+            check_exits(prepare)
+            candidates = [s for s in dirty if s in state.symbols_info_dict and has_enough_bars(s)]
+            if USE_PRESCREEN and candidates and has_capacity():
+                scanner = get_prescreen()
+                scanner.run(candidates, lambda survivors: scan_entries(survivors, prepare))
+                print(scanner.stats.report())
+            else:
+                scan_entries(candidates, prepare)
+
+            if time.time() - last_report >= EVENT_REPORT_INTERVAL:
+                print(events.report())
+                ingest = getattr(state, "ingest_queue", None)
+                if ingest is not None:
+                    print(ingest.report())
+                print(condition_report())
+                print(timers.report())
+                print(trace_stats.report())
+                last_report = time.time()
+        except Exception as e:
+            print(f"❌ Error in event loop, skipping {len(dirty)} candle closes: {e}")
+        finally:
+            # pruned by the pre-screen, scanned by the workers, not tradable, or failed
+            for received in dirty.values():
+                events.decided(received)
+
 # -------------------
 def start_trading():
     if getattr(state, "is_trading_active", False):
@@ -321,11 +713,11 @@ def start_trading():
 
 # ------    
 def stop_trading():
-    if getattr(state, "in_position", False) and getattr(state, "current_symbol", None):
+    if state.positions:
         state.is_trading_active = False
         # in demo we simply reset
-        print(f"[DEMO] Closing position for {state.current_symbol} (demo, no real order).")
-        state.in_position = False
-        state.current_symbol = None
+        for symbol in state.positions:
+            print(f"[DEMO] Closing position for {symbol} (demo, no real order).")
+            close_demo_position(symbol)
     else:
         print("🚫 No open trades currently. (demo)")
\ No newline at end of file
@@ -1,6 +1,5 @@
 # trading/streaming_demo.py
 from decimal import Decimal
-from collections import deque
 import time
 import threading
 import random
@@ -13,15 +12,34 @@ try:
 except Exception:
     config = None
 
+from trading.candles import CandleStore, interval_to_ms
+from trading.price_window import PriceWindows
+from trading.fast_decode import decode_kline
+from trading.bootstrap import WeightBudget, fetch_concurrently
+from trading.events import CandleCloseEvents
+from trading.snapshots import StateDomain
+from trading.timing import clock, timers
+from trading.tracing import Trace
+
 try:
     import state
 except Exception:
     # minimal demo state object to mirror your original state
     class _State:
-        candles = {}
-        price_history = {}
+        candles = CandleStore(capacity=120)
+        price_history = PriceWindows()
+        indicators = {}
+        stale_indicators = set()
+        candle_events = CandleCloseEvents()
+        market = StateDomain("market")
+        traces = {}
     state = _State()
 
+try:
+    from trading.indicators import IndicatorState
+except Exception:
+    IndicatorState = None
+
 # -------------------------
 # Demo-safe helpers / fallbacks
 # -------------------------
@@ -32,10 +50,41 @@ def demo_get_config(attr, default):
 
 # demo defaults (safe)
 MAX_CANDLE_STORE = demo_get_config("MAX_CANDLE_STORE", 500)
-REQUIRED_BARS = demo_get_config("REQUIRED_BARS", 300)
 STEP_SEC = demo_get_config("STEP_SEC", 60)
-MONITOR_MINUTES = demo_get_config("MONITOR_MINUTES", 60)
 KLINE_INTERVAL = demo_get_config("KLINE_INTERVAL", "1m")
+LOG_KLINES = demo_get_config("LOG_KLINES", False)  # print every closed kline (slow under load)
+REQUEST_WEIGHT_PER_MINUTE = demo_get_config("REQUEST_WEIGHT_PER_MINUTE", 6000)
+BOOTSTRAP_WORKERS = demo_get_config("BOOTSTRAP_WORKERS", 16)
+BOOTSTRAP_RETRIES = demo_get_config("BOOTSTRAP_RETRIES", 3)
+
+_DECODE = timers.stage("ingest.decode")
+_APPEND = timers.stage("candles.append")
+
+
+def indicator_periods():
+    """
+    The indicator periods currently in config (Telegram can change them at
+    runtime), as keyword arguments for IndicatorState, IndicatorState.matches
+    and indicator_matrix. Every path that builds indicators reads them here.
+    """
+    return dict(
+        ema_short=demo_get_config("EMA_SHORT", 12),
+        ema_long=demo_get_config("EMA_LONG", 26),
+        rsi_period=demo_get_config("RSI_PERIOD", 14),
+        zlsma_period=demo_get_config("ZLSAMA_PERIOD", 21),
+        breakout_period=demo_get_config("BREAKOUT_PERIOD", 20),
+        chandelier_period=demo_get_config("CHANDELIER_PERIOD", 22),
+    )
+
+def build_indicator_state(candles, periods=None):
+    """
+    Seed a fresh IndicatorState from a symbol's stored candles using `periods`
+    (default: the current indicator_periods()). Returns None when the
+    indicators module is unavailable.
+    """
+    if IndicatorState is None:
+        return None
+    return IndicatorState(**(periods or indicator_periods())).seed(candles.closes, candles.highs, candles.lows)
 
 # -------------------------
 # Mock exchange client (no network)
@@ -43,7 +92,7 @@ KLINE_INTERVAL = demo_get_config("KLINE_INTERVAL", "1m")
 def mock_get_klines(symbol, interval, limit):
     """
     Return mock klines as Binance-style lists where index 4 is close price.
-    Each kline: [open_time, open, high, low, close, ...]
+    Each kline: [open_time_ms, open, high, low, close, volume]
     """
     base_price = 100.0 if "BTC" not in symbol else 20000.0
     klines = []
@@ -54,42 +103,98 @@ def mock_get_klines(symbol, interval, limit):
         high_p = max(open_p, price) + random.uniform(0, 2)
         low_p = min(open_p, price) - random.uniform(0, 2)
         close_p = round(price, 2)
-        k = [int(time.time()) - (limit - i) * STEP_SEC, str(open_p), str(high_p), str(low_p), str(close_p)]
+        volume = random.uniform(1000, 5000)
+        k = [(int(time.time()) - (limit - i) * STEP_SEC) * 1000, str(open_p), str(high_p), str(low_p), str(close_p), str(volume)]
         klines.append(k)
     return klines
 
 # -------------------------
 # 1. Bootstrap history (demo)
 # -------------------------
-def bootstrap_history(symbols, interval=KLINE_INTERVAL, limit=100):
+def demo_fetch_klines(symbol, interval, limit):
+    if config and hasattr(config, "client"):
+        # original (real) client call commented out in demo
+        # return config.client.get_klines(symbol=symbol, interval=interval, limit=limit)
+        return mock_get_klines(symbol, interval, limit)
+    return mock_get_klines(symbol, interval, limit)
+
+def store_history(sym, klines, step_ms=None):
+    """
+    Store one symbol's fetched klines and rebuild its indicators and
+    price window. Klines that continue the symbol's stored candles are
+    appended; otherwise the symbol is reloaded from scratch.
+    """
+    # the REST endpoint returns the still-open candle last; only keep closed ones
+    if klines and len(klines[-1]) > 6 and int(klines[-1][6]) > time.time() * 1000:
+        klines = klines[:-1]
+
+    step_ms = step_ms or STEP_SEC * 1000
+    candles = state.candles.get(sym)
+    if candles is None or not candles.count or (klines and int(klines[0][0]) > candles.last_open_time + step_ms):
+        candles = state.candles.load(sym, klines)
+    else:
+        candles.load(klines)
+    state.stale_indicators.discard(sym)
+    state.indicators[sym] = build_indicator_state(candles)
+
+    # price_history: each close stamped with its candle's close time
+    window = state.price_history.window(sym)
+    window.clear()
+    for open_time, close in zip(candles.open_times.tolist(), candles.closes.tolist()):
+        window.add(open_time / 1000.0 + STEP_SEC, close)
+    state.candle_events.publish(sym)
+    return candles
+
+def missing_bars(sym, step_ms, now_ms=None):
+    """Closed candles missing after the symbol's last stored one (None if nothing is stored)."""
+    candles = state.candles.get(sym)
+    if candles is None or not candles.count:
+        return None
+    now_ms = now_ms if now_ms is not None else time.time() * 1000
+    last_closed_open = (int(now_ms) // step_ms - 1) * step_ms
+    return max(0, (last_closed_open - candles.last_open_time) // step_ms)
+
+def bootstrap_history(symbols, interval=KLINE_INTERVAL, limit=100, fetch=None, budget=None,
+                      max_workers=BOOTSTRAP_WORKERS, retries=BOOTSTRAP_RETRIES):
     """
-    Demo-safe bootstrap: uses mock_get_klines if real client unavailable.
-    Mirrors the original function's behavior but without external API calls.
+    Fetch kline history for all symbols concurrently under the exchange's
+    request-weight budget. Symbols already in the candle store (e.g. mapped
+    from the on-disk cache) only fetch the candles missing since their last
+    stored open time. Each symbol is stored as soon as its klines arrive, so
+    the strategy loop can scan it while the rest are still loading.
+    Returns the symbols that were bootstrapped.
     """
+    budget = budget or WeightBudget(REQUEST_WEIGHT_PER_MINUTE)
+    step_ms = interval_to_ms(interval)
+    ready, limits = [], {}
+    started = time.time()
     for sym in symbols:
+        missing = missing_bars(sym, step_ms)
+        if missing == 0:
+            # cache is current: just rebuild the in-memory state
+            store_history(sym, [], step_ms)
+            ready.append(sym)
+        elif missing is not None and missing < limit:
+            limits[sym] = missing + 1
+    cached = set(ready)
+    to_fetch = [s for s in symbols if s not in cached]
+
+    for sym, klines, error in fetch_concurrently(to_fetch, fetch or demo_fetch_klines, interval, limit,
+                                                 budget=budget, max_workers=max_workers, retries=retries,
+                                                 limits=limits):
+        if error is not None:
+            print(f"[DEMO] Bootstrap error {sym}: {error}")
+            continue
         try:
-            if config and hasattr(config, "client"):
-                # original (real) client call commented out in demo
-                # klines = config.client.get_klines(symbol=sym, interval=interval, limit=limit)
-                klines = mock_get_klines(sym, interval, limit)
-            else:
-                klines = mock_get_klines(sym, interval, limit)
-
-            closes = [Decimal(k[4]) for k in klines]
-            state.candles[sym] = deque(closes, maxlen=MAX_CANDLE_STORE)
-
-            # price_history (timestamp, price) pairs
-            now = time.time()
-            start_ts = now - STEP_SEC * (len(closes) - 1)
-            state.price_history[sym] = deque(
-                [(start_ts + i * STEP_SEC, closes[i]) for i in range(len(closes))],
-                maxlen=REQUIRED_BARS
-            )
-
-            print(f"[DEMO] Bootstrapped {sym}: {len(closes)} bars")
-            time.sleep(0.05)  # small delay
+            candles = store_history(sym, klines, step_ms)
+            ready.append(sym)
+            if LOG_KLINES:
+                print(f"[DEMO] Bootstrapped {sym}: {candles.count} bars")
         except Exception as e:
             print(f"[DEMO] Bootstrap error {sym}: {e}")
+    print(f"[DEMO] Bootstrapped {len(ready)}/{len(symbols)} symbols in {time.time() - started:.2f}s "
+          f"({len(cached)} from cache, {len(limits)} backfilled)")
+    return ready
 
 # -------------------------
 # 2. Handle kline message (same logic, safe)
@@ -115,27 +220,122 @@ def handle_kline_message(msg):
             return
 
         symbol = data.get('s', k.get('s', 'DEMOSYM'))
-        close_price = Decimal(str(k.get('c', k.get('close', random.uniform(100, 200)))))
+        close = float(k.get('c', k.get('close', random.uniform(100, 200))))
+        _kline_sink(
+            symbol,
+            int(k.get('t', time.time() * 1000)),
+            float(k.get('o', close)),
+            float(k.get('h', close)),
+            float(k.get('l', close)),
+            close,
+            float(k.get('v', 0.0)),
+        )
+    except Exception as e:
+        print(f"[DEMO] WebSocket msg error: {e}")
 
-        # initialize candle deque if needed
-        if symbol not in state.candles:
-            state.candles[symbol] = deque(maxlen=MAX_CANDLE_STORE)
-        state.candles[symbol].append(close_price)
+def ingest_kline(symbol, open_time, open_, high, low, close, volume, received=None):
+    """
+    Write one closed kline into the candle store, advance the symbol's
+    indicators and price history and publish a candle-close event and a latency
+    Trace (state.traces) stamped with `received` (perf_counter() at frame
+    receipt). Returns True if it was a new bar. A kline with the open time of
+    the last stored bar corrects that bar: the indicators are reseeded from the
+    corrected candles and the new close is recorded, but no event is published.
+    """
+    if received is None:
+        received = time.perf_counter()
+    # write the full OHLCV row into the symbol's ring buffer
+    started = clock()
+    appended = state.candles.append(symbol, open_time, open_, high, low, close, volume)
+    _APPEND.record(clock() - started)
+    close_time = open_time / 1000.0 + STEP_SEC
+    if not appended:
+        candles = state.candles.get(symbol)
+        if candles is None or candles.last_open_time != open_time:
+            return False  # older than the last stored bar: ignored
+        # the indicators already include the replaced close; rare, so rebuild them
+        if symbol in state.indicators:
+            state.stale_indicators.discard(symbol)
+            state.indicators[symbol] = build_indicator_state(candles)
+        state.price_history.add(symbol, close_time, close)
+        state.market.update(lambda data: data.__setitem__(symbol, (close_time, close)), wait=False)
+        return False
 
-        # update price_history
-        now = time.time()
-        if symbol not in state.price_history:
-            state.price_history[symbol] = deque(maxlen=REQUIRED_BARS)
-        state.price_history[symbol].append((now, close_price))
+    # advance the incremental indicators by exactly one closed candle; this is
+    # their only writer, so a missing or stale state is (re)seeded here, from
+    # candles that already hold this bar
+    indicators = state.indicators.get(symbol)
+    if indicators is None or symbol in state.stale_indicators:
+        state.stale_indicators.discard(symbol)
+        state.indicators[symbol] = build_indicator_state(state.candles.get(symbol))
+    else:
+        indicators.update(close, high, low)
 
-        # prune old entries beyond MONITOR_MINUTES
-        cutoff = MONITOR_MINUTES * 60
-        while state.price_history[symbol] and now - state.price_history[symbol][0][0] > cutoff:
-            state.price_history[symbol].popleft()
+    # update price_history, stamped with the candle's close time
+    state.price_history.add(symbol, close_time, close)
+    # publish the last close for snapshot readers; queued, the ingest path never waits
+    state.market.update(lambda data: data.__setitem__(symbol, (close_time, close)), wait=False)
 
-        print(f"[DEMO] Kline closed for {symbol} -> {close_price}")
-    except Exception as e:
-        print(f"[DEMO] WebSocket msg error: {e}")
+    # the latency trace of this candle waits for a buy decision on it
+    state.traces[symbol] = Trace(symbol, at=received).mark("stored")
+    state.candle_events.publish(symbol, received)
+
+    if LOG_KLINES:
+        print(f"[DEMO] Kline closed for {symbol} -> {close}")
+    return True
+
+# Where decoded closed klines go: straight into the store, or onto an IngestQueue
+_kline_sink = ingest_kline
+
+def set_kline_sink(sink=None):
+    """
+    Route decoded closed klines to `sink(symbol, open_time, o, h, l, c, v, received)`,
+    e.g. IngestQueue.put. None restores direct writes via ingest_kline.
+    """
+    global _kline_sink
+    _kline_sink = sink or ingest_kline
+
+def ingest_frame(raw):
+    """
+    Single ingestion path for raw WebSocket frames (str or bytes). Closed klines
+    go through the fast decoder; anything it cannot read falls back to
+    json.loads + handle_kline_message. Non-closed klines are dropped unparsed.
+    """
+    started = clock()
+    received = started / 1e9  # perf_counter() seconds, from the same clock read
+    try:
+        kline = decode_kline(raw)
+    except ValueError:
+        kline = None
+        try:
+            handle_kline_message(json.loads(raw))
+        except ValueError as e:
+            print(f"[DEMO] WebSocket decode error: {e}")
+        return
+    if kline is not None:
+        # only closed klines are timed; in-progress ones are rejected before any parsing
+        _DECODE.record(clock() - started)
+        _kline_sink(*kline, received)
+
+def ingest_frames(frames):
+    """
+    Batch version of ingest_frame; returns the number of new bars stored (or
+    queued, when an ingest queue is installed).
+    """
+    stored = 0
+    received = time.perf_counter()
+    for raw in frames:
+        started = clock()
+        try:
+            kline = decode_kline(raw)
+        except ValueError:
+            ingest_frame(raw)
+            continue
+        if kline is not None:
+            _DECODE.record(clock() - started)
+            if _kline_sink(*kline, received):
+                stored += 1
+    return stored
 
 # -------------------------
 # 3. Chunking utility (unchanged)
@@ -0,0 +1,223 @@
+# trading/sweep.py
+"""
+Parameter sweeps over the strategy settings, run on a process pool.
+
+The candle history is copied once into a shared-memory block; every worker
+attaches to it at start-up and backtests against read-only NumPy views, so
+tasks only carry a small dict of parameter overrides and return a summary.
+One task is one parameter set over every symbol, which keeps all cores busy
+as long as the sweep has at least as many candidates as workers.
+
+Candidates come from a grid or a random search over the same keys the
+Telegram "Edit Variables" flow changes (EMA_SHORT, EMA_LONG, RSI_PERIOD,
+RSI_OVERBOUGHT, MIN_INCREASE, ...). Results are ranked by a summary metric
+and written to a JSON file.
+"""
+import itertools
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from trading.backtest import backtest, live_params, load_history, synthetic_history
+
+SWEEP_RESULTS_DIR = os.path.join("cache", "sweeps")
+METRICS = ("total_return_pct", "avg_return_pct", "profit_factor", "win_rate_pct", "max_drawdown_pct")
+
+
+class SharedHistory:
+    """
+    Candle history for many symbols in one shared-memory block. `layout` is a
+    small picklable description that attach() turns back into per-symbol views.
+    """
+
+    def __init__(self, history):
+        symbols = list(history)
+        arrays = [np.ascontiguousarray(history[s], dtype=np.float64) for s in symbols]
+        offsets = np.cumsum([0] + [a.size for a in arrays]).tolist()
+        self._shm = shared_memory.SharedMemory(create=True, size=max(8, offsets[-1] * 8))
+        flat = np.ndarray((offsets[-1],), dtype=np.float64, buffer=self._shm.buf)
+        for a, start in zip(arrays, offsets):
+            flat[start:start + a.size] = a.ravel()
+        del flat
+        self.layout = (self._shm.name, symbols, offsets, [a.shape[0] for a in arrays])
+        self.nbytes = offsets[-1] * 8
+
+    @staticmethod
+    def attach(layout):
+        """Return (shm, {symbol: read-only (fields, bars) view}); keep `shm` alive while the views are used."""
+        name, symbols, offsets, rows = layout
+        shm = shared_memory.SharedMemory(name=name)
+        flat = np.ndarray((offsets[-1],), dtype=np.float64, buffer=shm.buf)
+        flat.flags.writeable = False
+        history = {
+            s: flat[start:end].reshape(r, -1)
+            for s, start, end, r in zip(symbols, offsets, offsets[1:], rows)
+        }
+        return shm, history
+
+    def close(self):
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# -------------------------
+# Search spaces
+# -------------------------
+def grid(space):
+    """Every combination of `space` ({key: [values]})."""
+    keys = list(space)
+    for values in itertools.product(*(space[k] for k in keys)):
+        yield dict(zip(keys, values))
+
+def random_search(space, n, seed=None):
+    """
+    `n` random draws from `space`. A list is sampled from; an (low, high)
+    tuple is a range, integer if both ends are ints, otherwise uniform float.
+    """
+    rng = random.Random(seed)
+    for _ in range(n):
+        params = {}
+        for key, spec in space.items():
+            if isinstance(spec, tuple):
+                low, high = spec
+                if isinstance(low, int) and isinstance(high, int):
+                    params[key] = rng.randint(low, high)
+                else:
+                    params[key] = round(rng.uniform(low, high), 4)
+            else:
+                params[key] = rng.choice(list(spec))
+        yield params
+
+def is_valid(params):
+    """Skip combinations the strategy cannot use (e.g. a short EMA not shorter than the long one)."""
+    pairs = (("EMA_SHORT", "EMA_LONG"), ("MACD_SHORT", "MACD_LONG"), ("MIN_INCREASE", "MAX_INCREASE"),
+             ("RSI_OVERSELL", "RSI_OVERBOUGHT"))
+    return all(params.get(lo, 0) < params.get(hi, float("inf")) for lo, hi in pairs)
+
+# -------------------------
+# Workers
+# -------------------------
+_shm = None
+_history = None
+
+
+def _attach_worker(layout):
+    global _shm, _history
+    _shm, _history = SharedHistory.attach(layout)
+
+def _evaluate(task):
+    index, params, fee_pct, slippage_pct, require_all = task
+    _, summary = backtest(_history, params, fee_pct, slippage_pct, require_all)
+    return index, summary
+
+# -------------------------
+# Sweep
+# -------------------------
+def rank(results, metric="total_return_pct", min_trades=30):
+    """Sort results best-first by `metric` (lowest first for drawdown); too few trades rank last."""
+    lower_is_better = metric == "max_drawdown_pct"
+
+    def key(result):
+        summary = result["summary"]
+        value = summary.get(metric)
+        if summary.get("trades", 0) < min_trades or value is None:
+            return (1, 0.0)
+        return (0, value if lower_is_better else -value)
+    return sorted(results, key=key)
+
+def run_sweep(history, candidates, metric="total_return_pct", base=None, workers=None, min_trades=30,
+              fee_pct=0.1, slippage_pct=0.05, require_all=False, path=None):
+    """
+    Backtest every candidate ({key: value} overrides on top of `base`, default
+    the live settings) across `workers` processes and return the results
+    ranked by `metric`. The ranking is also written to `path` (default a
+    timestamped file under SWEEP_RESULTS_DIR; path=False skips it).
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric {metric!r}; choose one of {', '.join(METRICS)}")
+    base = dict(base or live_params())
+    candidates = [c for c in candidates if is_valid({**base, **c})]
+    tasks = [(i, {**base, **c}, fee_pct, slippage_pct, require_all) for i, c in enumerate(candidates)]
+    workers = workers or os.cpu_count()
+
+    started = time.perf_counter()
+    summaries = [None] * len(tasks)
+    with SharedHistory(history) as shared:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach_worker,
+                                 initargs=(shared.layout,)) as pool:
+            for index, summary in pool.map(_evaluate, tasks):
+                summaries[index] = summary
+    elapsed = time.perf_counter() - started
+
+    results = rank([{"params": c, "summary": s} for c, s in zip(candidates, summaries)], metric, min_trades)
+    if path is not False:
+        path = path or os.path.join(SWEEP_RESULTS_DIR, time.strftime("sweep-%Y%m%d-%H%M%S.json"))
+        save_results(path, results, metric=metric, base=base, workers=workers, elapsed_sec=elapsed,
+                     symbols=len(history), bars=sum(a.shape[1] for a in history.values()),
+                     fee_pct=fee_pct, slippage_pct=slippage_pct, require_all=require_all)
+    print(f"🔬 Swept {len(candidates)} parameter sets on {workers} workers in {elapsed:.1f}s"
+          + (f" → {path}" if path else ""))
+    return results
+
+def save_results(path, results, **meta):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=1, default=float)
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+def format_results(results, metric, top=10):
+    lines = []
+    for n, result in enumerate(results[:top], 1):
+        s = result["summary"]
+        params = ", ".join(f"{k}={v}" for k, v in result["params"].items())
+        lines.append(f"{n:>2}. {metric}={s.get(metric, float('nan')):.2f} trades={s.get('trades', 0)} | {params}")
+    return "\n".join(lines)
+
+# Random search over the Telegram-editable settings on synthetic (or stored) history
+if __name__ == "__main__":
+    import argparse
+    import contextlib
+    import io
+
+    parser = argparse.ArgumentParser(description="Sweep strategy settings over OHLCV history")
+    parser.add_argument("history", nargs="?", help=".npz written by backtest.save_history; omit for synthetic data")
+    parser.add_argument("--symbols", type=int, default=100, help="synthetic symbols")
+    parser.add_argument("--bars", type=int, default=35_040, help="synthetic bars per symbol")
+    parser.add_argument("--trials", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--metric", default="total_return_pct", choices=METRICS)
+    parser.add_argument("--min-trades", type=int, default=30)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    history = load_history(args.history) if args.history else synthetic_history(args.symbols, args.bars)
+    space = {
+        "EMA_SHORT": (5, 20),
+        "EMA_LONG": (21, 60),
+        "RSI_PERIOD": (7, 21),
+        "RSI_OVERBOUGHT": (65, 85),
+        "MIN_INCREASE": (0.0, 3.0),
+        "MAX_INCREASE": (4.0, 12.0),
+        "USE_BELOW_BEFORE": [False, True],
+        "USE_RSI_CRITICAL": [False, True],
+    }
+    with contextlib.redirect_stdout(io.StringIO()):
+        base = live_params()
+    results = run_sweep(history, random_search(space, args.trials, seed=1), args.metric, base,
+                        args.workers, args.min_trades, path=args.output)
+    print(format_results(results, args.metric))
@@ -0,0 +1,190 @@
+# trading/timing.py
+"""
+Per-stage latency histograms for the hot path, cheap enough to stay on.
+
+A Stage counts calls and sorts their durations (nanoseconds) into fixed
+log-linear buckets: 4 per power of two, so a reported percentile is the
+upper edge of its bucket and at most 25% above the true value. Recording is
+one perf_counter_ns() pair around the timed code plus a few integer ops, no
+lock and no allocation:
+
+    _APPEND = timers.stage("candles.append")
+    ...
+    started = clock()
+    state.candles.append(...)
+    _APPEND.record(clock() - started)
+
+What one instrumented call costs depends on the interpreter and the machine;
+`python -m trading.timing` measures it on the current one (400-860ns per call
+over repeated runs on a single-core VM with CPython 3.11).
+
+Slower, less frequent calls (orders, Telegram) use the @timed decorator.
+Each stage is normally recorded from a single thread; concurrent recorders of
+the same stage may rarely lose a sample, which a histogram can live with.
+timers.snapshot() returns the stats programmatically, timers.report() as text.
+"""
+import functools
+import time
+
+clock = time.perf_counter_ns
+
+_SUB_BITS = 2  # 4 sub-buckets per power of two
+_BUCKETS = (64 + 1) << _SUB_BITS
+
+
+def bucket_upper_ns(index):
+    """Largest duration (ns) that falls into bucket `index`."""
+    if index < 1 << (_SUB_BITS + 1):
+        return index
+    power, sub = index >> _SUB_BITS, index & ((1 << _SUB_BITS) - 1)
+    shift = power - _SUB_BITS - 1
+    return (((1 << _SUB_BITS) + sub + 1) << shift) - 1
+
+
+class Stage:
+    """
+    Call count, total/max duration and a fixed-bucket histogram of one stage.
+    `sample_every` > 1 marks a stage that is only timed on 1 call in that many.
+    """
+    __slots__ = ("name", "sample_every", "count", "total_ns", "max_ns", "buckets")
+
+    def __init__(self, name, sample_every=1):
+        self.name = name
+        self.sample_every = sample_every
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.buckets = [0] * _BUCKETS
+
+    def record(self, ns):
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+        bits = ns.bit_length()
+        if bits > 3:
+            # bucket = power of two * 4 + the two bits below the leading one
+            self.buckets[bits << 2 | (ns >> (bits - 3)) & 3] += 1
+        else:
+            self.buckets[ns if ns > 0 else 0] += 1
+
+    def percentile_ns(self, q, buckets=None, count=None):
+        buckets = self.buckets if buckets is None else buckets
+        count = sum(buckets) if count is None else count
+        if not count:
+            return 0
+        rank = max(1, int(q * count + 0.5))
+        seen = 0
+        for index, n in enumerate(buckets):
+            seen += n
+            if seen >= rank:
+                return bucket_upper_ns(index)
+        return self.max_ns
+
+    def snapshot(self):
+        buckets = list(self.buckets)  # copy first; recorders keep going
+        count, total_ns, max_ns = sum(buckets), self.total_ns, self.max_ns
+        return {
+            "count": self.count,
+            "sample_every": self.sample_every,
+            "total_ms": total_ns / 1e6,
+            "avg_us": total_ns / self.count / 1e3 if self.count else 0.0,
+            "p50_us": min(self.percentile_ns(0.50, buckets, count), max_ns) / 1e3,
+            "p99_us": min(self.percentile_ns(0.99, buckets, count), max_ns) / 1e3,
+            "max_us": max_ns / 1e3,
+        }
+
+
+class StageTimers:
+    """The registry of stages by name, in the order they were first used."""
+
+    def __init__(self):
+        self._stages = {}
+
+    def stage(self, name, sample_every=1):
+        stage = self._stages.get(name)
+        if stage is None:
+            stage = self._stages.setdefault(name, Stage(name, sample_every))
+        return stage
+
+    def timed(self, name):
+        """Decorator recording every call of the function (also when it raises) under `name`."""
+        stage = self.stage(name)
+
+        def decorate(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                started = clock()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    stage.record(clock() - started)
+            return wrapper
+        return decorate
+
+    def snapshot(self):
+        """{stage name: {count, sample_every, total_ms, avg_us, p50_us, p99_us, max_us}} for the stages used so far."""
+        return {name: stage.snapshot() for name, stage in list(self._stages.items()) if stage.count}
+
+    def reset(self):
+        for stage in list(self._stages.values()):
+            stage.reset()
+
+    def report(self):
+        stats = self.snapshot()
+        if not stats:
+            return "⏱ Stage timings: nothing recorded yet"
+        lines = ["⏱ Stage timings (µs):"]
+        for name, s in stats.items():
+            sampled = f" (1 in {s['sample_every']})" if s["sample_every"] > 1 else ""
+            lines.append(f"  {name}: {s['count']} calls{sampled}, avg {s['avg_us']:.1f} p50 {s['p50_us']:.1f} "
+                         f"p99 {s['p99_us']:.1f} max {s['max_us']:.1f}")
+        return "\n".join(lines)
+
+
+timers = StageTimers()  # the process-wide registry the instrumented modules record into
+timed = timers.timed
+
+
+def measure_overhead(n=200_000):
+    """
+    Nanoseconds one instrumented call adds: the clock pair plus record(),
+    measured against the same loop without them. Returns (ns per call, stage).
+    """
+    stage = Stage("overhead")
+    loop = range(n)
+    started = clock()
+    for _ in loop:
+        pass
+    bare = clock() - started
+    record = stage.record
+    started = clock()
+    for _ in loop:
+        t0 = clock()
+        record(clock() - t0)
+    instrumented = clock() - started
+    return (instrumented - bare) / n, stage
+
+
+# Overhead per instrumented call, then a sample report
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Measure the cost of stage timing")
+    parser.add_argument("--calls", type=int, default=200_000)
+    args = parser.parse_args()
+
+    per_call, stage = measure_overhead(args.calls)
+    print(f"overhead per instrumented call: {per_call:.0f}ns over {args.calls} calls (this machine and interpreter)")
+    print(f"empty timed region: {stage.snapshot()}")
+
+    @timed("demo.sleep")
+    def nap(seconds):
+        time.sleep(seconds)
+
+    for i in range(50):
+        nap(0.001 if i % 10 else 0.005)
+    print(timers.report())
@@ -0,0 +1,135 @@
+# trading/tracing.py
+"""
+End-to-end latency traces from a closed kline to the fills of its buy order.
+
+A Trace is a list of (hop, perf_counter() time) marks along the chain:
+
+    received  frame read off the WebSocket (ingest_frame)
+    stored    candle and indicators updated, candle-close event published
+    decided   the strategy decided to enter (enter_position)
+    balance   get_asset_balance answered
+    ticker    get_symbol_ticker answered
+    sent      order about to go out (quantity computed)
+    filled    order response with the fills back
+
+ingest_kline starts a trace per closed candle and leaves it in state.traces
+until a decision takes it; a decision without one (poll mode, a manual buy)
+starts its own at "decided". The finished trace is kept on the Position it
+opened and added to trace_stats, which holds a latency histogram per hop
+(the time from one mark to the next) and for the whole chain.
+"""
+import time
+
+from trading.timing import StageTimers
+
+
+class Trace:
+    """Monotonic timestamps of one signal's hops, in the order they happened."""
+    __slots__ = ("symbol", "marks")
+
+    def __init__(self, symbol, hop="received", at=None):
+        self.symbol = symbol
+        self.marks = [(hop, time.perf_counter() if at is None else at)]
+
+    def mark(self, hop, at=None):
+        self.marks.append((hop, time.perf_counter() if at is None else at))
+        return self
+
+    @property
+    def started(self):
+        return self.marks[0][1]
+
+    def hops(self):
+        """[("received→stored", seconds), ...] between consecutive marks."""
+        marks = self.marks
+        return [(f"{a}→{b}", tb - ta) for (a, ta), (b, tb) in zip(marks, marks[1:])]
+
+    def total(self):
+        return self.marks[-1][1] - self.marks[0][1]
+
+    def as_dict(self):
+        """{hop: ms since the first mark}, for storing with the trade."""
+        started = self.started
+        return {hop: (at - started) * 1e3 for hop, at in self.marks}
+
+    def __repr__(self):
+        steps = " → ".join(f"{hop} +{ms:.2f}ms" for hop, ms in self.as_dict().items())
+        return f"Trace({self.symbol}: {steps})"
+
+
+def take_trace(traces, symbol):
+    """The symbol's pending trace marked "decided", or a new one starting there."""
+    trace = traces.pop(symbol, None) if traces is not None else None
+    if trace is None:
+        return Trace(symbol, "decided")
+    return trace.mark("decided")
+
+
+class TraceStats:
+    """Per-hop latency histograms over the finished traces."""
+
+    def __init__(self):
+        self.timers = StageTimers()
+        self.traces = 0
+        self.last = None
+
+    def record(self, trace):
+        stage = self.timers.stage
+        for hop, seconds in trace.hops():
+            stage(hop).record(int(seconds * 1e9))
+        stage("total").record(int(trace.total() * 1e9))
+        self.traces += 1
+        self.last = trace
+
+    def snapshot(self):
+        """{hop: {count, avg_us, p50_us, p99_us, max_us, ...}}, hops in chain order, then "total"."""
+        return self.timers.snapshot()
+
+    def report(self):
+        stats = self.snapshot()
+        if not stats:
+            return "🧭 Signal → fill: no traced trades yet"
+        lines = [f"🧭 Signal → fill over {self.traces} trades (ms):"]
+        for hop, s in stats.items():
+            lines.append(f"  {hop}: {s['count']}x avg {s['avg_us'] / 1e3:.2f} p50 {s['p50_us'] / 1e3:.2f} "
+                         f"p99 {s['p99_us'] / 1e3:.2f} max {s['max_us'] / 1e3:.2f}")
+        return "\n".join(lines)
+
+
+trace_stats = TraceStats()  # every traced entry of this process
+
+# Frames through ingest, a decision and a buy on a FakeExchange with injected
+# latency, then the per-hop percentiles
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Trace kline → decision → fill against a fake exchange")
+    parser.add_argument("--trades", type=int, default=50)
+    parser.add_argument("--rest-ms", type=float, default=20.0, help="latency of each REST call")
+    parser.add_argument("--order-ms", type=float, default=40.0, help="latency of the order call")
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    from trading import orders, streaming
+    from trading.async_streaming import kline_frame
+    from trading.fake_exchange import FakeExchange
+    from trading.tracing import take_trace, trace_stats  # the instances the order path records into
+
+    rest, jitter = args.rest_ms / 1e3, args.jitter_ms / 1e3
+    exchange = FakeExchange(balances={"USDT": "100000"}, jitter=jitter, latency={
+        "get_asset_balance": rest, "get_symbol_ticker": rest,
+        "order_market_buy": args.order_ms / 1e3, "order_market_sell": args.order_ms / 1e3,
+    })
+    orders.exchange = exchange
+    traces = streaming.state.traces
+
+    for n in range(args.trades):
+        symbol = f"TRACE{n}USDT"
+        exchange.set_price(symbol, 100.0 + n)
+        streaming.ingest_frame(kline_frame(symbol, 1_700_000_000_000, 100.0 + n))
+        position = orders.place_market_buy_order(symbol, take_trace(traces, symbol))
+        orders.state.positions.close(symbol)
+
+    print(position.trace)
+    print(trace_stats.report())
+    print(exchange.report())